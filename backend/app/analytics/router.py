@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from ..database import get_read_db
+from ..core.dependencies import get_current_admin_user
+from ..core.timestamps import naive_utc
+from ..schemas import CategoryRevenue, SalesPoint, TopSeller, UserResponse
+from .service import default_window, revenue_by_category, sales_curve, top_sellers
+
+router = APIRouter()
+
+
+@router.get("/revenue-by-category", response_model=List[CategoryRevenue])
+def revenue_by_category_endpoint(
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to 30 days ago"),
+    end: Optional[date] = Query(None, description="Day after the last one (UTC); defaults to tomorrow"),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    default_start, default_end = default_window(30)
+    return revenue_by_category(db, start or default_start, end or default_end)
+
+
+@router.get("/top-sellers", response_model=List[TopSeller])
+def top_sellers_endpoint(
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to 30 days ago"),
+    end: Optional[date] = Query(None, description="Day after the last one (UTC); defaults to tomorrow"),
+    limit: int = Query(10, ge=1, le=100),
+    by: str = Query("units", pattern="^(units|revenue)$"),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    default_start, default_end = default_window(30)
+    return top_sellers(db, start or default_start, end or default_end, limit, by)
+
+
+@router.get("/sales", response_model=List[SalesPoint])
+def sales_curve_endpoint(
+    start: Optional[datetime] = Query(None, description="UTC; defaults to 24 hours ago"),
+    end: Optional[datetime] = Query(None, description="UTC; defaults to now"),
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    sweet_id: Optional[int] = Query(None),
+    category: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    # Rollup buckets are naive UTC; "...Z" or "+02:00" bounds are converted
+    end = naive_utc(end) if end else datetime.utcnow()
+    start = naive_utc(start) if start else end - timedelta(hours=24)
+    return sales_curve(db, start, end, granularity, sweet_id, category)
@@ -0,0 +1,218 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from ..models import InventoryMovement, SalesRollup, StockSnapshot, Sweet
+from ..schemas import CategoryRevenue, SalesPoint, TopSeller
+
+GRANULARITIES = ("hour", "day")
+BACKFILL_CHUNK_SIZE = 5000
+UNKNOWN_CATEGORY = "Unknown"
+
+_rollups = SalesRollup.__table__
+_movements = InventoryMovement.__table__
+
+# (sweet_id, category, units, revenue, at)
+Sale = Tuple[int, str, int, float, datetime]
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    hour = at.replace(minute=0, second=0, microsecond=0)
+    return hour.replace(hour=0) if granularity == "day" else hour
+
+
+def sales_from_movements(movements: Iterable[Mapping[str, Any]], categories: Mapping[int, str]) -> Iterator[Sale]:
+    for move in movements:
+        units = -move["delta"]
+        yield (
+            move["sweet_id"],
+            categories.get(move["sweet_id"]) or UNKNOWN_CATEGORY,
+            units,
+            units * (move["unit_price"] or 0.0),
+            move["created_at"],
+        )
+
+
+def _upsert_statement(db: Session):
+    # Adds to existing buckets; both dialects spell ON CONFLICT the same way
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(_rollups)
+    return stmt.on_conflict_do_update(
+        index_elements=[_rollups.c.granularity, _rollups.c.bucket, _rollups.c.sweet_id],
+        set_={
+            "category": stmt.excluded.category,
+            "units": _rollups.c.units + stmt.excluded.units,
+            "revenue": _rollups.c.revenue + stmt.excluded.revenue,
+        }
+    )
+
+
+def record_sales(db: Session, sales: Iterable[Sale]) -> None:
+    """Folds sales into the hourly and daily rollups as part of the caller's
+    transaction, one upsert row per sweet and bucket."""
+    merged: Dict[Tuple[str, datetime, int], Dict[str, Any]] = {}
+    for sweet_id, category, units, revenue, at in sales:
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(at, granularity)
+            row = merged.get((granularity, bucket, sweet_id))
+            if row is None:
+                row = merged[(granularity, bucket, sweet_id)] = {
+                    "granularity": granularity,
+                    "bucket": bucket,
+                    "sweet_id": sweet_id,
+                    "category": category,
+                    "units": 0,
+                    "revenue": 0.0,
+                }
+            row["units"] += units
+            row["revenue"] += revenue
+    if merged:
+        db.execute(_upsert_statement(db), list(merged.values()))
+
+
+def backfill_rollups(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_size: int = BACKFILL_CHUNK_SIZE
+) -> int:
+    """Rebuilds the rollups for whole days in [start, end) from purchase
+    movements, reading and committing ``chunk_size`` movements at a time.
+
+    Live purchases keep adding to the rollups meanwhile, so backfill closed
+    periods or pause purchases while rebuilding the current day. Days before
+    the movement compaction horizon are left untouched.
+    """
+    lower = datetime.combine(start, time()) if start else None
+    upper = datetime.combine(end, time()) if end else None
+    horizon = db.execute(select(func.min(StockSnapshot.as_of))).scalar_one()
+    if horizon is not None:
+        first_full_day = bucket_start(horizon, "day")
+        if first_full_day < horizon:
+            first_full_day += timedelta(days=1)
+        lower = max(lower, first_full_day) if lower else first_full_day
+
+    clear = delete(_rollups)
+    scope = [_movements.c.kind == "purchase"]
+    if lower is not None:
+        clear = clear.where(_rollups.c.bucket >= lower)
+        scope.append(_movements.c.created_at >= lower)
+    if upper is not None:
+        clear = clear.where(_rollups.c.bucket < upper)
+        scope.append(_movements.c.created_at < upper)
+    db.execute(clear)
+    db.commit()
+
+    # Movements recorded before prices were kept fall back to the current price
+    stmt = (
+        select(
+            _movements.c.id,
+            _movements.c.sweet_id,
+            _movements.c.delta,
+            func.coalesce(_movements.c.unit_price, Sweet.price).label("unit_price"),
+            _movements.c.created_at,
+            Sweet.category,
+        )
+        .outerjoin(Sweet, Sweet.id == _movements.c.sweet_id)
+        .where(*scope)
+        .order_by(_movements.c.id)
+        .limit(chunk_size)
+    )
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(stmt.where(_movements.c.id > last_id)).all()
+        if not rows:
+            break
+        moves = [row._mapping for row in rows]
+        record_sales(db, sales_from_movements(moves, {row.sweet_id: row.category for row in rows}))
+        db.commit()
+        processed += len(rows)
+        last_id = rows[-1].id
+    return processed
+
+
+def _check_range(start: datetime, end: datetime) -> None:
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
+        )
+
+
+def _daily(start: date, end: date):
+    lower, upper = datetime.combine(start, time()), datetime.combine(end, time())
+    _check_range(lower, upper)
+    return _rollups.c.granularity == "day", _rollups.c.bucket >= lower, _rollups.c.bucket < upper
+
+
+def revenue_by_category(db: Session, start: date, end: date) -> List[CategoryRevenue]:
+    revenue = func.sum(_rollups.c.revenue).label("revenue")
+    rows = db.execute(
+        select(_rollups.c.category, func.sum(_rollups.c.units).label("units"), revenue)
+        .where(*_daily(start, end))
+        .group_by(_rollups.c.category)
+        .order_by(revenue.desc())
+    ).all()
+    return [CategoryRevenue(category=row.category, units=row.units, revenue=round(row.revenue, 2)) for row in rows]
+
+
+def top_sellers(db: Session, start: date, end: date, limit: int = 10, by: str = "units") -> List[TopSeller]:
+    units = func.sum(_rollups.c.units).label("units")
+    revenue = func.sum(_rollups.c.revenue).label("revenue")
+    rows = db.execute(
+        select(_rollups.c.sweet_id, func.max(_rollups.c.category).label("category"), units, revenue)
+        .where(*_daily(start, end))
+        .group_by(_rollups.c.sweet_id)
+        .order_by((revenue if by == "revenue" else units).desc(), _rollups.c.sweet_id)
+        .limit(limit)
+    ).all()
+    names = dict(
+        db.execute(select(Sweet.id, Sweet.name).where(Sweet.id.in_([row.sweet_id for row in rows]))).all()
+    ) if rows else {}
+    return [
+        TopSeller(
+            sweet_id=row.sweet_id,
+            name=names.get(row.sweet_id),
+            category=row.category,
+            units=row.units,
+            revenue=round(row.revenue, 2)
+        )
+        for row in rows
+    ]
+
+
+def sales_curve(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    granularity: str = "hour",
+    sweet_id: Optional[int] = None,
+    category: Optional[str] = None
+) -> List[SalesPoint]:
+    _check_range(start, end)
+    stmt = (
+        select(_rollups.c.bucket, func.sum(_rollups.c.units).label("units"), func.sum(_rollups.c.revenue).label("revenue"))
+        .where(
+            _rollups.c.granularity == granularity,
+            _rollups.c.bucket >= bucket_start(start, granularity),
+            _rollups.c.bucket < end
+        )
+        .group_by(_rollups.c.bucket)
+        .order_by(_rollups.c.bucket)
+    )
+    if sweet_id is not None:
+        stmt = stmt.where(_rollups.c.sweet_id == sweet_id)
+    if category is not None:
+        stmt = stmt.where(_rollups.c.category == category)
+    return [
+        SalesPoint(bucket=row.bucket, units=row.units, revenue=round(row.revenue, 2))
+        for row in db.execute(stmt)
+    ]
+
+
+def default_window(days: int) -> Tuple[date, date]:
+    today = datetime.utcnow().date()
+    return today - timedelta(days=days - 1), today + timedelta(days=1)
@@ -0,0 +1,165 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..database import Base, get_db
+from ..models import SalesRollup, Sweet, User, UserRole
+from ..main import app
+from ..core.security import create_access_token
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_analytics.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    def override_get_db():
+        try:
+            yield db
+        finally:
+            pass
+    
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin_user(db):
+    from ..core.security import get_password_hash
+    user = User(
+        email="admin@example.com",
+        password=get_password_hash("admin123"),
+        role=UserRole.ADMIN
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def regular_user(db):
+    from ..core.security import get_password_hash
+    user = User(
+        email="user@example.com",
+        password=get_password_hash("user123"),
+        role=UserRole.USER
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def admin_token(admin_user):
+    return create_access_token(data={"sub": admin_user.email, "role": admin_user.role.value})
+
+
+@pytest.fixture
+def user_token(regular_user):
+    return create_access_token(data={"sub": regular_user.email, "role": regular_user.role.value})
+
+
+def _buy(client, token, sweet_id, quantity):
+    response = client.post(
+        f"/api/sweets/{sweet_id}/purchase",
+        json={"quantity": quantity},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def sales(db, client, user_token):
+    sweets = [
+        Sweet(name="Ladoo", category="Indian", price=2.0, quantity=100),
+        Sweet(name="Barfi", category="Indian", price=3.0, quantity=100),
+        Sweet(name="Toffee", category="Candy", price=0.5, quantity=100),
+    ]
+    db.add_all(sweets)
+    db.commit()
+    ladoo, barfi, toffee = (sweet.id for sweet in sweets)
+    _buy(client, user_token, ladoo, 5)
+    _buy(client, user_token, barfi, 2)
+    _buy(client, user_token, toffee, 20)
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [{"sweet_id": ladoo, "quantity": 1}, {"sweet_id": toffee, "quantity": 4}]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 200
+    return ladoo, barfi, toffee
+
+
+def test_analytics_answer_from_rollups(client, admin_token, sales):
+    ladoo, barfi, toffee = sales
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    
+    categories = client.get("/api/analytics/revenue-by-category", headers=headers).json()
+    assert categories == [
+        {"category": "Indian", "units": 8, "revenue": 18.0},
+        {"category": "Candy", "units": 24, "revenue": 12.0},
+    ]
+    
+    by_units = client.get("/api/analytics/top-sellers", params={"limit": 2}, headers=headers).json()
+    assert [(row["name"], row["units"]) for row in by_units] == [("Toffee", 24), ("Ladoo", 6)]
+    by_revenue = client.get("/api/analytics/top-sellers", params={"by": "revenue"}, headers=headers).json()
+    assert [row["sweet_id"] for row in by_revenue] == [ladoo, toffee, barfi]
+    
+    curve = client.get("/api/analytics/sales", headers=headers).json()
+    assert sum(point["units"] for point in curve) == 32
+    assert sum(point["revenue"] for point in curve) == 30.0
+    candy = client.get("/api/analytics/sales", params={"granularity": "day", "category": "Candy"}, headers=headers).json()
+    assert [point["units"] for point in candy] == [24]
+
+
+def test_sales_curve_accepts_bounds_with_an_offset(client, admin_token, sales):
+    from datetime import datetime, timedelta
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    start = (datetime.utcnow() - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    curve = client.get("/api/analytics/sales", params={"start": start}, headers=headers)
+    assert curve.status_code == 200
+    assert sum(point["units"] for point in curve.json()) == 32
+    # An end one hour from now, written in UTC+1
+    later = (datetime.utcnow() + timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%S+01:00")
+    curve = client.get("/api/analytics/sales", params={"start": start, "end": later}, headers=headers)
+    assert sum(point["units"] for point in curve.json()) == 32
+    empty = client.get("/api/analytics/sales", params={"end": start}, headers=headers)
+    assert empty.json() == []
+
+
+def test_backfill_rebuilds_rollups_from_movements(db, client, admin_token, sales):
+    from .service import backfill_rollups
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    before = client.get("/api/analytics/top-sellers", headers=headers).json()
+    
+    db.query(SalesRollup).delete()
+    db.commit()
+    assert client.get("/api/analytics/top-sellers", headers=headers).json() == []
+    
+    assert backfill_rollups(db, chunk_size=2) == 5
+    assert client.get("/api/analytics/top-sellers", headers=headers).json() == before
+    # Rebuilding is idempotent
+    backfill_rollups(db)
+    assert client.get("/api/analytics/top-sellers", headers=headers).json() == before
+
+
+def test_analytics_require_admin(client, user_token):
+    response = client.get("/api/analytics/top-sellers", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
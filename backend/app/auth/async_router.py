@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
+from ..core.sql_tracker import query_budget
+from ..schemas import UserRegister, UserResponse, Token
+from .async_service import register_user, authenticate_user
+from .service import create_user_token
+
+router = APIRouter()
+
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[query_budget(3)])
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    return await register_user(db, user_data)
+
+
+@router.post("/login", response_model=Token, dependencies=[query_budget(1)])
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_user(db, form_data.username, form_data.password)
+    return create_user_token(user)
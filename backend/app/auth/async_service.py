@@ -0,0 +1,55 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from typing import Optional
+from ..models import User, UserRole
+from ..schemas import UserRegister, UserResponse
+from ..core.security import get_password_hash_async, verify_password_async
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return (await db.execute(select(User).where(User.email == email))).scalars().first()
+
+
+async def register_user(db: AsyncSession, user_data: UserRegister) -> UserResponse:
+    # Check if user already exists
+    existing_user = await get_user_by_email(db, user_data.email)
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
+    # Create new user
+    hashed_password = await get_password_hash_async(user_data.password)
+    db_user = User(
+        email=user_data.email,
+        password=hashed_password,
+        role=UserRole.USER
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    
+    return UserResponse(
+        id=db_user.id,
+        email=db_user.email,
+        role=db_user.role
+    )
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+    user = await get_user_by_email(db, email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+    
+    if not await verify_password_async(password, user.password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+    
+    return user
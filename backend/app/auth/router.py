@@ -2,22 +2,23 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from ..database import get_db
+from ..core.sql_tracker import query_budget
 from ..schemas import UserRegister, UserResponse, Token
 from .service import register_user, authenticate_user, create_user_token
 
 router = APIRouter()
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    return register_user(db, user_data)
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[query_budget(3)])
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+    return await register_user(db, user_data)
 
 
-@router.post("/login", response_model=Token)
-def login(
+@router.post("/login", response_model=Token, dependencies=[query_budget(1)])
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     return create_user_token(user)
 
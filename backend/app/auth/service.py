@@ -1,14 +1,29 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 from ..models import User, UserRole
 from ..schemas import UserRegister, UserResponse
-from ..core.security import get_password_hash, verify_password, create_access_token
+from ..core.security import get_password_hash_async, verify_password_async, create_access_token
 from datetime import timedelta
 
 
-def register_user(db: Session, user_data: UserRegister) -> UserResponse:
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _save_user(db: Session, db_user: User) -> User:
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+# Database work runs in the request threadpool and bcrypt in the dedicated
+# password pool, so neither blocks the event loop.
+async def register_user(db: Session, user_data: UserRegister) -> UserResponse:
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(get_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -16,15 +31,13 @@ def register_user(db: Session, user_data: UserRegister) -> UserResponse:
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         password=hashed_password,
         role=UserRole.USER
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db_user = await run_in_threadpool(_save_user, db, db_user)
     
     return UserResponse(
         id=db_user.id,
@@ -33,15 +46,15 @@ def register_user(db: Session, user_data: UserRegister) -> UserResponse:
     )
 
 
-def authenticate_user(db: Session, email: str, password: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: Session, email: str, password: str) -> User:
+    user = await run_in_threadpool(get_user_by_email, db, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -93,3 +93,92 @@ def test_login_fail_user_not_found(client):
     )
     assert response.status_code == 401
 
+
+
+def test_authenticated_requests_reuse_cached_principal(client, db):
+    from ..core.dependencies import invalidate_principal, principal_cache
+    from ..models import User, UserRole
+    
+    client.post(
+        "/api/auth/register",
+        json={"email": "test@example.com", "password": "testpass123"}
+    )
+    token = client.post(
+        "/api/auth/login",
+        data={"username": "test@example.com", "password": "testpass123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    before = principal_cache.stats()
+    assert client.get("/api/sweets", headers=headers).status_code == 200
+    assert client.get("/api/sweets", headers=headers).status_code == 200
+    after = principal_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    
+    # Role changes take effect once the cached principal is invalidated
+    sweet = {"name": "Ladoo", "category": "Indian", "price": 2.0, "quantity": 1}
+    assert client.post("/api/sweets", json=sweet, headers=headers).status_code == 403
+    user = db.query(User).filter(User.email == "test@example.com").one()
+    user.role = UserRole.ADMIN
+    db.commit()
+    assert client.post("/api/sweets", json=sweet, headers=headers).status_code == 403
+    invalidate_principal("test@example.com")
+    assert client.post("/api/sweets", json=sweet, headers=headers).status_code == 201
+
+
+def test_principal_cache_evicts_and_expires():
+    from ..core.cache import TTLCache
+    
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    
+    expired = TTLCache(maxsize=2, ttl=0)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_login_hashes_on_password_pool(client):
+    from ..core.security import password_pool
+    
+    before = password_pool.stats()["completed"]
+    client.post(
+        "/api/auth/register",
+        json={"email": "test@example.com", "password": "testpass123"}
+    )
+    client.post(
+        "/api/auth/login",
+        data={"username": "test@example.com", "password": "testpass123"}
+    )
+    after = password_pool.stats()
+    assert after["completed"] - before == 2
+    assert after["pending"] == 0
+
+
+def test_password_pool_sheds_load_when_saturated():
+    import asyncio
+    import threading
+    from fastapi import HTTPException
+    from ..core.security import PasswordHashPool
+    
+    pool = PasswordHashPool(workers=1, max_pending=1)
+    release = threading.Event()
+    
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as exc_info:
+            await pool.run(len, "x")
+        release.set()
+        await first
+        return exc_info.value
+    
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["completed"] == 1
@@ -0,0 +1,45 @@
+import logging
+import time
+from typing import Callable
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from .database import Base
+from .models import User
+from .sweets.search import ensure_search_index
+from .sweets.service import get_sweet_rows_page, search_sweet_rows
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(engine: Engine) -> None:
+    """Creates missing tables and the search index. Run once per deploy
+    (migrate.py, serve.py) rather than in every worker: concurrent DDL from
+    several workers races, and on SQLite it contends for the write lock."""
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+
+
+def warm_up(engine: Engine, session_factory: Callable[[], Session]) -> float:
+    """Opens the connection pool and runs the hot read paths once, so the
+    first requests skip connecting, statement compilation and cold pages.
+    Returns the seconds spent; failures are logged, not raised."""
+    started = time.perf_counter()
+    try:
+        # Checked out together so the pool ends up holding pool_size connections
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = [engine.connect() for _ in range(size)]
+        for connection in connections:
+            connection.close()
+
+        db = session_factory()
+        try:
+            get_sweet_rows_page(db, limit=50)
+            get_sweet_rows_page(db, limit=50, order_by="name")
+            search_sweet_rows(db, "sweet", limit=20)
+            db.execute(select(User.id, User.email, User.role).where(User.email == "")).first()
+        finally:
+            db.close()
+    except Exception as exc:
+        logger.warning("Warm-up failed (has the database been migrated?): %s", exc)
+    return time.perf_counter() - started
@@ -0,0 +1,119 @@
+import codecs
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, UploadFile, status
+from pydantic import ValidationError
+from ..schemas import BulkResult, BulkRowError
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+# (line number, parsed record or None, parse error or None)
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(upload: UploadFile, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    filename = (upload.filename or "").lower()
+    content_type = (upload.content_type or "").lower()
+    if filename.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if filename.endswith((".ndjson", ".jsonl", ".json")) or "json" in content_type:
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Could not detect upload format, pass format=csv or format=ndjson"
+    )
+
+
+def _check_encoding(upload: UploadFile) -> None:
+    # Decoding errors would otherwise surface mid-import, after earlier
+    # batches committed; one pass over the spooled file rejects the upload
+    # up front without holding it in memory.
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    line = 1
+    try:
+        for chunk in iter(lambda: upload.file.read(64 * 1024), b""):
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError as exc:
+                line += chunk[:max(exc.start, 0)].count(b"\n")
+                raise
+            line += chunk.count(b"\n")
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload is not valid UTF-8 (line {line}); re-save the file as UTF-8"
+        )
+    finally:
+        upload.file.seek(0)
+
+
+def _iter_lines(upload: UploadFile) -> Iterator[str]:
+    # The upload is spooled to disk by Starlette; decoding line by line keeps
+    # only the current line in memory.
+    return codecs.getreader("utf-8-sig")(upload.file)
+
+
+def iter_records(upload: UploadFile, fmt: str) -> Iterator[Record]:
+    _check_encoding(upload)
+    if fmt == "csv":
+        reader = csv.DictReader(_iter_lines(upload))
+        for row in reader:
+            # Empty cells fall back to the schema defaults
+            record = {key: value for key, value in row.items() if key and value != ""}
+            yield reader.line_num, record, None
+        return
+
+    for line_no, line in enumerate(_iter_lines(upload), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def encode_rows(rows: Iterable[Sequence[Any]], fields: Sequence[str], fmt: str, header: bool = True) -> str:
+    # Same formats as the import, so an export can be imported again
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if header:
+            writer.writerow(fields)
+        writer.writerows(rows)
+        return buffer.getvalue()
+    return "".join(json.dumps(dict(zip(fields, row))) + "\n" for row in rows)
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+
+def add_error(result: BulkResult, line: int, error: str) -> None:
+    result.failed += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(BulkRowError(line=line, error=error))
@@ -0,0 +1,306 @@
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# memory:// keeps entries in this process; redis://host:6379/0 (or rediss://,
+# unix://) shares them between workers and nodes and needs the redis package.
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "sweetshop:")
+# After a Redis error, skip Redis for this long instead of waiting on its
+# timeouts in every request
+CACHE_RETRY_SECONDS = float(os.getenv("CACHE_RETRY_SECONDS", "5"))
+DEFAULT_NAMESPACE_SIZE = 1024
+
+
+# Thread-safe LRU cache whose entries also expire after ``ttl`` seconds
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        # Stores value only if key has no live entry
+        now = time.monotonic()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+# Max entries the in-memory backend keeps per namespace, declared by the
+# Cache instances below
+_namespace_sizes: Dict[str, int] = {}
+
+
+class CacheBackend(ABC):
+    """Byte-string store behind every Cache, with keys grouped in namespaces.
+
+    A backend that cannot be reached behaves like an empty cache: reads miss
+    and writes are dropped (set returns False), so requests fall through to
+    the database.
+    """
+
+    # Whether other processes see the same entries
+    shared = False
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        ...
+
+    @abstractmethod
+    def add(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, namespace: str) -> None:
+        ...
+
+    def size(self, namespace: str) -> Optional[int]:
+        return None
+
+
+class MemoryBackend(CacheBackend):
+    """One LRU per namespace in this process. Only coherent with a single worker."""
+
+    def __init__(self):
+        self._caches: Dict[str, TTLCache] = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, namespace: str) -> TTLCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(
+                    namespace,
+                    TTLCache(maxsize=_namespace_sizes.get(namespace, DEFAULT_NAMESPACE_SIZE), ttl=float("inf"))
+                )
+        return cache
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._cache(namespace).get(key)
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        self._cache(namespace).set(key, value, ttl)
+        return True
+
+    def add(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return self._cache(namespace).add(key, value, ttl)
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._cache(namespace).invalidate(key)
+
+    def clear(self, namespace: str) -> None:
+        self._cache(namespace).clear()
+
+    def size(self, namespace: str) -> Optional[int]:
+        return len(self._cache(namespace))
+
+
+class RedisBackend(CacheBackend):
+    """Entries in Redis, shared by every worker pointed at the same server.
+
+    Takes any client with redis-py's get/set/delete/scan_iter, e.g.
+    ``redis.Redis`` or ``fakeredis.FakeRedis``. Eviction under memory
+    pressure is left to the server's maxmemory policy. After an error every
+    call is answered as a miss for ``retry_after`` seconds without touching
+    the server.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = CACHE_PREFIX,
+        errors: Tuple[type, ...] = (OSError,),
+        retry_after: float = CACHE_RETRY_SECONDS
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.errors = errors
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = CACHE_PREFIX) -> "RedisBackend":
+        import redis  # optional; only needed for a redis:// CACHE_URL
+        # Short timeouts: a slow cache must not hold requests longer than the query it saves
+        client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        return cls(client, prefix, errors=(redis.RedisError, OSError))
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, operation: str, exc: Exception) -> None:
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning("Cache %s failed, treating as a miss for %g s: %s", operation, self.retry_after, exc)
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        if not self._available():
+            return None
+        try:
+            return self.client.get(self._key(namespace, key))
+        except self.errors as exc:
+            self._failed("get", exc)
+            return None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        if not self._available():
+            return False
+        try:
+            self.client.set(self._key(namespace, key), value, px=int(ttl * 1000) if ttl else None)
+            return True
+        except self.errors as exc:
+            self._failed("set", exc)
+            return False
+
+    def add(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        if not self._available():
+            return False
+        try:
+            return bool(self.client.set(self._key(namespace, key), value, nx=True, px=int(ttl * 1000) if ttl else None))
+        except self.errors as exc:
+            self._failed("add", exc)
+            return False
+
+    def delete(self, namespace: str, key: str) -> None:
+        if not self._available():
+            return
+        try:
+            self.client.delete(self._key(namespace, key))
+        except self.errors as exc:
+            self._failed("delete", exc)
+
+    def clear(self, namespace: str) -> None:
+        if not self._available():
+            return
+        try:
+            batch = []
+            for key in self.client.scan_iter(match=self._key(namespace, "*"), count=500):
+                batch.append(key)
+                if len(batch) == 500:
+                    self.client.delete(*batch)
+                    batch = []
+            if batch:
+                self.client.delete(*batch)
+        except self.errors as exc:
+            self._failed("clear", exc)
+
+
+def create_backend(url: str) -> CacheBackend:
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+cache_backend = create_backend(CACHE_URL)
+
+
+def get_cache_backend() -> CacheBackend:
+    return cache_backend
+
+
+def configure_cache(backend: CacheBackend) -> CacheBackend:
+    global cache_backend
+    cache_backend = backend
+    return backend
+
+
+class Cache:
+    """One namespace of the configured backend, with this process's hit and
+    miss counts. The backend is looked up on every call, so
+    configure_cache applies to caches created at import."""
+
+    def __init__(self, namespace: str, maxsize: int, ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        _namespace_sizes[namespace] = maxsize
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = cache_backend.get(self.namespace, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return cache_backend.set(self.namespace, key, value, self.ttl if ttl is None else ttl)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return cache_backend.add(self.namespace, key, value, self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key: str) -> None:
+        cache_backend.delete(self.namespace, key)
+
+    def clear(self) -> None:
+        cache_backend.clear(self.namespace)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {"hits": self.hits, "misses": self.misses, "size": cache_backend.size(self.namespace)}
@@ -1,39 +1,70 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from ..database import get_db
+from ..database import get_async_db, get_db
 from ..models import User, UserRole
+from ..schemas import UserResponse
+from .cache import Cache
+from .metrics import time_stage
 from .security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Resolved principals keyed by token subject, as UserResponse JSON. With a
+# shared cache backend invalidate_principal reaches every worker; the TTL
+# bounds how long a change that skips it (e.g. create_admin.py) goes unnoticed.
+PRINCIPAL_CACHE_SIZE = 10000
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+principal_cache = Cache("principal", maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+
+def invalidate_principal(email: str) -> None:
+    principal_cache.invalidate(email)
+
+
+@event.listens_for(User.__table__, "before_drop")
+def _clear_principal_cache(target, connection, **kw):
+    principal_cache.clear()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    payload = decode_access_token(token)
+
+
+def _token_subject(token: str) -> str:
+    with time_stage("auth_token"):
+        payload = decode_access_token(token)
     email: str = payload.get("sub")
     if email is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    
-    return user
+        raise _credentials_exception()
+    return email
 
 
-def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+def _principal_query(email: str):
+    return select(User.id, User.email, User.role).where(User.email == email)
+
+
+def _cached_principal(email: str) -> Optional[UserResponse]:
+    cached = principal_cache.get(email)
+    return UserResponse.model_validate_json(cached) if cached is not None else None
+
+
+def _remember_principal(email: str, row) -> UserResponse:
+    if row is None:
+        raise _credentials_exception()
+    principal = UserResponse(id=row.id, email=row.email, role=row.role)
+    principal_cache.set(email, principal.model_dump_json().encode())
+    return principal
+
+
+def _require_admin(current_user: UserResponse) -> UserResponse:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -41,3 +72,38 @@ def get_current_admin_user(
         )
     return current_user
 
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> UserResponse:
+    email = _token_subject(token)
+    with time_stage("auth_principal"):
+        principal = _cached_principal(email)
+        if principal is not None:
+            return principal
+        return _remember_principal(email, db.execute(_principal_query(email)).first())
+
+
+def get_current_admin_user(
+    current_user: UserResponse = Depends(get_current_user)
+) -> UserResponse:
+    return _require_admin(current_user)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> UserResponse:
+    email = _token_subject(token)
+    with time_stage("auth_principal"):
+        principal = _cached_principal(email)
+        if principal is not None:
+            return principal
+        return _remember_principal(email, (await db.execute(_principal_query(email))).first())
+
+
+async def get_current_admin_user_async(
+    current_user: UserResponse = Depends(get_current_user_async)
+) -> UserResponse:
+    return _require_admin(current_user)
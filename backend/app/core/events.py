@@ -0,0 +1,90 @@
+import os
+import secrets
+import threading
+from typing import Callable, List, NamedTuple, Optional
+from sqlalchemy import event
+from ..models import Sweet
+from .cache import Cache, get_cache_backend
+
+
+class CatalogEvent(NamedTuple):
+    version: int
+    kind: str
+    sweet_id: Optional[int] = None
+    quantity: Optional[int] = None
+
+
+_lock = threading.Lock()
+_version = 0
+_subscribers: List[Callable[[CatalogEvent], None]] = []
+
+# The cache version is a random token in the cache backend rather than a
+# counter: every worker sharing the backend sees the same one, and a token
+# lost to eviction or a restart is replaced by one no old entry was keyed by.
+CATALOG_VERSION_KEY = "version"
+# On a shared backend the token also expires on its own, so a write whose
+# bump never reached it (e.g. Redis was briefly down) leaves other workers
+# serving older entries for at most this long. A local backend cannot miss
+# a bump, and its token lives until the next change.
+CATALOG_VERSION_TTL_SECONDS = float(os.getenv("CATALOG_VERSION_TTL_SECONDS", "60"))
+_catalog_state = Cache("catalog", maxsize=1)
+# Set while this process has a write whose bump failed
+_bump_failed = False
+
+
+def _version_ttl() -> Optional[float]:
+    return CATALOG_VERSION_TTL_SECONDS if get_cache_backend().shared else None
+
+
+def catalog_version() -> int:
+    # Sequence number of this process's change events
+    return _version
+
+
+def catalog_cache_version() -> Optional[str]:
+    """Version cached catalog reads are keyed by, or None if the cache backend
+    is unavailable (nothing should be cached then)."""
+    if _bump_failed and not _bump_version():
+        # Until the bump lands, cached entries may predate this process's writes
+        return None
+    token = _catalog_state.get(CATALOG_VERSION_KEY)
+    if token is None:
+        _catalog_state.add(CATALOG_VERSION_KEY, secrets.token_hex(8).encode(), _version_ttl())
+        token = _catalog_state.get(CATALOG_VERSION_KEY)
+    return token.decode() if token is not None else None
+
+
+def _bump_version() -> bool:
+    global _bump_failed
+    _bump_failed = not _catalog_state.set(CATALOG_VERSION_KEY, secrets.token_hex(8).encode(), _version_ttl())
+    return not _bump_failed
+
+
+def publish_catalog_change(kind: str, sweet_id: Optional[int] = None, quantity: Optional[int] = None) -> CatalogEvent:
+    # Called by the sweets and inventory services after a successful commit
+    global _version
+    _bump_version()
+    with _lock:
+        _version += 1
+        change = CatalogEvent(_version, kind, sweet_id, quantity)
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        callback(change)
+    return change
+
+
+def subscribe(callback: Callable[[CatalogEvent], None]) -> None:
+    with _lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback: Callable[[CatalogEvent], None]) -> None:
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+@event.listens_for(Sweet.__table__, "after_create")
+@event.listens_for(Sweet.__table__, "before_drop")
+def _reset_catalog(target, connection, **kw):
+    publish_catalog_change("reset")
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from .cache import Cache
+from .events import catalog_cache_version
+from .metrics import time_stage
+
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+
+class CacheSlot(NamedTuple):
+    key: str
+    version: Optional[str]
+    etag: Optional[str]
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip() for value in header.split(",")]
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+class CatalogResponseCache:
+    # Pre-serialised JSON bodies of catalog reads, keyed by catalog version,
+    # path and query string. Each entry is the headers as a JSON line, then
+    # the body. Versions are shared through the cache backend, so are ETags.
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self._entries = Cache("catalog_response", maxsize=maxsize, ttl=ttl)
+
+    def stats(self) -> Dict[str, int]:
+        return self._entries.stats()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def lookup(self, request: Request) -> Tuple[Optional[Response], CacheSlot]:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()
+        version = catalog_cache_version()
+        if version is None:
+            return None, CacheSlot(digest, None, None)
+        slot = CacheSlot(f"{version}:{digest}", version, f'"{version}-{digest[:16]}"')
+
+        if _etag_matches(request.headers.get("if-none-match"), slot.etag):
+            return Response(status_code=304, headers={"ETag": slot.etag}), slot
+        entry = self._entries.get(slot.key)
+        if entry is not None:
+            headers, _, body = entry.partition(b"\n")
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers={**json.loads(headers), "ETag": slot.etag}
+            ), slot
+        return None, slot
+
+    def store(self, slot: CacheSlot, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+        # The slot carries the version read before the query ran, so a write
+        # that lands meanwhile leaves this entry already outdated. Content
+        # may also be JSON that is already encoded to bytes.
+        headers = headers or {}
+        response_headers = {**headers, "ETag": slot.etag} if slot.version is not None else headers
+        if isinstance(content, bytes):
+            response = Response(content=content, media_type="application/json", headers=response_headers)
+        else:
+            with time_stage("serialize"):
+                response = JSONResponse(content=jsonable_encoder(content), headers=response_headers)
+        if slot.version is not None:
+            self._entries.set(slot.key, json.dumps(headers).encode() + b"\n" + response.body)
+        return response
+
+
+catalog_cache = CatalogResponseCache()
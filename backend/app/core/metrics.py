@@ -0,0 +1,327 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus text exposition (format 0.0.4) without the prometheus_client
+# dependency. Label values are passed as tuples in labelnames order, and every
+# update is a dict lookup and an add under one lock, so the hooks below are
+# cheap enough to leave on in production.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes", "on")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def time(self, labels: Labels = ()) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    # A plain class: generator-based context managers cost several times more
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> bool:
+        self.histogram.observe(self.labels, time.perf_counter() - self.started)
+        return False
+
+
+# (name, kind, help, [(labelnames, labelvalues, value)]) read at scrape time
+Collector = Callable[[], Iterator[Tuple[str, str, str, List[Tuple[Sequence[str], Sequence[str], float]]]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(
+                    f"{name}{_format_labels(labelnames, values)} {_format_value(value)}"
+                    for labelnames, values, value in samples
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "sweetshop_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+REQUESTS = registry.register(Counter(
+    "sweetshop_http_requests_total", "HTTP responses by route and status code", ("method", "route", "status")
+))
+IN_FLIGHT = registry.register(Gauge(
+    "sweetshop_http_requests_in_flight", "HTTP requests currently being served", ("method",)
+))
+STAGE_LATENCY = registry.register(Histogram(
+    "sweetshop_stage_duration_seconds", "Time spent in instrumented request stages", ("stage",)
+))
+STATEMENT_LATENCY = registry.register(Histogram(
+    "sweetshop_db_statement_duration_seconds", "SQL statement execution time by operation", ("operation",)
+))
+STATEMENT_ERRORS = registry.register(Counter(
+    "sweetshop_db_statement_errors_total", "SQL statements that raised, by operation", ("operation",)
+))
+
+
+def time_stage(stage: str):
+    # Context manager; a no-op when metrics are disabled
+    if not METRICS_ENABLED:
+        return nullcontext()
+    return STAGE_LATENCY.time((stage,))
+
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def _operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else ""
+    return verb if verb in _OPERATIONS else "OTHER"
+
+
+# Called as observer(statement, parameters, context, seconds) after every
+# statement on an instrumented engine, see core/sql_tracker.py
+StatementObserver = Callable[[str, Any, Any, float], None]
+_statement_observers: List[StatementObserver] = []
+
+
+def add_statement_observer(observer: StatementObserver) -> None:
+    _statement_observers.append(observer)
+
+
+def _run_timed(statement: str, parameters: Any, context: Any, execute: Callable, *args) -> None:
+    # Failed statements are timed too, and also counted as errors
+    started = time.perf_counter()
+    try:
+        execute(*args)
+    except Exception:
+        if METRICS_ENABLED:
+            STATEMENT_ERRORS.inc((_operation(statement),))
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if METRICS_ENABLED:
+            STATEMENT_LATENCY.observe((_operation(statement),), elapsed)
+        for observer in _statement_observers:
+            observer(statement, parameters, context, elapsed)
+
+
+def _execute(cursor, statement, parameters, context):
+    _run_timed(statement, parameters, context, context.dialect.do_execute, cursor, statement, parameters, context)
+    return True
+
+
+def _execute_no_params(cursor, statement, context):
+    _run_timed(statement, None, context, context.dialect.do_execute_no_params, cursor, statement, context)
+    return True
+
+
+def _executemany(cursor, statement, parameters, context):
+    _run_timed(statement, parameters, context, context.dialect.do_executemany, cursor, statement, parameters, context)
+    return True
+
+
+_HOOKS = (("do_execute", _execute), ("do_execute_no_params", _execute_no_params), ("do_executemany", _executemany))
+
+
+def install_statement_hooks() -> None:
+    """Times every statement of every engine in the process (an executemany
+    counts once) for the metrics and the statement observers. Idempotent.
+
+    Hooks the dialects' do_execute events rather than before/after
+    cursor_execute: any Connection-level listener moves every execution onto
+    a slower path, which cost more than the timing itself in
+    benchmarks/bench_metrics.py. The listeners run the dialect's own
+    implementation, so dialect-specific execution is kept.
+    """
+    for name, hook in _HOOKS:
+        if not event.contains(Engine, name, hook):
+            event.listen(Engine, name, hook)
+
+
+def remove_statement_hooks() -> None:
+    for name, hook in _HOOKS:
+        if event.contains(Engine, name, hook):
+            event.remove(Engine, name, hook)
+
+
+def route_label(scope: dict) -> str:
+    # Starlette records the matched route, whose path is relative to the
+    # router it was included from; the literal prefix is taken from the
+    # request path, so the label is the full template with one value per route.
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    depth = template.count("/")
+    prefix = path.rsplit("/", depth)[0] if depth else path
+    return (prefix + template) or "/"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, in-flight requests and status
+    codes per route template. Streaming responses count until they end."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # The route is only known once routing has run inside the app, so
+        # in-flight requests are counted per method.
+        IN_FLIGHT.inc((method,))
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec((method,))
+            route = route_label(scope)
+            REQUEST_LATENCY.observe((method, route), time.perf_counter() - started)
+            REQUESTS.inc((method, route, str(status_code)))
@@ -0,0 +1,27 @@
+import base64
+import binascii
+import json
+from typing import Any, List
+from fastapi import HTTPException, status
+
+
+# Opaque keyset cursors: the last row's sort values as base64 JSON
+def encode_cursor(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        values = None
+    # Values are bound straight into the keyset comparison, so anything but
+    # the scalars encode_cursor writes is a tampered cursor
+    if not isinstance(values, list) or len(values) != size or not all(
+        isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
@@ -0,0 +1,40 @@
+import os
+from typing import Any, Iterable, List, Sequence
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+from .metrics import time_stage
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic-core's encoder is the fallback
+    orjson = None
+
+# Opt-in: list endpoints select plain row tuples and encode them straight to
+# bytes instead of building and re-validating a SweetResponse per row.
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "0").lower() in ("1", "true", "yes", "on")
+
+
+def fast_responses_enabled() -> bool:
+    return FAST_RESPONSES
+
+
+def dumps(content: Any) -> bytes:
+    with time_stage("serialize"):
+        if orjson is not None:
+            return orjson.dumps(content)
+        return to_json(content)
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[dict]:
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when installed, else pydantic-core.
+
+    Content must already be JSON-ready (dicts, lists and scalars); nothing is
+    validated or passed through jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
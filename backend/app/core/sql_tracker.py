@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+from contextvars import ContextVar
+from typing import Any, List, Optional
+from fastapi import Depends, Request
+from .metrics import add_statement_observer
+
+logger = logging.getLogger(__name__)
+
+# Per-request statement counts, Server-Timing headers and query budgets
+SQL_TRACKING = os.getenv("SQL_TRACKING", "1").lower() in ("1", "true", "yes", "on")
+# Statements slower than this are logged with their parameters and plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Requests over their declared query budget are logged; in strict mode (the
+# test suite turns it on in conftest.py) they fail with a 500 instead.
+STRICT_QUERY_BUDGETS = os.getenv("STRICT_QUERY_BUDGETS", "0").lower() in ("1", "true", "yes", "on")
+MAX_RECORDED_STATEMENTS = 50
+MAX_LOGGED_PARAMETERS = 500
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class SQLTracker:
+    """Statement count and database time of one request."""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.budget: Optional[int] = None
+        self.executed: List[str] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        if len(self.executed) < MAX_RECORDED_STATEMENTS:
+            self.executed.append(statement)
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.statements > self.budget
+
+    def budget_message(self) -> str:
+        return f"Query budget exceeded: {self.statements} statements, budget {self.budget}"
+
+
+# Set per request by SQLTrackingMiddleware. Sync endpoints and dependencies
+# run in the threadpool with a copy of the request's context, so every
+# session the request opens (primary, replica or async) reports here.
+_current: ContextVar[Optional[SQLTracker]] = ContextVar("sql_tracker", default=None)
+
+
+def current_tracker() -> Optional[SQLTracker]:
+    return _current.get()
+
+
+def query_budget(limit: int):
+    """Route dependency declaring how many statements the request may run,
+    e.g. ``dependencies=[query_budget(3)]``."""
+    def declare(request: Request) -> None:
+        tracker = _current.get()
+        if tracker is not None:
+            tracker.budget = limit
+    return Depends(declare)
+
+
+def explain(context: Any, statement: str, parameters: Any) -> Optional[str]:
+    if not statement.lstrip()[:6].upper().startswith(_EXPLAINABLE):
+        return None
+    if isinstance(parameters, list):
+        # executemany: the plan is the same for every parameter set
+        parameters = parameters[0] if parameters else ()
+    prefix = "EXPLAIN QUERY PLAN " if context.dialect.name == "sqlite" else "EXPLAIN "
+    # A separate cursor, since the slow statement's may still hold rows
+    cursor = context.root_connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters or ())
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as exc:
+        return f"unavailable ({exc})"
+    finally:
+        cursor.close()
+
+
+def _log_slow(context: Any, statement: str, parameters: Any, seconds: float) -> None:
+    shown = repr(parameters)
+    if len(shown) > MAX_LOGGED_PARAMETERS:
+        shown = shown[:MAX_LOGGED_PARAMETERS] + "..."
+    plan = explain(context, statement, parameters) if context is not None else None
+    logger.warning(
+        "Slow query (%.1f ms): %s\nparameters: %s\nplan:\n%s",
+        seconds * 1000, statement, shown, plan or "n/a"
+    )
+
+
+def _observe(statement: str, parameters: Any, context: Any, seconds: float) -> None:
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.record(statement, seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        _log_slow(context, statement, parameters, seconds)
+
+
+add_statement_observer(_observe)
+
+
+class SQLTrackingMiddleware:
+    """Gives every HTTP request a SQLTracker, reports it in a Server-Timing
+    header and checks the route's declared query budget."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = SQLTracker()
+        token = _current.set(tracker)
+        replaced = False
+
+        async def send_with_timing(message):
+            nonlocal replaced
+            if message["type"] == "http.response.start":
+                if tracker.over_budget():
+                    if STRICT_QUERY_BUDGETS:
+                        replaced = True
+                        await _send_budget_error(send, tracker)
+                        return
+                    logger.warning(
+                        "%s %s: %s\n%s", scope["method"], scope["path"],
+                        tracker.budget_message(), "\n".join(tracker.executed)
+                    )
+                timing = f'db;dur={tracker.seconds * 1000:.2f};desc="{tracker.statements} queries"'
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode())
+                ]}
+            elif replaced:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+async def _send_budget_error(send, tracker: SQLTracker) -> None:
+    body = json.dumps({"detail": tracker.budget_message(), "statements": tracker.executed}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 500,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
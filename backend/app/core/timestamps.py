@@ -0,0 +1,10 @@
+from datetime import datetime, timezone
+
+
+# Timestamps are stored as naive UTC (datetime.utcnow()); query parameters
+# may carry an offset ("...Z", "+05:30") and must be normalised before they
+# are compared with stored values or with utcnow().
+def naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
@@ -1,21 +1,244 @@
-from sqlalchemy import create_engine
+import hashlib
+import itertools
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from .core.cache import TTLCache
+from .core.metrics import METRICS_ENABLED, install_statement_hooks
+from .core.sql_tracker import SQL_TRACKING
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sweet_shop.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0").lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    url: str = "sqlite:///./sweet_shop.db"
+    # Read replicas for catalog reads; writes always go to url
+    replica_urls: List[str] = field(default_factory=list)
+    replica_strategy: str = "round_robin"
+    read_your_writes_seconds: float = 5.0
+    # Opt-in async mode (use_async=True) serves the API through AsyncSession
+    async_url: str = "sqlite+aiosqlite:///./sweet_shop.db"
+    use_async: bool = False
+    echo: bool = False
+    # Connection pool (server databases and file-backed SQLite)
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_pre_ping: bool = True
+    pool_recycle: int = 1800
+    # SQLite pragmas applied on every new connection
+    sqlite_pragmas: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        defaults = cls()
+        return cls(
+            url=os.getenv("DATABASE_URL", defaults.url),
+            replica_urls=[url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()],
+            replica_strategy=os.getenv("DATABASE_REPLICA_STRATEGY", defaults.replica_strategy),
+            read_your_writes_seconds=float(os.getenv("READ_YOUR_WRITES_SECONDS", defaults.read_your_writes_seconds)),
+            async_url=os.getenv("ASYNC_DATABASE_URL", defaults.async_url),
+            use_async=_env_bool("USE_ASYNC_DB", defaults.use_async),
+            echo=_env_bool("DB_ECHO", defaults.echo),
+            pool_size=int(os.getenv("DB_POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", defaults.pool_timeout)),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", defaults.pool_pre_ping),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", defaults.pool_recycle)),
+            sqlite_pragmas=_env_bool("SQLITE_PRAGMAS", defaults.sqlite_pragmas),
+            sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", defaults.sqlite_journal_mode),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", defaults.sqlite_synchronous),
+            sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", defaults.sqlite_busy_timeout_ms)),
+            sqlite_cache_size_kb=int(os.getenv("SQLITE_CACHE_SIZE_KB", defaults.sqlite_cache_size_kb)),
+            sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", defaults.sqlite_mmap_size)),
+        )
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url: str, settings: DatabaseSettings) -> dict:
+    parsed = make_url(url)
+    options = {"echo": settings.echo}
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.get_driver_name() in ("pysqlite", ""):
+            options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(parsed):
+            # An in-memory database lives in a single connection; keep the default pool
+            return options
+    else:
+        options["pool_pre_ping"] = settings.pool_pre_ping
+        options["pool_recycle"] = settings.pool_recycle
+    options["pool_size"] = settings.pool_size
+    options["max_overflow"] = settings.max_overflow
+    options["pool_timeout"] = settings.pool_timeout
+    return options
+
+
+def apply_sqlite_pragmas(engine: Engine, settings: DatabaseSettings) -> None:
+    if engine.dialect.name != "sqlite" or not settings.sqlite_pragmas:
+        return
+
+    # WAL lets readers run alongside the single writer; synchronous=NORMAL is
+    # durable across application crashes in WAL mode and avoids an fsync per commit.
+    pragmas = [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def build_engine(url: str, settings: DatabaseSettings) -> Engine:
+    engine = create_engine(url, **_engine_options(url, settings))
+    apply_sqlite_pragmas(engine, settings)
+    return engine
+
+
+settings = DatabaseSettings.from_env()
+
+# Statement timing for the metrics and per-request SQL tracking; with both
+# off, statements run without any hook
+if METRICS_ENABLED or SQL_TRACKING:
+    install_statement_hooks()
+
+SQLALCHEMY_DATABASE_URL = settings.url
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.async_url
+USE_ASYNC_DB = settings.use_async
+
+engine = build_engine(SQLALCHEMY_DATABASE_URL, settings)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Created on first use so the async driver is only required in async mode
+async_engine = None
+AsyncSessionLocal = None
+
+
+class ReplicaRouter:
+    def __init__(self, engines: List[Engine], strategy: str = "round_robin"):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.engines = engines
+        self.strategy = strategy
+        self._next = itertools.cycle(range(len(engines))) if engines else None
+        self._lock = threading.Lock()
+
+    def choose(self) -> Engine:
+        if self.strategy == "least_busy":
+            return min(self.engines, key=lambda engine: engine.pool.checkedout())
+        with self._lock:
+            return self.engines[next(self._next)]
+
 
-def get_db():
+replica_router = ReplicaRouter(
+    [build_engine(url, settings) for url in settings.replica_urls],
+    settings.replica_strategy
+)
+
+# Callers that committed on the primary recently read from the primary too,
+# so they see their own purchases before replication catches up.
+_recent_writers = TTLCache(maxsize=100000, ttl=settings.read_your_writes_seconds)
+
+
+def configure_replicas(urls: List[str], strategy: Optional[str] = None) -> ReplicaRouter:
+    global replica_router
+    for replica in replica_router.engines:
+        replica.dispose()
+    replica_router = ReplicaRouter(
+        [build_engine(url, settings) for url in urls],
+        strategy or settings.replica_strategy
+    )
+    _recent_writers.clear()
+    return replica_router
+
+
+def _caller_key(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session):
+    caller = session.info.get("caller")
+    if caller is not None:
+        _recent_writers.set(caller, True)
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["caller"] = _caller_key(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    # Without replicas (or right after this caller wrote) reads use the
+    # primary session, which is only connected if it is actually used.
+    if not replica_router.engines:
+        yield primary
+        return
+    key = _caller_key(request)
+    if key is not None and _recent_writers.get(key):
+        yield primary
+        return
+    db = Session(bind=replica_router.choose(), autoflush=False)
     try:
         yield db
     finally:
         db.close()
 
+
+def is_replica_session(db: Session) -> bool:
+    return db.get_bind() in replica_router.engines
+
+
+def get_async_engine():
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            **_engine_options(ASYNC_SQLALCHEMY_DATABASE_URL, settings)
+        )
+        apply_sqlite_pragmas(async_engine.sync_engine, settings)
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine, autoflush=False, expire_on_commit=False
+        )
+    return async_engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
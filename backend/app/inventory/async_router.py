@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ..database import get_async_db
+from ..core.dependencies import get_current_user_async, get_current_admin_user_async
+from ..core.sql_tracker import query_budget
+from ..schemas import (
+    BatchPurchaseRequest,
+    PurchaseRequest,
+    RestockRequest,
+    SweetResponse,
+    UserResponse
+)
+from .async_service import purchase_sweet, purchase_sweets_batch, restock_sweet
+
+router = APIRouter()
+
+
+@router.post("/purchase/batch", response_model=List[SweetResponse], dependencies=[query_budget(4)])
+async def purchase_batch_endpoint(
+    batch_data: BatchPurchaseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_user_async)
+):
+    return await purchase_sweets_batch(db, batch_data, current_user.id)
+
+
+@router.post("/{sweet_id}/purchase", response_model=SweetResponse, dependencies=[query_budget(4)])
+async def purchase_sweet_endpoint(
+    sweet_id: int,
+    purchase_data: PurchaseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_user_async)
+):
+    return await purchase_sweet(db, sweet_id, purchase_data, current_user.id)
+
+
+@router.post("/{sweet_id}/restock", response_model=SweetResponse, dependencies=[query_budget(3)])
+async def restock_sweet_endpoint(
+    sweet_id: int,
+    restock_data: RestockRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_admin_user_async)
+):
+    return await restock_sweet(db, sweet_id, restock_data, current_user.id)
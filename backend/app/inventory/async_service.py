@@ -0,0 +1,32 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..schemas import BatchPurchaseRequest, PurchaseRequest, RestockRequest, SweetResponse
+from . import service
+
+# Async counterparts of the inventory service, see sweets/async_service.py
+
+
+async def purchase_sweet(
+    db: AsyncSession,
+    sweet_id: int,
+    purchase_data: PurchaseRequest,
+    user_id: Optional[int] = None
+) -> SweetResponse:
+    return await db.run_sync(service.purchase_sweet, sweet_id, purchase_data, user_id)
+
+
+async def purchase_sweets_batch(
+    db: AsyncSession,
+    batch_data: BatchPurchaseRequest,
+    user_id: Optional[int] = None
+) -> List[SweetResponse]:
+    return await db.run_sync(service.purchase_sweets_batch, batch_data, user_id)
+
+
+async def restock_sweet(
+    db: AsyncSession,
+    sweet_id: int,
+    restock_data: RestockRequest,
+    user_id: Optional[int] = None
+) -> SweetResponse:
+    return await db.run_sync(service.restock_sweet, sweet_id, restock_data, user_id)
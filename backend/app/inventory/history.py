@@ -0,0 +1,157 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from ..models import InventoryMovement, StockSnapshot, Sweet
+from ..schemas import CompactionResult, MovementResponse, StockAtResponse
+from ..core.pagination import decode_cursor, encode_cursor
+from ..core.timestamps import naive_utc
+
+_movements = InventoryMovement.__table__
+
+
+def movement(
+    sweet_id: int,
+    delta: int,
+    kind: str,
+    user_id: Optional[int] = None,
+    unit_price: Optional[float] = None
+) -> Dict[str, Any]:
+    return {
+        "sweet_id": sweet_id,
+        "delta": delta,
+        "kind": kind,
+        "user_id": user_id,
+        "unit_price": unit_price,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def record_movements(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # Runs inside the caller's transaction, as one executemany
+    if rows:
+        db.execute(insert(_movements), rows)
+
+
+def _compacted_before(db: Session) -> Optional[datetime]:
+    return db.execute(select(func.min(StockSnapshot.as_of))).scalar_one()
+
+
+def _sum_deltas(db: Session, sweet_id: int, *conditions) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(_movements.c.delta), 0))
+        .where(_movements.c.sweet_id == sweet_id, *conditions)
+    ).scalar_one()
+
+
+def get_stock_at(db: Session, sweet_id: int, at: datetime) -> StockAtResponse:
+    at = naive_utc(at)
+    horizon = _compacted_before(db)
+    if horizon is not None and at < horizon:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Stock history before {horizon.isoformat()} has been compacted"
+        )
+
+    current = db.execute(select(Sweet.quantity).where(Sweet.id == sweet_id)).scalar_one_or_none()
+    snapshot = None
+    if horizon is not None:
+        snapshot = db.execute(
+            select(StockSnapshot.quantity).where(StockSnapshot.sweet_id == sweet_id)
+        ).scalar_one_or_none()
+    if current is None and snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet not found"
+        )
+
+    # Walk forward from the compacted snapshot or back from the current
+    # stock, whichever leaves the shorter stretch of history to sum.
+    now = datetime.utcnow()
+    if snapshot is not None and (current is None or at - horizon < now - at):
+        quantity = snapshot + _sum_deltas(
+            db, sweet_id, _movements.c.created_at > horizon, _movements.c.created_at <= at
+        )
+    else:
+        quantity = current - _sum_deltas(db, sweet_id, _movements.c.created_at > at)
+    return StockAtResponse(sweet_id=sweet_id, at=at, quantity=quantity)
+
+
+def get_movements_page(
+    db: Session,
+    sweet_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    after: Optional[str] = None
+) -> Tuple[List[MovementResponse], Optional[str]]:
+    # Pages are range scans of ix_inventory_movements_sweet_time in
+    # created_at order; the id only breaks ties between equal timestamps.
+    stmt = (
+        select(_movements)
+        .where(_movements.c.sweet_id == sweet_id)
+        .order_by(_movements.c.created_at, _movements.c.id)
+        .limit(limit + 1)
+    )
+    if start is not None:
+        stmt = stmt.where(_movements.c.created_at >= naive_utc(start))
+    if end is not None:
+        stmt = stmt.where(_movements.c.created_at < naive_utc(end))
+    if after is not None:
+        created_at, movement_id = decode_cursor(after, 2)
+        try:
+            boundary = (datetime.fromisoformat(created_at), int(movement_id))
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        stmt = stmt.where(tuple_(_movements.c.created_at, _movements.c.id) > boundary)
+
+    rows = db.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].created_at.isoformat(), rows[-1].id])
+    return [MovementResponse.model_validate(row._mapping) for row in rows], next_cursor
+
+
+def compact_movements(db: Session, before: datetime) -> CompactionResult:
+    """Folds movements up to ``before`` into one snapshot per sweet.
+
+    Stock at any time from ``before`` onwards stays exact; older history is
+    dropped along with the previous snapshots.
+    """
+    before = naive_utc(before)
+    if before > datetime.utcnow():
+        # Snapshots dated in the future would hide all history up to then
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot compact history that has not happened yet"
+        )
+    horizon = _compacted_before(db)
+    if horizon is not None and before <= horizon:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"History is already compacted up to {horizon.isoformat()}"
+        )
+    after_cutoff = (
+        select(_movements.c.sweet_id, func.sum(_movements.c.delta).label("delta"))
+        .where(_movements.c.created_at > before)
+        .group_by(_movements.c.sweet_id)
+        .subquery()
+    )
+    snapshots = [
+        {"sweet_id": row.id, "as_of": before, "quantity": row.quantity}
+        for row in db.execute(
+            select(Sweet.id, (Sweet.quantity - func.coalesce(after_cutoff.c.delta, 0)).label("quantity"))
+            .outerjoin(after_cutoff, after_cutoff.c.sweet_id == Sweet.id)
+        )
+    ]
+    db.execute(delete(StockSnapshot))
+    if snapshots:
+        db.execute(insert(StockSnapshot), snapshots)
+    pruned = db.execute(delete(_movements).where(_movements.c.created_at <= before)).rowcount
+    db.commit()
+    return CompactionResult(before=before, snapshots=len(snapshots), pruned=pruned)
@@ -0,0 +1,365 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from ..models import LedgerCheckpoint, Sweet
+from ..core.events import publish_catalog_change
+from ..analytics.service import record_sales, sales_from_movements
+from .history import movement, record_movements
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the single-process check is skipped there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Opt-in write-behind purchases for hot sweets, e.g. during a promotion:
+# PURCHASE_LEDGER_SWEETS=12,40 PURCHASE_LEDGER_JOURNAL=./purchase_ledger.journal
+PURCHASE_LEDGER_SWEETS = os.getenv("PURCHASE_LEDGER_SWEETS", "")
+PURCHASE_LEDGER_JOURNAL = os.getenv("PURCHASE_LEDGER_JOURNAL", "./purchase_ledger.journal")
+PURCHASE_LEDGER_FLUSH_MS = int(os.getenv("PURCHASE_LEDGER_FLUSH_MS", "50"))
+PURCHASE_LEDGER_FLUSH_OPS = int(os.getenv("PURCHASE_LEDGER_FLUSH_OPS", "500"))
+PURCHASE_LEDGER_FSYNC = os.getenv("PURCHASE_LEDGER_FSYNC", "0").lower() in ("1", "true", "yes", "on")
+
+
+class LedgerInUseError(RuntimeError):
+    pass
+
+
+class PurchaseLedger:
+    """Answers purchases of hot sweets from in-memory counters.
+
+    Every reservation is appended to a journal before it is acknowledged and
+    the net deltas are written to the database in micro-batches. Each batch
+    commits together with the journal sequence number it covers, so replaying
+    the journal after a crash applies exactly the entries the database is
+    missing.
+
+    Counters only see the purchases of their own process, so one process
+    runs the ledger on a journal: start() takes an exclusive lock on
+    lock_path and raises LedgerInUseError when another process holds it.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        journal_path: str,
+        flush_interval: float = PURCHASE_LEDGER_FLUSH_MS / 1000,
+        flush_ops: int = PURCHASE_LEDGER_FLUSH_OPS,
+        fsync: bool = PURCHASE_LEDGER_FSYNC,
+        lock_path: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.journal_path = journal_path
+        self.lock_path = lock_path or journal_path + ".lock"
+        self.flushing_path = journal_path + ".flushing"
+        self.name = os.path.basename(journal_path)
+        self.flush_interval = flush_interval
+        self.flush_ops = flush_ops
+        self.fsync = fsync
+        self.flushes = 0
+        self.oversold = 0
+        self._available: Dict[int, int] = {}
+        self._info: Dict[int, Tuple[str, str, float]] = {}
+        self._pending: Dict[int, int] = {}
+        self._pending_ops = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._journal = None
+        self._lock_file = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self, sweet_ids: Iterable[int]) -> "PurchaseLedger":
+        self._acquire_lock()
+        try:
+            self._seq = self.recover()
+        except Exception:
+            self._release_lock()
+            raise
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        with self._lock:
+            for sweet_id in sweet_ids:
+                self._available.setdefault(sweet_id, 0)
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="purchase-ledger", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._release_lock()
+
+    def _acquire_lock(self) -> None:
+        if fcntl is None:
+            return
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise LedgerInUseError(
+                f"{self.lock_path} is held by another process; the purchase ledger "
+                "must run in a single worker or its counters would oversell"
+            ) from None
+        self._lock_file = lock_file
+
+    def _release_lock(self) -> None:
+        if self._lock_file is not None:
+            # Closing the file releases the lock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                # close() performs the final flush
+                return
+            try:
+                self.flush()
+                self.refresh()
+            except Exception:
+                # Deltas stay pending and the journal keeps them; retry next tick
+                logger.exception("Purchase ledger flush failed")
+
+    # -- reservations --------------------------------------------------------
+
+    def tracks(self, sweet_id: int) -> bool:
+        return sweet_id in self._available
+
+    def snapshot(self, sweet_id: int) -> Tuple[int, str, str, float, int]:
+        name, category, price = self._info[sweet_id]
+        return sweet_id, name, category, price, self._available[sweet_id]
+
+    def reserve(self, requested: Dict[int, int]) -> Optional[Tuple[int, int]]:
+        """Reserves all lines or none. Returns (sweet_id, available) of the
+        first line that cannot be served, or None on success."""
+        with self._lock:
+            for sweet_id, quantity in requested.items():
+                available = self._available.get(sweet_id, 0)
+                if available < quantity:
+                    return sweet_id, available
+            self._journal_entries(requested.items())
+            for sweet_id, quantity in requested.items():
+                self._available[sweet_id] -= quantity
+                self._pending[sweet_id] = self._pending.get(sweet_id, 0) + quantity
+            self._pending_ops += len(requested)
+            if self._pending_ops >= self.flush_ops:
+                self._wake.set()
+        return None
+
+    def release(self, requested: Dict[int, int]) -> None:
+        # Undoes a reservation whose surrounding purchase failed
+        with self._lock:
+            self._journal_entries((sweet_id, -quantity) for sweet_id, quantity in requested.items())
+            for sweet_id, quantity in requested.items():
+                self._available[sweet_id] += quantity
+                self._pending[sweet_id] = self._pending.get(sweet_id, 0) - quantity
+
+    def _journal_entries(self, entries: Iterable[Tuple[int, int]]) -> None:
+        lines = []
+        for sweet_id, quantity in entries:
+            self._seq += 1
+            lines.append(f"{self._seq} {sweet_id} {quantity}\n")
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    # -- write-behind --------------------------------------------------------
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending and not os.path.exists(self.flushing_path):
+                    return 0
+                deltas = {sweet_id: delta for sweet_id, delta in self._pending.items() if delta}
+                last_seq = self._seq
+                self._pending = {}
+                self._pending_ops = 0
+                self._rotate_journal()
+            try:
+                applied = self._apply(deltas, last_seq)
+            except Exception:
+                with self._lock:
+                    for sweet_id, delta in deltas.items():
+                        self._pending[sweet_id] = self._pending.get(sweet_id, 0) + delta
+                raise
+            os.remove(self.flushing_path)
+            self.flushes += 1
+        for sweet_id, quantity in applied:
+            publish_catalog_change("purchase", sweet_id, quantity)
+        return len(applied)
+
+    def _rotate_journal(self) -> None:
+        # Entries up to last_seq move to the .flushing segment, which is only
+        # removed once the database holds them.
+        if self._journal is None:
+            return
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal.close()
+        if os.path.exists(self.flushing_path):
+            # A previous flush failed; keep its entries ahead of the new ones
+            with open(self.journal_path, encoding="utf-8") as current, \
+                    open(self.flushing_path, "a", encoding="utf-8") as flushing:
+                flushing.write(current.read())
+                flushing.flush()
+                os.fsync(flushing.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.flushing_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _apply(self, deltas: Dict[int, int], last_seq: int) -> List[Tuple[int, int]]:
+        applied = []
+        moves = []
+        categories = {}
+        with self.session_factory() as db:
+            for sweet_id, delta in deltas.items():
+                row = db.execute(
+                    update(Sweet)
+                    .where(Sweet.id == sweet_id, Sweet.quantity >= delta)
+                    .values(quantity=Sweet.quantity - delta)
+                    .returning(Sweet.id, Sweet.category, Sweet.price, Sweet.quantity)
+                    .execution_options(synchronize_session=False)
+                ).first()
+                removed = delta
+                if row is None:
+                    # A concurrent admin edit left less stock than was already
+                    # sold: take what is left and record only that
+                    current = db.execute(
+                        select(Sweet.quantity).where(Sweet.id == sweet_id).with_for_update()
+                    ).scalar_one_or_none()
+                    if current is None:
+                        continue
+                    row = db.execute(
+                        update(Sweet)
+                        .where(Sweet.id == sweet_id)
+                        .values(quantity=0)
+                        .returning(Sweet.id, Sweet.category, Sweet.price, Sweet.quantity)
+                        .execution_options(synchronize_session=False)
+                    ).first()
+                    removed = current
+                    self.oversold += delta - removed
+                    logger.warning("Purchase ledger oversold sweet %d by %d units", sweet_id, delta - removed)
+                applied.append((row.id, row.quantity))
+                if removed:
+                    # One aggregated movement per sweet and flush; buyers are not tracked
+                    moves.append(movement(row.id, -removed, "purchase", unit_price=row.price))
+                    categories[row.id] = row.category
+            record_movements(db, moves)
+            record_sales(db, sales_from_movements((move for move in moves if move["delta"] < 0), categories))
+            db.merge(LedgerCheckpoint(name=self.name, last_seq=last_seq))
+            db.commit()
+        return applied
+
+    def refresh(self) -> None:
+        # Re-reads stock so restocks and admin edits reach the counters
+        with self._lock:
+            sweet_ids = list(self._available)
+        if not sweet_ids:
+            return
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(Sweet.id, Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+                .where(Sweet.id.in_(sweet_ids))
+            ).all()
+        found = {row.id: row for row in rows}
+        with self._lock:
+            for sweet_id in sweet_ids:
+                row = found.get(sweet_id)
+                if row is None:
+                    # Deleted sweets fall back to the regular purchase path
+                    self._available.pop(sweet_id, None)
+                    self._info.pop(sweet_id, None)
+                    continue
+                self._info[sweet_id] = (row.name, row.category, row.price)
+                self._available[sweet_id] = max(row.quantity - self._pending.get(sweet_id, 0), 0)
+
+    def recover(self) -> int:
+        """Applies journal entries missing from the database and returns the
+        highest sequence number seen."""
+        with self.session_factory() as db:
+            checkpoint = db.get(LedgerCheckpoint, self.name)
+        applied_seq = checkpoint.last_seq if checkpoint else 0
+
+        deltas: Dict[int, int] = {}
+        last_seq = applied_seq
+        for path in (self.flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    parts = line.split()
+                    if len(parts) != 3:
+                        # Torn final write; that purchase was never acknowledged
+                        continue
+                    seq, sweet_id, quantity = (int(part) for part in parts)
+                    last_seq = max(last_seq, seq)
+                    if seq > applied_seq:
+                        deltas[sweet_id] = deltas.get(sweet_id, 0) + quantity
+
+        if last_seq > applied_seq:
+            logger.info("Replaying %d purchase ledger entries", last_seq - applied_seq)
+            self._apply({sweet_id: delta for sweet_id, delta in deltas.items() if delta}, last_seq)
+        for path in (self.flushing_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return last_seq
+
+
+purchase_ledger: Optional[PurchaseLedger] = None
+
+
+def start_purchase_ledger(
+    session_factory: Callable[[], Session],
+    sweet_ids: Iterable[int],
+    journal_path: str = PURCHASE_LEDGER_JOURNAL,
+    **options
+) -> PurchaseLedger:
+    global purchase_ledger
+    stop_purchase_ledger()
+    purchase_ledger = PurchaseLedger(session_factory, journal_path, **options).start(sweet_ids)
+    return purchase_ledger
+
+
+def start_purchase_ledger_from_env(session_factory: Callable[[], Session]) -> Optional[PurchaseLedger]:
+    sweet_ids = [int(value) for value in PURCHASE_LEDGER_SWEETS.split(",") if value.strip()]
+    if not sweet_ids:
+        return None
+    # WORKER_ID gives each instance its own journal and checkpoint; a
+    # replacement started with the same id replays what its predecessor left
+    worker_id = os.getenv("WORKER_ID", "")
+    journal_path = f"{PURCHASE_LEDGER_JOURNAL}.{worker_id}" if worker_id else PURCHASE_LEDGER_JOURNAL
+    return start_purchase_ledger(
+        session_factory, sweet_ids, journal_path, lock_path=PURCHASE_LEDGER_JOURNAL + ".lock"
+    )
+
+
+def stop_purchase_ledger() -> None:
+    global purchase_ledger
+    if purchase_ledger is not None:
+        purchase_ledger.close()
+        purchase_ledger = None
+
+
+def active_ledger() -> Optional[PurchaseLedger]:
+    return purchase_ledger
@@ -1,30 +1,100 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, Query, Response, UploadFile
 from sqlalchemy.orm import Session
+from typing import List, Optional
 from ..database import get_db
 from ..core.dependencies import get_current_user, get_current_admin_user
-from ..models import User
-from ..schemas import PurchaseRequest, RestockRequest, SweetResponse
-from .service import purchase_sweet, restock_sweet
+from ..core.sql_tracker import query_budget
+from ..schemas import (
+    BatchPurchaseRequest,
+    BulkResult,
+    CompactionResult,
+    MovementResponse,
+    PurchaseRequest,
+    RestockRequest,
+    StockAtResponse,
+    SweetResponse,
+    UserResponse
+)
+from ..core.bulk import DEFAULT_BATCH_SIZE, detect_format, iter_records
+from .history import compact_movements, get_movements_page, get_stock_at
+from .service import purchase_sweet, purchase_sweets_batch, restock_sweet, restock_sweets_batch
 
 router = APIRouter()
 
 
-@router.post("/{sweet_id}/purchase", response_model=SweetResponse)
+@router.post("/purchase/batch", response_model=List[SweetResponse], dependencies=[query_budget(4)])
+def purchase_batch_endpoint(
+    batch_data: BatchPurchaseRequest,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    return purchase_sweets_batch(db, batch_data, current_user.id)
+
+
+@router.post("/{sweet_id}/purchase", response_model=SweetResponse, dependencies=[query_budget(4)])
 def purchase_sweet_endpoint(
     sweet_id: int,
     purchase_data: PurchaseRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user)
 ):
-    return purchase_sweet(db, sweet_id, purchase_data)
+    return purchase_sweet(db, sweet_id, purchase_data, current_user.id)
 
 
-@router.post("/{sweet_id}/restock", response_model=SweetResponse)
+@router.post("/{sweet_id}/restock", response_model=SweetResponse, dependencies=[query_budget(3)])
 def restock_sweet_endpoint(
     sweet_id: int,
     restock_data: RestockRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserResponse = Depends(get_current_admin_user)
 ):
-    return restock_sweet(db, sweet_id, restock_data)
+    return restock_sweet(db, sweet_id, restock_data, current_user.id)
+
 
+@router.post("/restock/batch", response_model=BulkResult)
+def restock_batch_endpoint(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    records = iter_records(file, detect_format(file, format))
+    return restock_sweets_batch(db, records, batch_size, current_user.id)
+
+
+@router.get("/{sweet_id}/stock", response_model=StockAtResponse, dependencies=[query_budget(4)])
+def stock_at_endpoint(
+    sweet_id: int,
+    at: datetime = Query(..., description="Point in time (UTC, ISO 8601)"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    return get_stock_at(db, sweet_id, at)
+
+
+@router.get("/{sweet_id}/movements", response_model=List[MovementResponse], dependencies=[query_budget(2)])
+def movements_endpoint(
+    sweet_id: int,
+    response: Response,
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound (UTC)"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound (UTC)"),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    movements, next_cursor = get_movements_page(db, sweet_id, start, end, limit, after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return movements
+
+
+@router.post("/movements/compact", response_model=CompactionResult)
+def compact_movements_endpoint(
+    before: datetime = Query(..., description="Fold movements up to this time (UTC) into snapshots"),
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    return compact_movements(db, before)
@@ -1,50 +1,259 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, case, select, update
 from fastapi import HTTPException, status
+from pydantic import ValidationError
+from typing import Dict, Iterable, List, Optional
 from ..models import Sweet
-from ..schemas import PurchaseRequest, RestockRequest, SweetResponse
-from ..sweets.service import get_sweet_by_id
+from ..schemas import (
+    BatchPurchaseRequest,
+    BulkResult,
+    PurchaseRequest,
+    RestockLine,
+    RestockRequest,
+    SweetResponse
+)
+from ..core.bulk import Record, add_error, chunked, validation_message
+from ..core.events import publish_catalog_change
+from ..analytics.service import record_sales, sales_from_movements
+from .history import movement, record_movements
+from .ledger import active_ledger
 
 
-def purchase_sweet(db: Session, sweet_id: int, purchase_data: PurchaseRequest) -> SweetResponse:
-    sweet = get_sweet_by_id(db, sweet_id)
-    
-    if sweet.quantity == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Sweet is out of stock"
+class OutOfStockError(HTTPException):
+    def __init__(self, sweet_id: int, available: int, requested: int):
+        self.sweet_id = sweet_id
+        self.available = available
+        self.requested = requested
+        if available == 0:
+            detail = "Sweet is out of stock"
+        else:
+            detail = f"Insufficient stock. Available: {available}, Requested: {requested}"
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _reserve_hot_sweets(requested: Dict[int, int]) -> Dict[int, int]:
+    # Lines for sweets handled by the write-behind ledger are reserved in
+    # memory; the rest are returned for the regular UPDATE.
+    ledger = active_ledger()
+    if ledger is None:
+        return requested
+    hot = {sweet_id: quantity for sweet_id, quantity in requested.items() if ledger.tracks(sweet_id)}
+    if not hot:
+        return requested
+    failed = ledger.reserve(hot)
+    if failed is not None:
+        sweet_id, available = failed
+        raise OutOfStockError(sweet_id, available, hot[sweet_id])
+    return {sweet_id: quantity for sweet_id, quantity in requested.items() if sweet_id not in hot}
+
+
+def _ledger_response(sweet_id: int) -> SweetResponse:
+    sweet_id, name, category, price, quantity = active_ledger().snapshot(sweet_id)
+    return SweetResponse(id=sweet_id, name=name, category=category, price=price, quantity=quantity)
+
+
+def _record_purchases(db: Session, rows: list, requested: Dict[int, int], user_id: Optional[int]) -> None:
+    # Movement history and sales rollups commit together with the stock change
+    moves = [movement(row.id, -requested[row.id], "purchase", user_id, row.price) for row in rows]
+    record_movements(db, moves)
+    record_sales(db, sales_from_movements(moves, {row.id: row.category for row in rows}))
+
+
+def purchase_sweet(
+    db: Session,
+    sweet_id: int,
+    purchase_data: PurchaseRequest,
+    user_id: Optional[int] = None
+) -> SweetResponse:
+    if not _reserve_hot_sweets({sweet_id: purchase_data.quantity}):
+        return _ledger_response(sweet_id)
+
+    # Single conditional UPDATE: the stock check and the decrement happen in
+    # the database, so concurrent buyers can never oversell.
+    row = db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet_id, Sweet.quantity >= purchase_data.quantity)
+        .values(quantity=Sweet.quantity - purchase_data.quantity)
+        .returning(Sweet.id, Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+    ).first()
+
+    if row is None:
+        db.rollback()
+        available = db.execute(
+            select(Sweet.quantity).where(Sweet.id == sweet_id)
+        ).scalar_one_or_none()
+        if available is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sweet not found"
+            )
+        raise OutOfStockError(sweet_id, available, purchase_data.quantity)
+
+    _record_purchases(db, [row], {sweet_id: purchase_data.quantity}, user_id)
+    db.commit()
+    publish_catalog_change("purchase", row.id, row.quantity)
+
+    return SweetResponse(
+        id=row.id,
+        name=row.name,
+        category=row.category,
+        price=row.price,
+        quantity=row.quantity
+    )
+
+
+def purchase_sweets_batch(
+    db: Session,
+    batch_data: BatchPurchaseRequest,
+    user_id: Optional[int] = None
+) -> List[SweetResponse]:
+    # Repeated lines for the same sweet are merged so each row is touched once
+    requested: Dict[int, int] = {}
+    for line in batch_data.items:
+        requested[line.sweet_id] = requested.get(line.sweet_id, 0) + line.quantity
+
+    remaining = _reserve_hot_sweets(requested)
+    hot = {sweet_id: requested[sweet_id] for sweet_id in requested if sweet_id not in remaining}
+    try:
+        rows = _purchase_rows(db, remaining, user_id) if remaining else []
+    except Exception:
+        # Any failure, not only a rejected line (e.g. "database is locked"),
+        # must hand the journalled reservation back before the next flush
+        if hot:
+            active_ledger().release(hot)
+        raise
+
+    by_id = {row.id: row for row in rows}
+    return [
+        SweetResponse(
+            id=row.id,
+            name=row.name,
+            category=row.category,
+            price=row.price,
+            quantity=row.quantity
+        ) if sweet_id in by_id else _ledger_response(sweet_id)
+        for sweet_id, row in ((sweet_id, by_id.get(sweet_id)) for sweet_id in requested)
+    ]
+
+
+def _purchase_rows(db: Session, requested: Dict[int, int], user_id: Optional[int]) -> list:
+    wanted = case(requested, value=Sweet.id)
+    rows = db.execute(
+        update(Sweet)
+        .where(Sweet.id.in_(requested), Sweet.quantity >= wanted)
+        .values(quantity=Sweet.quantity - wanted)
+        .returning(Sweet.id, Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if len(rows) != len(requested):
+        db.rollback()
+        available = dict(
+            db.execute(
+                select(Sweet.id, Sweet.quantity).where(Sweet.id.in_(requested))
+            ).all()
         )
-    
-    if purchase_data.quantity > sweet.quantity:
+        for sweet_id, quantity in requested.items():
+            if sweet_id not in available:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Sweet {sweet_id} not found"
+                )
+            if available[sweet_id] < quantity:
+                raise OutOfStockError(sweet_id, available[sweet_id], quantity)
+        # Stock changed between the UPDATE and the re-read; report the conflict
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient stock. Available: {sweet.quantity}, Requested: {purchase_data.quantity}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock changed during checkout, please retry"
         )
-    
-    sweet.quantity -= purchase_data.quantity
+
+    _record_purchases(db, rows, requested, user_id)
     db.commit()
-    db.refresh(sweet)
-    
-    return SweetResponse(
-        id=sweet.id,
-        name=sweet.name,
-        category=sweet.category,
-        price=sweet.price,
-        quantity=sweet.quantity
-    )
+    for row in rows:
+        publish_catalog_change("purchase", row.id, row.quantity)
+    return rows
 
 
-def restock_sweet(db: Session, sweet_id: int, restock_data: RestockRequest) -> SweetResponse:
-    sweet = get_sweet_by_id(db, sweet_id)
-    
-    sweet.quantity += restock_data.quantity
+def restock_sweet(
+    db: Session,
+    sweet_id: int,
+    restock_data: RestockRequest,
+    user_id: Optional[int] = None
+) -> SweetResponse:
+    # Incremented in the database, so a purchase landing between a read and
+    # the write cannot be lost, and the new row comes back in the same statement
+    row = db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet_id)
+        .values(quantity=Sweet.quantity + restock_data.quantity)
+        .returning(Sweet.id, Sweet.name, Sweet.category, Sweet.price, Sweet.quantity)
+    ).first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet not found"
+        )
+    record_movements(db, [movement(sweet_id, restock_data.quantity, "restock", user_id)])
     db.commit()
-    db.refresh(sweet)
-    
+    publish_catalog_change("restock", row.id, row.quantity)
+
     return SweetResponse(
-        id=sweet.id,
-        name=sweet.name,
-        category=sweet.category,
-        price=sweet.price,
-        quantity=sweet.quantity
+        id=row.id,
+        name=row.name,
+        category=row.category,
+        price=row.price,
+        quantity=row.quantity
     )
 
+
+_sweets = Sweet.__table__
+_restock_statement = (
+    update(_sweets)
+    .where(_sweets.c.id == bindparam("b_id"))
+    .values(quantity=_sweets.c.quantity + bindparam("b_quantity"))
+)
+
+
+def restock_sweets_batch(
+    db: Session,
+    records: Iterable[Record],
+    batch_size: int,
+    user_id: Optional[int] = None
+) -> BulkResult:
+    result = BulkResult()
+    for chunk in chunked(records, batch_size):
+        lines = []
+        for line, record, error in chunk:
+            result.processed += 1
+            if error is None:
+                try:
+                    lines.append((line, RestockLine.model_validate(record)))
+                    continue
+                except ValidationError as exc:
+                    error = validation_message(exc)
+            add_error(result, line, error)
+
+        if not lines:
+            continue
+
+        known = set(
+            db.execute(
+                select(Sweet.id).where(Sweet.id.in_({item.sweet_id for _, item in lines}))
+            ).scalars()
+        )
+        params = []
+        for line, item in lines:
+            if item.sweet_id not in known:
+                add_error(result, line, f"Sweet {item.sweet_id} not found")
+                continue
+            params.append({"b_id": item.sweet_id, "b_quantity": item.quantity})
+
+        if params:
+            db.execute(_restock_statement, params)
+            record_movements(db, [
+                movement(param["b_id"], param["b_quantity"], "restock", user_id) for param in params
+            ])
+            db.commit()
+            result.succeeded += len(params)
+            publish_catalog_change("restock")
+    return result
@@ -157,3 +157,399 @@ def test_user_cannot_restock(client, user_token, sweet_with_stock):
     )
     assert response.status_code == 403
 
+
+
+def test_purchase_rejects_non_positive_quantity(client, user_token, sweet_with_stock):
+    sweet_id = sweet_with_stock["id"]
+    
+    response = client.post(
+        f"/api/sweets/{sweet_id}/purchase",
+        json={"quantity": -5},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 422
+
+
+def test_purchase_unknown_sweet_returns_404(client, user_token):
+    response = client.post(
+        "/api/sweets/9999/purchase",
+        json={"quantity": 1},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 404
+
+
+def test_concurrent_purchases_never_oversell(db):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from ..schemas import PurchaseRequest
+    from .service import purchase_sweet, OutOfStockError
+
+    stock = 1500
+    attempts = 2000
+    sweet = Sweet(name="Ladoo", category="Indian", price=1.5, quantity=stock)
+    db.add(sweet)
+    db.commit()
+    sweet_id = sweet.id
+
+    def buy(_):
+        session = TestingSessionLocal()
+        try:
+            purchase_sweet(session, sweet_id, PurchaseRequest(quantity=1))
+            return True
+        except OutOfStockError:
+            return False
+        finally:
+            session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(buy, range(attempts)))
+    elapsed = time.perf_counter() - started
+    print(f"\n{attempts} concurrent purchases in {elapsed:.2f}s ({attempts / elapsed:.0f} req/s)")
+
+    db.expire_all()
+    remaining = db.query(Sweet).filter(Sweet.id == sweet_id).one().quantity
+    assert results.count(True) == stock
+    assert results.count(False) == attempts - stock
+    assert remaining == 0
+
+
+def test_batch_purchase_updates_all_lines(client, user_token, sweet_with_stock, admin_token):
+    other = client.post(
+        "/api/sweets",
+        json={"name": "Toffee", "category": "Candy", "price": 1.25, "quantity": 5},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()
+    
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [
+            {"sweet_id": sweet_with_stock["id"], "quantity": 2},
+            {"sweet_id": other["id"], "quantity": 5},
+            {"sweet_id": sweet_with_stock["id"], "quantity": 1}
+        ]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data] == [sweet_with_stock["id"], other["id"]]
+    assert data[0]["quantity"] == sweet_with_stock["quantity"] - 3
+    assert data[1]["quantity"] == 0
+
+
+def test_batch_purchase_is_all_or_nothing(client, user_token, sweet_with_stock, sweet_out_of_stock):
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [
+            {"sweet_id": sweet_with_stock["id"], "quantity": 2},
+            {"sweet_id": sweet_out_of_stock["id"], "quantity": 1}
+        ]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 400
+    assert "out of stock" in response.json()["detail"].lower()
+    
+    sweets = client.get(
+        "/api/sweets",
+        headers={"Authorization": f"Bearer {user_token}"}
+    ).json()
+    stocked = next(s for s in sweets if s["id"] == sweet_with_stock["id"])
+    assert stocked["quantity"] == sweet_with_stock["quantity"]
+
+
+def test_batch_purchase_unknown_sweet_returns_404(client, user_token, sweet_with_stock):
+    response = client.post(
+        "/api/sweets/purchase/batch",
+        json={"items": [
+            {"sweet_id": sweet_with_stock["id"], "quantity": 1},
+            {"sweet_id": 9999, "quantity": 1}
+        ]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 404
+
+
+def test_admin_batch_restock_reports_row_errors(client, admin_token, sweet_with_stock, sweet_out_of_stock):
+    ndjson_body = (
+        f'{{"sweet_id": {sweet_with_stock["id"]}, "quantity": 5}}\n'
+        f'{{"sweet_id": {sweet_out_of_stock["id"]}, "quantity": 7}}\n'
+        '{"sweet_id": 9999, "quantity": 1}\n'
+        f'{{"sweet_id": {sweet_with_stock["id"]}}}\n'
+        f'{{"sweet_id": {sweet_with_stock["id"]}, "quantity": 1}}\n'
+        f'{{"sweet_id": {sweet_with_stock["id"]}, "quantity": -10}}\n'
+    )
+    response = client.post(
+        "/api/sweets/restock/batch?batch_size=2",
+        files={"file": ("restock.ndjson", ndjson_body, "application/x-ndjson")},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["processed"] == 6
+    assert data["succeeded"] == 3
+    assert sorted(error["line"] for error in data["errors"]) == [3, 4, 6]
+    
+    sweets = client.get(
+        "/api/sweets",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()
+    quantities = {s["id"]: s["quantity"] for s in sweets}
+    assert quantities[sweet_with_stock["id"]] == sweet_with_stock["quantity"] + 6
+    assert quantities[sweet_out_of_stock["id"]] == 7
+
+
+def test_user_cannot_batch_restock(client, user_token):
+    response = client.post(
+        "/api/sweets/restock/batch",
+        files={"file": ("restock.csv", "sweet_id,quantity\n1,5\n", "text/csv")},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
+
+
+def test_hot_sweet_ledger_never_oversells_and_flushes(db, tmp_path):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from ..schemas import PurchaseRequest
+    from .ledger import start_purchase_ledger, stop_purchase_ledger
+    from .service import purchase_sweet, OutOfStockError
+
+    stock = 1500
+    attempts = 2000
+    sweet = Sweet(name="Ladoo", category="Indian", price=1.5, quantity=stock)
+    db.add(sweet)
+    db.commit()
+    sweet_id = sweet.id
+
+    ledger = start_purchase_ledger(TestingSessionLocal, [sweet_id], str(tmp_path / "ledger.journal"))
+    try:
+        def buy(_):
+            session = TestingSessionLocal()
+            try:
+                return purchase_sweet(session, sweet_id, PurchaseRequest(quantity=1)).quantity
+            except OutOfStockError:
+                return None
+            finally:
+                session.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(buy, range(attempts)))
+        elapsed = time.perf_counter() - started
+        print(f"\n{attempts} ledger purchases in {elapsed:.2f}s ({attempts / elapsed:.0f} req/s)")
+    finally:
+        stop_purchase_ledger()
+
+    db.expire_all()
+    sold = [quantity for quantity in results if quantity is not None]
+    assert len(sold) == stock
+    assert sorted(sold) == list(range(stock))
+    assert db.get(Sweet, sweet_id).quantity == 0
+    assert ledger.flushes >= 1
+
+
+def test_hot_sweet_ledger_replays_journal_after_crash(db, tmp_path):
+    from .ledger import PurchaseLedger
+
+    sweet = Sweet(name="Barfi", category="Indian", price=2.0, quantity=10)
+    db.add(sweet)
+    db.commit()
+    journal = str(tmp_path / "ledger.journal")
+
+    crashed = PurchaseLedger(TestingSessionLocal, journal, flush_interval=3600).start([sweet.id])
+    assert crashed.reserve({sweet.id: 3}) is None
+    crashed.flush()
+    assert crashed.reserve({sweet.id: 4}) is None
+    assert crashed.reserve({sweet.id: 4}) == (sweet.id, 3)
+    # Stop the flusher without the final flush, as a killed process would
+    crashed._stopped.set()
+    crashed._wake.set()
+    crashed._thread.join()
+    crashed._release_lock()
+    db.expire_all()
+    assert db.get(Sweet, sweet.id).quantity == 7
+
+    recovered = PurchaseLedger(TestingSessionLocal, journal, flush_interval=3600).start([sweet.id])
+    try:
+        db.expire_all()
+        assert db.get(Sweet, sweet.id).quantity == 3
+        assert recovered.snapshot(sweet.id)[-1] == 3
+    finally:
+        recovered.close()
+    db.expire_all()
+    assert db.get(Sweet, sweet.id).quantity == 3
+
+
+def test_hot_sweet_reservation_is_released_when_checkout_fails(db, tmp_path, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from ..schemas import BatchPurchaseRequest
+    from . import service
+    from .ledger import start_purchase_ledger, stop_purchase_ledger
+
+    hot = Sweet(name="Peda", category="Indian", price=1.0, quantity=10)
+    cold = Sweet(name="Fudge", category="Candy", price=2.0, quantity=10)
+    db.add_all([hot, cold])
+    db.commit()
+
+    def locked(*args, **kwargs):
+        raise OperationalError("UPDATE sweets", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(service, "_purchase_rows", locked)
+    ledger = start_purchase_ledger(TestingSessionLocal, [hot.id], str(tmp_path / "ledger.journal"), flush_interval=3600)
+    try:
+        order = BatchPurchaseRequest(items=[{"sweet_id": hot.id, "quantity": 3}, {"sweet_id": cold.id, "quantity": 1}])
+        with pytest.raises(OperationalError):
+            service.purchase_sweets_batch(db, order)
+        assert ledger.snapshot(hot.id)[-1] == 10
+        ledger.flush()
+    finally:
+        stop_purchase_ledger()
+
+    db.expire_all()
+    assert db.get(Sweet, hot.id).quantity == 10
+
+
+def test_hot_sweet_ledger_records_only_stock_it_removed(db, tmp_path):
+    from .ledger import PurchaseLedger
+    from ..models import InventoryMovement, SalesRollup
+
+    sweet = Sweet(name="Jalebi", category="Indian", price=2.0, quantity=10)
+    db.add(sweet)
+    db.commit()
+
+    ledger = PurchaseLedger(TestingSessionLocal, str(tmp_path / "ledger.journal"), flush_interval=3600).start([sweet.id])
+    try:
+        assert ledger.reserve({sweet.id: 6}) is None
+        # An admin lowers the stock before the ledger flushes
+        db.get(Sweet, sweet.id).quantity = 4
+        db.commit()
+        ledger.flush()
+    finally:
+        ledger.close()
+
+    db.expire_all()
+    assert db.get(Sweet, sweet.id).quantity == 0
+    assert ledger.oversold == 2
+    moves = db.query(InventoryMovement).filter_by(sweet_id=sweet.id, kind="purchase").all()
+    assert [move.delta for move in moves] == [-4]
+    assert [row.units for row in db.query(SalesRollup).filter_by(granularity="day")] == [4]
+
+
+def test_hot_sweet_ledger_refuses_a_second_process(db, tmp_path):
+    from .ledger import PurchaseLedger, LedgerInUseError
+
+    journal = str(tmp_path / "ledger.journal")
+    first = PurchaseLedger(TestingSessionLocal, journal, flush_interval=3600).start([])
+    try:
+        with pytest.raises(LedgerInUseError):
+            PurchaseLedger(TestingSessionLocal, journal + ".1", lock_path=journal + ".lock").start([])
+    finally:
+        first.close()
+    PurchaseLedger(TestingSessionLocal, journal, flush_interval=3600).start([]).close()
+
+
+def test_movements_record_history_and_stock_at_time(client, admin_token, user_token, sweet_with_stock, regular_user):
+    from datetime import datetime
+    sweet_id = sweet_with_stock["id"]
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    
+    before_purchase = datetime.utcnow()
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 4},
+                headers={"Authorization": f"Bearer {user_token}"})
+    after_purchase = datetime.utcnow()
+    client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 20}, headers=admin)
+    
+    def stock_at(at):
+        response = client.get(f"/api/sweets/{sweet_id}/stock", params={"at": at.isoformat()}, headers=admin)
+        assert response.status_code == 200
+        return response.json()["quantity"]
+    
+    assert stock_at(before_purchase) == 10
+    assert stock_at(after_purchase) == 6
+    assert stock_at(datetime.utcnow()) == 26
+    
+    first = client.get(f"/api/sweets/{sweet_id}/movements", params={"limit": 2}, headers=admin)
+    assert [(m["kind"], m["delta"]) for m in first.json()] == [("create", 10), ("purchase", -4)]
+    assert first.json()[1]["user_id"] == regular_user.id
+    rest = client.get(
+        f"/api/sweets/{sweet_id}/movements",
+        params={"limit": 2, "after": first.headers["X-Next-Cursor"]},
+        headers=admin
+    )
+    assert [(m["kind"], m["delta"]) for m in rest.json()] == [("restock", 20)]
+    assert "X-Next-Cursor" not in rest.headers
+    
+    ranged = client.get(
+        f"/api/sweets/{sweet_id}/movements",
+        params={"start": before_purchase.isoformat(), "end": after_purchase.isoformat()},
+        headers=admin
+    )
+    assert [m["kind"] for m in ranged.json()] == ["purchase"]
+    
+    compacted = client.post("/api/sweets/movements/compact", params={"before": after_purchase.isoformat()}, headers=admin)
+    assert compacted.json()["pruned"] == 2
+    assert stock_at(after_purchase) == 6
+    assert stock_at(datetime.utcnow()) == 26
+    gone = client.get(f"/api/sweets/{sweet_id}/stock", params={"at": before_purchase.isoformat()}, headers=admin)
+    assert gone.status_code == 404
+    
+    forbidden = client.get(f"/api/sweets/{sweet_id}/movements", headers={"Authorization": f"Bearer {user_token}"})
+    assert forbidden.status_code == 403
+
+
+def test_history_accepts_timestamps_with_an_offset(client, admin_token, user_token, sweet_with_stock):
+    from datetime import datetime, timedelta, timezone
+    sweet_id = sweet_with_stock["id"]
+    admin = {"Authorization": f"Bearer {admin_token}"}
+
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 4},
+                headers={"Authorization": f"Bearer {user_token}"})
+    after_purchase = datetime.now(timezone.utc)
+    client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 20}, headers=admin)
+
+    # The same instant two hours ahead of UTC folds exactly the first two movements
+    cutoff = after_purchase.astimezone(timezone(timedelta(hours=2))).isoformat()
+    compacted = client.post("/api/sweets/movements/compact", params={"before": cutoff}, headers=admin)
+    assert compacted.status_code == 200
+    assert compacted.json()["pruned"] == 2
+
+    zulu = after_purchase.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    response = client.get(f"/api/sweets/{sweet_id}/stock", params={"at": zulu}, headers=admin)
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 6
+    ranged = client.get(f"/api/sweets/{sweet_id}/movements", params={"start": zulu}, headers=admin)
+    assert [m["kind"] for m in ranged.json()] == ["restock"]
+
+
+def test_compaction_rejects_a_cutoff_in_the_future(client, admin_token, sweet_with_stock):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    response = client.post("/api/sweets/movements/compact", params={"before": "2099-01-01"}, headers=admin)
+    assert response.status_code == 400
+    movements = client.get(f"/api/sweets/{sweet_with_stock['id']}/movements", headers=admin).json()
+    assert [m["kind"] for m in movements] == ["create"]
+
+
+def test_movement_queries_use_history_index(db):
+    from datetime import datetime
+    from sqlalchemy import func, select, text
+    from .history import _movements
+    
+    def query_plan(stmt):
+        compiled = stmt.compile(compile_kwargs={"literal_binds": True})
+        return " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+    
+    since = _movements.c.created_at > datetime(2024, 1, 1)
+    total = select(func.sum(_movements.c.delta)).where(_movements.c.sweet_id == 1, since)
+    assert "COVERING INDEX ix_inventory_movements_sweet_time" in query_plan(total)
+    
+    page = (
+        select(_movements)
+        .where(_movements.c.sweet_id == 1, since)
+        .order_by(_movements.c.created_at, _movements.c.id)
+        .limit(100)
+    )
+    plan = query_plan(page)
+    assert "ix_inventory_movements_sweet_time" in plan
+    # Only rows with equal timestamps are sorted by id, never the whole range
+    assert "TEMP B-TREE FOR ORDER BY" not in plan
@@ -1,31 +1,155 @@
-from fastapi import FastAPI
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from fastapi.routing import APIRoute
+from . import database
+from .database import USE_ASYNC_DB, get_async_engine
+from .bootstrap import migrate, warm_up
 from .auth.router import router as auth_router
 from .sweets.router import router as sweets_router
 from .inventory.router import router as inventory_router
+from .analytics.router import router as analytics_router
+from .reports.router import router as reports_router
+from .sweets.search import install_search_index
+from .inventory.ledger import start_purchase_ledger_from_env, stop_purchase_ledger
+from .core.dependencies import principal_cache
+from .core.http_cache import catalog_cache
+from .core.metrics import METRICS_ENABLED, MetricsMiddleware, registry
+from .core.security import password_pool
+from .core.sql_tracker import SQL_TRACKING, SQLTrackingMiddleware
+from .sweets.stream import stock_broker
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Sweet Shop Management System")
+# Each worker migrates the database on startup unless AUTO_MIGRATE=0; turn it
+# off wherever migrate.py (or serve.py, which runs it once) does that instead.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1").lower() in ("1", "true", "yes", "on")
+WARM_UP = os.getenv("WARM_UP", "1").lower() in ("1", "true", "yes", "on")
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],  # Vite default port
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include routers
-app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
-app.include_router(sweets_router, prefix="/api/sweets", tags=["sweets"])
-app.include_router(inventory_router, prefix="/api/sweets", tags=["inventory"])
+def include_routers(app: FastAPI, async_mode: bool = False) -> None:
+    routers = [
+        (auth_router, "/api/auth", ["auth"]),
+        (sweets_router, "/api/sweets", ["sweets"]),
+        (inventory_router, "/api/sweets", ["inventory"]),
+        (analytics_router, "/api/analytics", ["analytics"]),
+        (reports_router, "/api/reports", ["reports"]),
+    ]
+    if not async_mode:
+        for router, prefix, tags in routers:
+            app.include_router(router, prefix=prefix, tags=tags)
+        return
+
+    from .auth.async_router import router as async_auth_router
+    from .sweets.async_router import router as async_sweets_router
+    from .inventory.async_router import router as async_inventory_router
+
+    served = set()
+    for router, (_, prefix, tags) in zip(
+        [async_auth_router, async_sweets_router, async_inventory_router], routers
+    ):
+        app.include_router(router, prefix=prefix, tags=tags)
+        served.update(
+            (prefix + route.path, method)
+            for route in router.routes if isinstance(route, APIRoute)
+            for method in route.methods
+        )
+
+    # Routes without an async counterpart (e.g. bulk uploads) keep their sync
+    # handler, which FastAPI runs in its threadpool.
+    for router, prefix, tags in routers:
+        remaining = APIRouter()
+        remaining.routes.extend(
+            route for route in router.routes
+            if any((prefix + route.path, method) not in served for method in route.methods)
+        )
+        app.include_router(remaining, prefix=prefix, tags=tags)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Everything here runs before the server accepts connections
+    if AUTO_MIGRATE:
+        migrate(database.engine)
+    if USE_ASYNC_DB:
+        async_engine = get_async_engine()
+        async with async_engine.begin() as connection:
+            await connection.run_sync(install_search_index)
+    if WARM_UP:
+        logger.info("Warmed up in %.1f ms", warm_up(database.engine, database.SessionLocal) * 1000)
+    # Replays any journalled hot-sweet purchases before serving requests
+    start_purchase_ledger_from_env(database.SessionLocal)
+    yield
+    stop_purchase_ledger()
+    if USE_ASYNC_DB:
+        await async_engine.dispose()
+
+
+def collect_runtime_stats():
+    caches = [("principal", principal_cache.stats()), ("catalog_response", catalog_cache.stats())]
+    for name, kind in (("hits", "counter"), ("misses", "counter"), ("size", "gauge")):
+        yield (
+            f"sweetshop_cache_{name}" + ("_total" if kind == "counter" else ""),
+            kind,
+            f"Cache {name} by cache",
+            # Shared backends do not report a size
+            [(("cache",), (cache,), stats[name]) for cache, stats in caches if stats[name] is not None]
+        )
+    pool = password_pool.stats()
+    yield "sweetshop_password_hash_pending", "gauge", "Password hashes queued or running", [((), (), pool["pending"])]
+    yield "sweetshop_password_hash_rejected_total", "counter", "Password hashes rejected as overloaded", [((), (), pool["rejected"])]
+    yield "sweetshop_stock_stream_subscribers", "gauge", "Open stock update streams", [((), (), len(stock_broker))]
+    yield "sweetshop_stock_stream_dropped_total", "counter", "Stock streams dropped as too slow", [((), (), stock_broker.dropped)]
+    engines = [("primary", database.engine)] + [
+        (f"replica{index}", replica) for index, replica in enumerate(database.replica_router.engines)
+    ]
+    yield "sweetshop_db_connections_in_use", "gauge", "Pooled connections checked out", [
+        (("engine",), (name,), pooled.pool.checkedout())
+        for name, pooled in engines if hasattr(pooled.pool, "checkedout")
+    ]
+
+
+registry.register_collector(collect_runtime_stats)
 
 
-@app.get("/")
 def root():
     return {"message": "Sweet Shop Management System API"}
 
+
+def metrics():
+    # Prometheus text format; restrict access at the proxy or network level
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def create_app() -> FastAPI:
+    """Builds the API. Importing this module touches no database; schema
+    changes and warm-up happen in the lifespan, before serving."""
+    app = FastAPI(title="Sweet Shop Management System", lifespan=lifespan)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],  # Vite default port
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
+
+    if SQL_TRACKING:
+        app.add_middleware(SQLTrackingMiddleware)
+
+    if METRICS_ENABLED:
+        # Outermost, so the latency includes CORS and every other middleware
+        app.add_middleware(MetricsMiddleware)
+
+    include_routers(app, USE_ASYNC_DB)
+    app.get("/")(root)
+    app.get("/metrics", include_in_schema=False)(metrics)
+    return app
+
+
+app = create_app()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Enum as SQLEnum
+from sqlalchemy import Column, DateTime, Integer, String, Float, Index, Enum as SQLEnum, text
 from sqlalchemy.orm import relationship
 import enum
 from .database import Base
@@ -23,7 +23,69 @@ class Sweet(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
-    category = Column(String, nullable=False, index=True)
-    price = Column(Float, nullable=False)
+    category = Column(String, nullable=False)
+    price = Column(Float, nullable=False, index=True)
     quantity = Column(Integer, default=0, nullable=False)
 
+    __table_args__ = (
+        # Serves category lookups on its own and category + price range filters
+        Index("ix_sweets_category_price", "category", "price"),
+        # Only in-stock rows, for the in_stock filter ordered by price
+        Index(
+            "ix_sweets_in_stock",
+            "price",
+            sqlite_where=text("quantity > 0"),
+            postgresql_where=text("quantity > 0"),
+        ),
+    )
+
+
+
+class LedgerCheckpoint(Base):
+    # Last purchase-ledger journal entry applied to the sweets table
+    __tablename__ = "ledger_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+
+
+class InventoryMovement(Base):
+    # Append-only stock history; Sweet.quantity stays the materialised
+    # current stock and is updated in the same transaction.
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True)
+    sweet_id = Column(Integer, nullable=False)
+    delta = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    # Price at the time of a purchase, so sales can be rebuilt from history
+    unit_price = Column(Float, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Covers per-sweet range scans and the delta sums behind stock-at-time
+        Index("ix_inventory_movements_sweet_time", "sweet_id", "created_at", "delta"),
+        Index("ix_inventory_movements_created_at", "created_at"),
+    )
+
+
+class StockSnapshot(Base):
+    # Compacted stock of each sweet at a point in time
+    __tablename__ = "stock_snapshots"
+
+    sweet_id = Column(Integer, primary_key=True)
+    as_of = Column(DateTime, primary_key=True)
+    quantity = Column(Integer, nullable=False)
+
+
+class SalesRollup(Base):
+    # Units and revenue per sweet and hour/day bucket, kept current by purchases
+    __tablename__ = "sales_rollups"
+
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    sweet_id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
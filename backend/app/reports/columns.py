@@ -0,0 +1,75 @@
+import math
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+COLUMN_BATCH_SIZE = 65536
+
+# Column-at-a-time kernels. Rows are transposed once per batch and every
+# kernel below runs inside C builtins (zip, slicing, array, bisect)
+# instead of a Python-level loop per row or ORM object.
+
+
+def read_columns(db: Session, stmt: Select, batch_size: int = COLUMN_BATCH_SIZE) -> Iterator[Dict[str, Sequence]]:
+    # Batches come straight off the DBAPI cursor, skipping Row objects and
+    # result processors, so select numeric and text columns only.
+    result = db.connection().execute(stmt)
+    names = list(result.keys())
+    try:
+        while True:
+            rows = result.cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield dict(zip(names, zip(*rows)))
+    finally:
+        result.close()
+
+
+def group_runs(keys: Sequence) -> Iterator[Tuple[Any, int, int]]:
+    # Keys must arrive sorted; each distinct key is found with one bisect
+    start = 0
+    while start < len(keys):
+        key = keys[start]
+        end = bisect_right(keys, key, start)
+        yield key, start, end
+        start = end
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    # Linear interpolation between closest ranks (NumPy's default method)
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class GroupedColumns:
+    """Per-group float columns and running sums, filled from sorted batches.
+
+    A group may span batch boundaries; its slices are concatenated.
+    """
+
+    def __init__(self, collect: Sequence[str] = ()):
+        self.collect = list(collect)
+        self.values: Dict[Any, Dict[str, array]] = {}
+        self.sums: Dict[Any, Dict[str, float]] = {}
+        self.counts: Dict[Any, int] = {}
+
+    def add(self, key: Any, columns: Dict[str, Sequence], start: int, end: int, sums: Dict[str, float]) -> None:
+        if key not in self.counts:
+            self.counts[key] = 0
+            self.sums[key] = {}
+            self.values[key] = {name: array("d") for name in self.collect}
+        self.counts[key] += end - start
+        for name, value in sums.items():
+            self.sums[key][name] = self.sums[key].get(name, 0.0) + value
+        for name in self.collect:
+            self.values[key][name].extend(columns[name][start:end])
+
+    def keys(self) -> List[Any]:
+        return list(self.counts)
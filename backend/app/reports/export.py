@@ -0,0 +1,54 @@
+import csv
+import io
+from typing import Iterable, Iterator, List, Type
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+EXPORT_CHUNK_ROWS = 1000
+
+
+def _csv_chunks(rows: Iterable[BaseModel], fields: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([getattr(row, field) for field in fields])
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _json_chunks(rows: Iterable[BaseModel]) -> Iterator[str]:
+    yield "["
+    for count, row in enumerate(rows):
+        yield ("," if count else "") + row.model_dump_json()
+    yield "]"
+
+
+def _parquet(rows: Iterable[BaseModel], fields: List[str]) -> bytes:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow to be installed"
+        )
+    rows = list(rows)
+    table = pa.table({field: [getattr(row, field) for row in rows] for field in fields})
+    sink = io.BytesIO()
+    pq.write_table(table, sink)
+    return sink.getvalue()
+
+
+def render_report(rows: Iterable[BaseModel], model: Type[BaseModel], format: str, name: str) -> Response:
+    fields = list(model.model_fields)
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    if format == "csv":
+        return StreamingResponse(_csv_chunks(rows, fields), media_type="text/csv", headers=headers)
+    if format == "parquet":
+        return Response(_parquet(rows, fields), media_type="application/vnd.apache.parquet", headers=headers)
+    return StreamingResponse(_json_chunks(rows), media_type="application/json")
@@ -0,0 +1,36 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from ..database import get_read_db
+from ..core.dependencies import get_current_admin_user
+from ..schemas import SalesSummaryRow, UserResponse, ValuationRow
+from ..analytics.service import default_window
+from .export import render_report
+from .service import sales_summary, stock_valuation
+
+router = APIRouter()
+
+REPORT_FORMATS = "^(json|csv|parquet)$"
+
+
+@router.get("/stock-valuation", response_model=List[ValuationRow])
+def stock_valuation_endpoint(
+    format: str = Query("json", pattern=REPORT_FORMATS),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    return render_report(stock_valuation(db), ValuationRow, format, "stock-valuation")
+
+
+@router.get("/sales", response_model=List[SalesSummaryRow])
+def sales_summary_endpoint(
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to 30 days ago"),
+    end: Optional[date] = Query(None, description="Day after the last one (UTC); defaults to tomorrow"),
+    format: str = Query("json", pattern=REPORT_FORMATS),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    default_start, default_end = default_window(30)
+    rows = sales_summary(db, start or default_start, end or default_end)
+    return render_report(rows, SalesSummaryRow, format, "sales")
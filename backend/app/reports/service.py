@@ -0,0 +1,79 @@
+from datetime import date, datetime, time
+from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..models import SalesRollup, Sweet
+from ..schemas import SalesSummaryRow, ValuationRow
+from .columns import COLUMN_BATCH_SIZE, GroupedColumns, group_runs, percentile, read_columns
+
+
+def stock_valuation(db: Session, batch_size: int = COLUMN_BATCH_SIZE) -> List[ValuationRow]:
+    # Counts and sums are left to the database's own aggregation; only the
+    # price column is pulled, in (category, price) order straight from the
+    # covering ix_sweets_category_price index, for the percentiles.
+    totals = {
+        row.category: row
+        for row in db.execute(
+            select(
+                Sweet.category,
+                func.count().label("sweets"),
+                func.sum(Sweet.quantity).label("units"),
+                func.sum(Sweet.price * Sweet.quantity).label("value"),
+            ).group_by(Sweet.category)
+        )
+    }
+    stmt = select(Sweet.category, Sweet.price).order_by(Sweet.category, Sweet.price)
+    groups = GroupedColumns(collect=["price"])
+    for columns in read_columns(db, stmt, batch_size):
+        for category, start, end in group_runs(columns["category"]):
+            groups.add(category, columns, start, end, {})
+
+    report = []
+    for category in groups.keys():
+        prices = groups.values[category]["price"]
+        total = totals[category]
+        report.append(ValuationRow(
+            category=category,
+            sweets=total.sweets,
+            units=total.units,
+            value=round(total.value, 2),
+            min_price=prices[0],
+            median_price=round(percentile(prices, 50), 2),
+            p90_price=round(percentile(prices, 90), 2),
+            max_price=prices[-1],
+        ))
+    return report
+
+
+def sales_summary(db: Session, start: date, end: date) -> List[SalesSummaryRow]:
+    rollups = SalesRollup.__table__
+    daily_revenue = func.sum(rollups.c.revenue).label("revenue")
+    stmt = (
+        select(rollups.c.category, func.sum(rollups.c.units).label("units"), daily_revenue)
+        .where(
+            rollups.c.granularity == "day",
+            rollups.c.bucket >= datetime.combine(start, time()),
+            rollups.c.bucket < datetime.combine(end, time())
+        )
+        .group_by(rollups.c.category, rollups.c.bucket)
+        .order_by(rollups.c.category, daily_revenue)
+    )
+    groups = GroupedColumns(collect=["revenue"])
+    for columns in read_columns(db, stmt):
+        for category, first, last in group_runs(columns["category"]):
+            groups.add(category, columns, first, last, {
+                "units": sum(columns["units"][first:last]),
+                "revenue": sum(columns["revenue"][first:last]),
+            })
+
+    return [
+        SalesSummaryRow(
+            category=category,
+            days=groups.counts[category],
+            units=int(groups.sums[category]["units"]),
+            revenue=round(groups.sums[category]["revenue"], 2),
+            median_daily_revenue=round(percentile(groups.values[category]["revenue"], 50), 2),
+            p90_daily_revenue=round(percentile(groups.values[category]["revenue"], 90), 2),
+        )
+        for category in groups.keys()
+    ]
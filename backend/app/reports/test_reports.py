@@ -0,0 +1,146 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..database import Base, get_db
+from ..models import Sweet, User, UserRole
+from ..main import app
+from ..core.security import create_access_token
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_reports.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    def override_get_db():
+        try:
+            yield db
+        finally:
+            pass
+    
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin_user(db):
+    from ..core.security import get_password_hash
+    user = User(
+        email="admin@example.com",
+        password=get_password_hash("admin123"),
+        role=UserRole.ADMIN
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def regular_user(db):
+    from ..core.security import get_password_hash
+    user = User(
+        email="user@example.com",
+        password=get_password_hash("user123"),
+        role=UserRole.USER
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def admin_token(admin_user):
+    return create_access_token(data={"sub": admin_user.email, "role": admin_user.role.value})
+
+
+@pytest.fixture
+def user_token(regular_user):
+    return create_access_token(data={"sub": regular_user.email, "role": regular_user.role.value})
+
+
+@pytest.fixture
+def catalog(db):
+    db.add_all([
+        Sweet(name="Ladoo", category="Indian", price=2.0, quantity=10),
+        Sweet(name="Barfi", category="Indian", price=4.0, quantity=5),
+        Sweet(name="Jalebi", category="Indian", price=1.0, quantity=0),
+        Sweet(name="Toffee", category="Candy", price=0.5, quantity=100),
+    ])
+    db.commit()
+
+
+def test_column_kernels_match_reference_implementations():
+    import random
+    import statistics
+    from .columns import group_runs, percentile
+    
+    rng = random.Random(7)
+    values = sorted(rng.uniform(0, 100) for _ in range(1001))
+    assert percentile(values, 50) == pytest.approx(statistics.median(values))
+    assert percentile(values, 90) == pytest.approx(statistics.quantiles(values, n=10, method="inclusive")[-1])
+    assert list(group_runs(["a", "a", "b", "c", "c", "c"])) == [("a", 0, 2), ("b", 2, 3), ("c", 3, 6)]
+
+
+def test_stock_valuation_report_formats(client, admin_token, catalog):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    
+    report = client.get("/api/reports/stock-valuation", headers=headers).json()
+    assert report == [
+        {"category": "Candy", "sweets": 1, "units": 100, "value": 50.0,
+         "min_price": 0.5, "median_price": 0.5, "p90_price": 0.5, "max_price": 0.5},
+        {"category": "Indian", "sweets": 3, "units": 15, "value": 40.0,
+         "min_price": 1.0, "median_price": 2.0, "p90_price": 3.6, "max_price": 4.0},
+    ]
+    
+    csv = client.get("/api/reports/stock-valuation", params={"format": "csv"}, headers=headers)
+    assert csv.headers["content-type"].startswith("text/csv")
+    lines = csv.text.splitlines()
+    assert lines[0] == "category,sweets,units,value,min_price,median_price,p90_price,max_price"
+    assert lines[2] == "Indian,3,15,40.0,1.0,2.0,3.6,4.0"
+    
+    parquet = client.get("/api/reports/stock-valuation", params={"format": "parquet"}, headers=headers)
+    try:
+        import pyarrow  # noqa: F401
+        assert parquet.status_code == 200
+    except ImportError:
+        assert parquet.status_code == 501
+
+
+def test_stock_valuation_spans_column_batches(db, catalog):
+    from .service import stock_valuation
+    
+    # Categories split across batches must aggregate exactly as in one batch
+    assert stock_valuation(db, batch_size=1) == stock_valuation(db)
+
+
+def test_sales_report_summarises_daily_revenue(client, admin_token, user_token, catalog, db):
+    ladoo = db.query(Sweet).filter(Sweet.name == "Ladoo").one().id
+    client.post(f"/api/sweets/{ladoo}/purchase", json={"quantity": 3}, headers={"Authorization": f"Bearer {user_token}"})
+    
+    report = client.get("/api/reports/sales", headers={"Authorization": f"Bearer {admin_token}"}).json()
+    assert report == [{
+        "category": "Indian", "days": 1, "units": 3, "revenue": 6.0,
+        "median_daily_revenue": 6.0, "p90_daily_revenue": 6.0,
+    }]
+
+
+def test_reports_require_admin(client, user_token):
+    response = client.get("/api/reports/stock-valuation", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from .models import UserRole
 
 
@@ -54,11 +55,116 @@ class SweetResponse(BaseModel):
         from_attributes = True
 
 
+class SweetFilters(BaseModel):
+    category: Optional[List[str]] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+
+
+class SweetSuggestion(BaseModel):
+    id: int
+    name: str
+    category: str
+    score: float
+
+
 # Inventory Schemas
 class PurchaseRequest(BaseModel):
-    quantity: int = 1
+    quantity: int = Field(default=1, gt=0)
 
 
 class RestockRequest(BaseModel):
     quantity: int
 
+
+class PurchaseLine(BaseModel):
+    sweet_id: int
+    quantity: int = Field(default=1, gt=0)
+
+
+class BatchPurchaseRequest(BaseModel):
+    items: List[PurchaseLine] = Field(..., min_length=1)
+
+
+class RestockLine(RestockRequest):
+    sweet_id: int
+    quantity: int = Field(..., gt=0)
+
+
+# Bulk upload Schemas
+class BulkRowError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkResult(BaseModel):
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    errors: List[BulkRowError] = []
+
+
+# Inventory history Schemas
+class MovementResponse(BaseModel):
+    id: int
+    sweet_id: int
+    delta: int
+    kind: str
+    user_id: Optional[int] = None
+    unit_price: Optional[float] = None
+    created_at: datetime
+
+
+class StockAtResponse(BaseModel):
+    sweet_id: int
+    at: datetime
+    quantity: int
+
+
+class CompactionResult(BaseModel):
+    before: datetime
+    snapshots: int
+    pruned: int
+
+
+# Analytics Schemas
+class CategoryRevenue(BaseModel):
+    category: str
+    units: int
+    revenue: float
+
+
+class TopSeller(BaseModel):
+    sweet_id: int
+    name: Optional[str] = None
+    category: str
+    units: int
+    revenue: float
+
+
+class SalesPoint(BaseModel):
+    bucket: datetime
+    units: int
+    revenue: float
+
+
+# Report Schemas
+class ValuationRow(BaseModel):
+    category: str
+    sweets: int
+    units: int
+    value: float
+    min_price: float
+    median_price: float
+    p90_price: float
+    max_price: float
+
+
+class SalesSummaryRow(BaseModel):
+    category: str
+    days: int
+    units: int
+    revenue: float
+    median_daily_revenue: float
+    p90_daily_revenue: float
@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..database import get_async_db
+from ..core.dependencies import get_current_user_async, get_current_admin_user_async
+from ..core.sql_tracker import query_budget
+from ..core.http_cache import catalog_cache
+from ..core.serialization import dumps, fast_responses_enabled, rows_to_dicts
+from ..schemas import (
+    SweetCreate,
+    SweetFilters,
+    SweetResponse,
+    SweetSuggestion,
+    SweetUpdate,
+    UserResponse
+)
+from .router import NEXT_CURSOR_HEADER, sweet_filters
+from .service import SWEET_FIELDS
+from .async_service import (
+    create_sweet,
+    get_sweet_rows_page,
+    get_sweets_page,
+    search_sweet_rows,
+    search_sweets,
+    suggest_sweets,
+    update_sweet,
+    delete_sweet
+)
+
+router = APIRouter()
+
+
+@router.post("", response_model=SweetResponse, status_code=201, dependencies=[query_budget(3)])
+async def add_sweet(
+    sweet_data: SweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_admin_user_async)
+):
+    return await create_sweet(db, sweet_data)
+
+
+@router.get("", response_model=List[SweetResponse], dependencies=[query_budget(2)])
+async def view_sweets(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit for the full catalog"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    order_by: str = Query("id", description="id, name, category or price; prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    filters: SweetFilters = Depends(sweet_filters),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_user_async)
+):
+    cached, slot = catalog_cache.lookup(request)
+    if cached is not None:
+        return cached
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if fast_responses_enabled():
+        names, rows, next_cursor = await get_sweet_rows_page(db, limit, after, order_by, selected, filters)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return catalog_cache.store(slot, dumps(rows_to_dicts(names, rows)), headers)
+    items, next_cursor = await get_sweets_page(db, limit, after, order_by, selected, filters)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return catalog_cache.store(slot, items, headers)
+
+
+@router.get("/search", response_model=List[SweetResponse], dependencies=[query_budget(2)])
+async def search_sweets_endpoint(
+    request: Request,
+    query: str = Query(..., description="Search term for name or category"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    filters: SweetFilters = Depends(sweet_filters),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_user_async)
+):
+    cached, slot = catalog_cache.lookup(request)
+    if cached is not None:
+        return cached
+    if fast_responses_enabled():
+        rows = await search_sweet_rows(db, query, limit, offset, filters)
+        return catalog_cache.store(slot, dumps(rows_to_dicts(SWEET_FIELDS, rows)))
+    return catalog_cache.store(slot, await search_sweets(db, query, limit, offset, filters))
+
+
+@router.get("/suggest", response_model=List[SweetSuggestion], dependencies=[query_budget(2)])
+async def suggest_sweets_endpoint(
+    q: str = Query(..., min_length=1, description="Partially typed or misspelled sweet name"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_user_async)
+):
+    return await suggest_sweets(db, q, limit)
+
+
+@router.put("/{sweet_id}", response_model=SweetResponse, dependencies=[query_budget(4)])
+async def update_sweet_endpoint(
+    sweet_id: int,
+    sweet_data: SweetUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_admin_user_async)
+):
+    return await update_sweet(db, sweet_id, sweet_data)
+
+
+@router.delete("/{sweet_id}", dependencies=[query_budget(3)])
+async def delete_sweet_endpoint(
+    sweet_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserResponse = Depends(get_current_admin_user_async)
+):
+    return await delete_sweet(db, sweet_id)
@@ -0,0 +1,66 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Tuple
+from ..schemas import SweetCreate, SweetFilters, SweetResponse, SweetSuggestion, SweetUpdate
+from . import service
+
+# Async counterparts of the sweets service. The sync implementations run
+# through AsyncSession.run_sync, so their SQL is awaited on the async driver
+# and the business rules stay in one place.
+
+
+async def create_sweet(db: AsyncSession, sweet_data: SweetCreate) -> SweetResponse:
+    return await db.run_sync(service.create_sweet, sweet_data)
+
+
+async def get_sweets_page(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    order_by: str = "id",
+    fields: Optional[List[str]] = None,
+    filters: Optional[SweetFilters] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await db.run_sync(service.get_sweets_page, limit, after, order_by, fields, filters)
+
+
+async def get_sweet_rows_page(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    order_by: str = "id",
+    fields: Optional[List[str]] = None,
+    filters: Optional[SweetFilters] = None
+) -> Tuple[List[str], List[Tuple], Optional[str]]:
+    return await db.run_sync(service.get_sweet_rows_page, limit, after, order_by, fields, filters)
+
+
+async def search_sweet_rows(
+    db: AsyncSession,
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    filters: Optional[SweetFilters] = None
+) -> List[Tuple]:
+    return await db.run_sync(service.search_sweet_rows, query, limit, offset, filters)
+
+
+async def search_sweets(
+    db: AsyncSession,
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    filters: Optional[SweetFilters] = None
+) -> List[SweetResponse]:
+    return await db.run_sync(service.search_sweets, query, limit, offset, filters)
+
+
+async def suggest_sweets(db: AsyncSession, query: str, limit: int = 10) -> List[SweetSuggestion]:
+    return await db.run_sync(service.suggest_sweets, query, limit)
+
+
+async def update_sweet(db: AsyncSession, sweet_id: int, sweet_data: SweetUpdate) -> SweetResponse:
+    return await db.run_sync(service.update_sweet, sweet_id, sweet_data)
+
+
+async def delete_sweet(db: AsyncSession, sweet_id: int) -> dict:
+    return await db.run_sync(service.delete_sweet, sweet_id)
@@ -1,62 +1,198 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
+from typing import List, Optional
+from ..database import get_db, get_read_db, is_replica_session
 from ..core.dependencies import get_current_user, get_current_admin_user
-from ..models import User
-from ..schemas import SweetCreate, SweetUpdate, SweetResponse
+from ..core.sql_tracker import query_budget
+from ..schemas import (
+    BulkResult,
+    SweetCreate,
+    SweetFilters,
+    SweetResponse,
+    SweetSuggestion,
+    SweetUpdate,
+    UserResponse
+)
+from ..core.bulk import DEFAULT_BATCH_SIZE, detect_format, iter_records
+from ..core.http_cache import catalog_cache
+from ..core.serialization import FastJSONResponse, dumps, fast_responses_enabled, rows_to_dicts
+from .stream import stock_broker, stream_available
 from .service import (
     create_sweet,
-    get_all_sweets,
+    get_sweet_rows_page,
+    get_sweets_page,
+    import_sweets,
+    search_sweet_rows,
     search_sweets,
+    suggest_sweets,
     update_sweet,
-    delete_sweet
+    delete_sweet,
+    export_sweets,
+    SWEET_FIELDS
 )
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def sweet_filters(
+    category: Optional[List[str]] = Query(None, description="Exact category; repeat for several"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = Query(None, description="true for sweets with stock, false for sold out")
+) -> SweetFilters:
+    return SweetFilters(category=category, min_price=min_price, max_price=max_price, in_stock=in_stock)
 
-@router.post("", response_model=SweetResponse, status_code=201)
+
+@router.post("", response_model=SweetResponse, status_code=201, dependencies=[query_budget(3)])
 def add_sweet(
     sweet_data: SweetCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserResponse = Depends(get_current_admin_user)
 ):
     return create_sweet(db, sweet_data)
 
 
-@router.get("", response_model=List[SweetResponse])
-def view_sweets(
+@router.post("/import", response_model=BulkResult)
+def import_sweets_endpoint(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_admin_user)
 ):
-    return get_all_sweets(db)
+    records = iter_records(file, detect_format(file, format))
+    return import_sweets(db, records, batch_size)
+
+
+@router.get("", response_model=List[SweetResponse], dependencies=[query_budget(2)])
+def view_sweets(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit for the full catalog"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    order_by: str = Query("id", description="id, name, category or price; prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    filters: SweetFilters = Depends(sweet_filters),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    # Replicas may lag the catalog version, so only primary reads are cached
+    use_cache = not is_replica_session(db)
+    if use_cache:
+        cached, slot = catalog_cache.lookup(request)
+        if cached is not None:
+            return cached
+
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if fast_responses_enabled():
+        names, rows, next_cursor = get_sweet_rows_page(db, limit, after, order_by, selected, filters)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        items = rows_to_dicts(names, rows)
+        if use_cache:
+            return catalog_cache.store(slot, dumps(items), headers)
+        return FastJSONResponse(content=items, headers=headers)
+
+    items, next_cursor = get_sweets_page(db, limit, after, order_by, selected, filters)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if use_cache:
+        return catalog_cache.store(slot, items, headers)
+    if selected:
+        # Projected rows do not match SweetResponse, so skip response_model validation
+        return JSONResponse(content=items, headers=headers)
+    response.headers.update(headers)
+    return items
 
 
-@router.get("/search", response_model=List[SweetResponse])
+@router.get("/search", response_model=List[SweetResponse], dependencies=[query_budget(2)])
 def search_sweets_endpoint(
+    request: Request,
     query: str = Query(..., description="Search term for name or category"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    filters: SweetFilters = Depends(sweet_filters),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    use_cache = not is_replica_session(db)
+    if use_cache:
+        cached, slot = catalog_cache.lookup(request)
+        if cached is not None:
+            return cached
+    if fast_responses_enabled():
+        items = rows_to_dicts(SWEET_FIELDS, search_sweet_rows(db, query, limit, offset, filters))
+        if use_cache:
+            return catalog_cache.store(slot, dumps(items))
+        return FastJSONResponse(content=items)
+
+    items = search_sweets(db, query, limit, offset, filters)
+    if use_cache:
+        return catalog_cache.store(slot, items)
+    return items
+
+
+@router.get("/export")
+def export_sweets_endpoint(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_read_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    # The session dependency is closed only after the body has been sent
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_sweets(db, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sweets.{format}"'}
+    )
+
+
+@router.get("/stream")
+async def stream_stock_updates(
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    # The stream itself never queries the database, so give back any
+    # connection the principal lookup used instead of holding it open.
+    db.close()
+    if not stream_available():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Stock streaming needs a single worker; poll GET /api/sweets with If-None-Match instead"
+        )
+    return StreamingResponse(
+        stock_broker.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/suggest", response_model=List[SweetSuggestion], dependencies=[query_budget(2)])
+def suggest_sweets_endpoint(
+    q: str = Query(..., min_length=1, description="Partially typed or misspelled sweet name"),
+    limit: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user)
 ):
-    return search_sweets(db, query)
+    return suggest_sweets(db, q, limit)
 
 
-@router.put("/{sweet_id}", response_model=SweetResponse)
+@router.put("/{sweet_id}", response_model=SweetResponse, dependencies=[query_budget(4)])
 def update_sweet_endpoint(
     sweet_id: int,
     sweet_data: SweetUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserResponse = Depends(get_current_admin_user)
 ):
     return update_sweet(db, sweet_id, sweet_data)
 
 
-@router.delete("/{sweet_id}")
+@router.delete("/{sweet_id}", dependencies=[query_budget(3)])
 def delete_sweet_endpoint(
     sweet_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: UserResponse = Depends(get_current_admin_user)
 ):
     return delete_sweet(db, sweet_id)
 
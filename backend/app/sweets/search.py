@@ -0,0 +1,129 @@
+import re
+import weakref
+from typing import Optional
+from sqlalchemy import Select, column, event, select, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from ..models import Sweet
+
+# External-content FTS5 index over sweets(name, category). The triggers keep it
+# in sync for every write path, including bulk inserts and Core UPDATEs.
+_CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS sweets_fts USING fts5(
+        name, category,
+        content='sweets', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sweets_fts_ai AFTER INSERT ON sweets BEGIN
+        INSERT INTO sweets_fts(rowid, name, category)
+        VALUES (new.id, new.name, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sweets_fts_ad AFTER DELETE ON sweets BEGIN
+        INSERT INTO sweets_fts(sweets_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sweets_fts_au AFTER UPDATE OF name, category ON sweets BEGIN
+        INSERT INTO sweets_fts(sweets_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO sweets_fts(rowid, name, category)
+        VALUES (new.id, new.name, new.category);
+    END
+    """,
+]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Whether each engine's database has a usable sweets_fts table
+_fts_engines: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+
+def _has_index_table(connection: Connection) -> bool:
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sweets_fts'"
+    ).first() is not None
+
+
+def _install(connection: Connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    try:
+        for statement in _CREATE_STATEMENTS:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("INSERT INTO sweets_fts(sweets_fts) VALUES ('rebuild')")
+    except OperationalError:
+        # SQLite built without FTS5; search falls back to ILIKE
+        _fts_engines[connection.engine] = False
+        return
+    _fts_engines[connection.engine] = True
+
+
+@event.listens_for(Sweet.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    _install(connection)
+
+
+@event.listens_for(Sweet.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS sweets_fts")
+    _fts_engines.pop(connection.engine, None)
+
+
+def install_search_index(connection: Connection) -> None:
+    # create_all skips existing tables, so databases created before the index
+    # existed get it installed (and back-filled) here.
+    if connection.dialect.name != "sqlite":
+        return
+    if _has_index_table(connection):
+        _fts_engines[connection.engine] = True
+    else:
+        _install(connection)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    with engine.begin() as connection:
+        install_search_index(connection)
+
+
+def is_search_index_enabled(engine: Engine) -> bool:
+    enabled = _fts_engines.get(engine)
+    if enabled is None:
+        # Engines we never installed on (e.g. read replicas) are probed once;
+        # the index itself arrives through replication.
+        enabled = False
+        if engine.dialect.name == "sqlite":
+            with engine.connect() as connection:
+                enabled = _has_index_table(connection)
+        _fts_engines[engine] = enabled
+    return enabled
+
+
+def build_match_query(query: str) -> Optional[str]:
+    # Every token must match as a prefix, so partially typed words from the
+    # search box still find results. Quoting keeps FTS5 syntax out of reach.
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+
+sweets_fts = table("sweets_fts", column("rowid"), column("name"), column("category"))
+
+
+def match_sweets(match: str) -> Select:
+    # Ranked with bm25, weighting name matches over category matches. Built on
+    # the Core table to skip ORM compilation on this per-keystroke path.
+    sweets = Sweet.__table__
+    return (
+        select(sweets.c.id, sweets.c.name, sweets.c.category, sweets.c.price, sweets.c.quantity)
+        .join(sweets_fts, sweets_fts.c.rowid == sweets.c.id)
+        .where(text("sweets_fts MATCH :match").bindparams(match=match))
+        .order_by(text("bm25(sweets_fts, 2.0, 1.0)"), sweets.c.id)
+    )
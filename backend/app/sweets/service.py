@@ -1,9 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import Select, insert, literal_column, or_, select, tuple_
 from fastapi import HTTPException, status
-from typing import List, Optional
+from pydantic import ValidationError
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from ..models import Sweet
-from ..schemas import SweetCreate, SweetUpdate, SweetResponse
+from ..schemas import BulkResult, SweetCreate, SweetFilters, SweetUpdate, SweetResponse, SweetSuggestion
+from ..core.bulk import Record, add_error, chunked, encode_rows, validation_message
+from ..core.events import publish_catalog_change
+from ..core.pagination import decode_cursor, encode_cursor
+from ..inventory.history import movement, record_movements
+from .search import build_match_query, is_search_index_enabled, match_sweets
+from .suggest import get_suggest_index, invalidate_suggest_index, loaded_suggest_index
 
 
 def create_sweet(db: Session, sweet_data: SweetCreate) -> SweetResponse:
@@ -14,15 +21,23 @@ def create_sweet(db: Session, sweet_data: SweetCreate) -> SweetResponse:
         quantity=sweet_data.quantity
     )
     db.add(db_sweet)
-    db.commit()
-    db.refresh(db_sweet)
-    return SweetResponse(
+    db.flush()
+    if db_sweet.quantity:
+        record_movements(db, [movement(db_sweet.id, db_sweet.quantity, "create")])
+    # Read back from the flushed object: refreshing after commit is another SELECT
+    created = SweetResponse(
         id=db_sweet.id,
         name=db_sweet.name,
         category=db_sweet.category,
         price=db_sweet.price,
         quantity=db_sweet.quantity
     )
+    db.commit()
+    index = loaded_suggest_index(db)
+    if index is not None:
+        index.upsert(created.id, created.name, created.category)
+    publish_catalog_change("create", created.id, created.quantity)
+    return created
 
 
 def get_all_sweets(db: Session) -> List[SweetResponse]:
@@ -39,22 +54,189 @@ def get_all_sweets(db: Session) -> List[SweetResponse]:
     ]
 
 
-def search_sweets(db: Session, query: str) -> List[SweetResponse]:
-    sweets = db.query(Sweet).filter(
+SWEET_FIELDS = ("id", "name", "category", "price", "quantity")
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_sweets(db: Session, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Encodes the whole catalog as CSV or NDJSON, one chunk per batch.
+
+    Rows are fetched ``batch_size`` at a time with yield_per (a server-side
+    cursor where the driver has one), so memory stays flat however large the
+    catalog is. The session must stay open until the iterator is exhausted.
+    """
+    stmt = (
+        select(*(getattr(Sweet, field) for field in SWEET_FIELDS))
+        .order_by(Sweet.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = db.execute(stmt)
+    try:
+        if fmt == "csv":
+            yield encode_rows([], SWEET_FIELDS, fmt)
+        for partition in result.partitions():
+            yield encode_rows(partition, SWEET_FIELDS, fmt, header=False)
+    finally:
+        result.close()
+
+
+
+# Only indexed columns may drive keyset pagination, so every page is an index range scan
+SORTABLE_COLUMNS = {
+    "id": Sweet.id,
+    "name": Sweet.name,
+    "category": Sweet.category,
+    "price": Sweet.price,
+}
+
+
+def apply_sweet_filters(stmt: Select, filters: Optional[SweetFilters]) -> Select:
+    if filters is None:
+        return stmt
+    if filters.category:
+        stmt = stmt.where(Sweet.category.in_(filters.category))
+    if filters.min_price is not None:
+        stmt = stmt.where(Sweet.price >= filters.min_price)
+    if filters.max_price is not None:
+        stmt = stmt.where(Sweet.price <= filters.max_price)
+    if filters.in_stock is not None:
+        # Literal 0 so SQLite can match the ix_sweets_in_stock partial index
+        in_stock = Sweet.quantity > literal_column("0")
+        stmt = stmt.where(in_stock if filters.in_stock else ~in_stock)
+    return stmt
+
+
+def get_sweet_rows_page(
+    db: Session,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    order_by: str = "id",
+    fields: Optional[List[str]] = None,
+    filters: Optional[SweetFilters] = None
+) -> Tuple[List[str], List[Tuple], Optional[str]]:
+    """Like get_sweets_page, but returns the selected field names and plain
+    row tuples in that order, for callers that encode rows themselves."""
+    descending = order_by.startswith("-")
+    key = order_by.lstrip("-")
+    if key not in SORTABLE_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot order by '{key}'. Allowed: {', '.join(SORTABLE_COLUMNS)}"
+        )
+    selected = list(fields) if fields else list(SWEET_FIELDS)
+    unknown = [field for field in selected if field not in SWEET_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    # The id is always the tie-breaker, so (sort column, id) is a unique keyset
+    sort_column = SORTABLE_COLUMNS[key]
+    keyset = [Sweet.id] if key == "id" else [sort_column, Sweet.id]
+    needed = list(dict.fromkeys([column.key for column in keyset] + selected))
+
+    stmt = apply_sweet_filters(select(*(getattr(Sweet, field) for field in needed)), filters)
+    stmt = stmt.order_by(*(column.desc() if descending else column.asc() for column in keyset))
+    if after is not None:
+        values = decode_cursor(after, len(keyset))
+        current = tuple_(*keyset) if len(keyset) > 1 else keyset[0]
+        boundary = tuple_(*values) if len(keyset) > 1 else values[0]
+        stmt = stmt.where(current < boundary if descending else current > boundary)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    rows = db.execute(stmt).all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor([last[column.key] for column in keyset])
+
+    positions = [needed.index(field) for field in selected]
+    if positions != list(range(len(needed))):
+        rows = [tuple(row[i] for i in positions) for row in rows]
+    return selected, rows, next_cursor
+
+
+def get_sweets_page(
+    db: Session,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    order_by: str = "id",
+    fields: Optional[List[str]] = None,
+    filters: Optional[SweetFilters] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    selected, rows, next_cursor = get_sweet_rows_page(db, limit, after, order_by, fields, filters)
+    return [dict(zip(selected, row)) for row in rows], next_cursor
+
+
+def search_sweet_rows(
+    db: Session,
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    filters: Optional[SweetFilters] = None
+) -> List[Tuple]:
+    # Rows carry SWEET_FIELDS in order
+    if not is_search_index_enabled(db.get_bind()):
+        return search_sweet_rows_ilike(db, query, limit, offset, filters)
+
+    match = build_match_query(query)
+    if match is None:
+        return []
+    stmt = apply_sweet_filters(match_sweets(match), filters).offset(offset).limit(limit)
+    return db.execute(stmt).all()
+
+
+def search_sweet_rows_ilike(
+    db: Session,
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    filters: Optional[SweetFilters] = None
+) -> List[Tuple]:
+    stmt = select(*(getattr(Sweet, field) for field in SWEET_FIELDS)).where(
         or_(
             Sweet.name.ilike(f"%{query}%"),
             Sweet.category.ilike(f"%{query}%")
         )
-    ).all()
+    )
+    stmt = apply_sweet_filters(stmt, filters).order_by(Sweet.id).offset(offset).limit(limit)
+    return db.execute(stmt).all()
+
+
+def _sweet_responses(rows: Iterable[Tuple]) -> List[SweetResponse]:
     return [
-        SweetResponse(
-            id=sweet.id,
-            name=sweet.name,
-            category=sweet.category,
-            price=sweet.price,
-            quantity=sweet.quantity
-        )
-        for sweet in sweets
+        SweetResponse(id=row[0], name=row[1], category=row[2], price=row[3], quantity=row[4])
+        for row in rows
+    ]
+
+
+def search_sweets(
+    db: Session,
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    filters: Optional[SweetFilters] = None
+) -> List[SweetResponse]:
+    return _sweet_responses(search_sweet_rows(db, query, limit, offset, filters))
+
+
+def search_sweets_ilike(
+    db: Session,
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    filters: Optional[SweetFilters] = None
+) -> List[SweetResponse]:
+    return _sweet_responses(search_sweet_rows_ilike(db, query, limit, offset, filters))
+
+
+def suggest_sweets(db: Session, query: str, limit: int = 10) -> List[SweetSuggestion]:
+    return [
+        SweetSuggestion(id=sweet_id, name=name, category=category, score=round(score, 4))
+        for score, sweet_id, name, category in get_suggest_index(db).suggest(query, limit)
     ]
 
 
@@ -77,24 +259,57 @@ def update_sweet(db: Session, sweet_id: int, sweet_data: SweetUpdate) -> SweetRe
         sweet.category = sweet_data.category
     if sweet_data.price is not None:
         sweet.price = sweet_data.price
-    if sweet_data.quantity is not None:
+    if sweet_data.quantity is not None and sweet_data.quantity != sweet.quantity:
+        record_movements(db, [movement(sweet.id, sweet_data.quantity - sweet.quantity, "adjust")])
         sweet.quantity = sweet_data.quantity
     
-    db.commit()
-    db.refresh(sweet)
-    
-    return SweetResponse(
+    updated = SweetResponse(
         id=sweet.id,
         name=sweet.name,
         category=sweet.category,
         price=sweet.price,
         quantity=sweet.quantity
     )
+    db.commit()
+    index = loaded_suggest_index(db)
+    if index is not None:
+        index.upsert(updated.id, updated.name, updated.category)
+    publish_catalog_change("update", updated.id, updated.quantity)
+    return updated
 
 
 def delete_sweet(db: Session, sweet_id: int) -> dict:
     sweet = get_sweet_by_id(db, sweet_id)
     db.delete(sweet)
     db.commit()
+    index = loaded_suggest_index(db)
+    if index is not None:
+        index.remove(sweet_id)
+    publish_catalog_change("delete", sweet_id)
     return {"message": "Sweet deleted successfully"}
 
+
+
+def import_sweets(db: Session, records: Iterable[Record], batch_size: int) -> BulkResult:
+    result = BulkResult()
+    for chunk in chunked(records, batch_size):
+        rows = []
+        for line, record, error in chunk:
+            result.processed += 1
+            if error is None:
+                try:
+                    rows.append(SweetCreate.model_validate(record).model_dump())
+                    continue
+                except ValidationError as exc:
+                    error = validation_message(exc)
+            add_error(result, line, error)
+
+        if rows:
+            created = db.execute(insert(Sweet).returning(Sweet.id, Sweet.quantity), rows).all()
+            record_movements(db, [movement(row.id, row.quantity, "create") for row in created if row.quantity])
+            db.commit()
+            result.succeeded += len(rows)
+            publish_catalog_change("import")
+    if result.succeeded:
+        invalidate_suggest_index(db)
+    return result
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import threading
+from typing import AsyncIterator, List, Optional
+from ..core.events import CatalogEvent, subscribe
+
+STREAM_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15.0
+
+# Sentinel queued for a subscriber that fell too far behind
+_OVERFLOW = object()
+
+
+def stream_available() -> bool:
+    # Events reach only the clients of the worker that handled the write, so
+    # the stream is refused when several workers serve the app. serve.py sets
+    # WEB_CONCURRENCY; set it for uvicorn --workers and gunicorn as well.
+    return int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+
+
+def format_event(change: CatalogEvent) -> str:
+    # Single-sweet changes carry the new stock; anything broader (imports,
+    # bulk restocks, a reset table) only tells clients to re-fetch.
+    if change.sweet_id is None:
+        return f"id: {change.version}\nevent: refresh\ndata: {{}}\n\n"
+    data = json.dumps(
+        {"id": change.sweet_id, "quantity": change.quantity, "kind": change.kind},
+        separators=(",", ":")
+    )
+    return f"id: {change.version}\nevent: stock\ndata: {data}\n\n"
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def deliver(self, change: CatalogEvent) -> None:
+        # Runs on the subscriber's event loop
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # Slow consumer: discard its backlog and end the stream so the
+            # client reconnects and re-fetches instead of reading stale events.
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_OVERFLOW)
+
+
+class StockBroker:
+    # Fans catalog change events out to streaming clients. Publishers run in
+    # worker threads, so events are handed to each client's loop thread-safely.
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        if subscription.dropped:
+            self.dropped += 1
+
+    def publish(self, change: CatalogEvent) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, change)
+            except RuntimeError:
+                # The client's loop has already closed
+                self.unsubscribe(subscription)
+
+    async def events(self, heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        subscription = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    change: Optional[object] = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": ping\n\n"
+                    continue
+                if change is _OVERFLOW:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                yield format_event(change)
+        finally:
+            self.unsubscribe(subscription)
+
+
+stock_broker = StockBroker()
+subscribe(stock_broker.publish)
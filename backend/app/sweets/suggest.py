@@ -0,0 +1,180 @@
+import heapq
+import re
+import secrets
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..models import Sweet
+from ..core.cache import Cache, get_cache_backend
+from ..core.events import CatalogEvent, subscribe
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+CATEGORY_WEIGHT = 0.8
+MIN_SCORE = 0.3
+# Candidates scored exactly per requested suggestion
+CANDIDATES_PER_RESULT = 20
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    # pg_trgm style: each word is padded so prefixes carry extra weight
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class SuggestIndex:
+    def __init__(self, version: Optional[str] = None):
+        # Shared names version the index was loaded at, see _names_version
+        self.version = version
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[str, str, FrozenSet[str], FrozenSet[str]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _unlink(self, sweet_id: int) -> None:
+        entry = self._entries.pop(sweet_id, None)
+        if entry is None:
+            return
+        for gram in entry[2] | entry[3]:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(sweet_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def upsert(self, sweet_id: int, name: str, category: str) -> None:
+        name_grams = trigrams(name)
+        category_grams = trigrams(category)
+        with self._lock:
+            self._unlink(sweet_id)
+            self._entries[sweet_id] = (name, category, name_grams, category_grams)
+            for gram in name_grams | category_grams:
+                self._postings.setdefault(gram, set()).add(sweet_id)
+
+    def remove(self, sweet_id: int) -> None:
+        with self._lock:
+            self._unlink(sweet_id)
+
+    def load(self, rows: Iterable[Tuple[int, str, str]]) -> None:
+        for sweet_id, name, category in rows:
+            self.upsert(sweet_id, name, category)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Tuple[float, int, str, str]]:
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        with self._lock:
+            hits = Counter()
+            for gram in query_grams:
+                hits.update(self._postings.get(gram, ()))
+            candidates = [sweet_id for sweet_id, _ in hits.most_common(limit * CANDIDATES_PER_RESULT)]
+
+            scored = []
+            for sweet_id in candidates:
+                name, category, name_grams, category_grams = self._entries[sweet_id]
+                score = max(
+                    _similarity(query_grams, name_grams),
+                    _similarity(query_grams, category_grams) * CATEGORY_WEIGHT
+                )
+                if score >= MIN_SCORE:
+                    scored.append((score, sweet_id, name, category))
+        return heapq.nlargest(limit, scored, key=lambda item: (item[0], -len(item[2]), -item[1]))
+
+
+def _similarity(query_grams: FrozenSet[str], grams: FrozenSet[str]) -> float:
+    # How much of the query is covered, lightly penalising long unrelated text
+    common = len(query_grams & grams)
+    if not common:
+        return 0.0
+    coverage = common / len(query_grams)
+    jaccard = common / len(query_grams | grams)
+    return 0.8 * coverage + 0.2 * jaccard
+
+
+# One index per database so separate databases (tests, replicas) never mix
+# data. Keyed by URL without the driver: in async mode the async engine and
+# the sync engine of the bulk upload routes are two engines on one database.
+_indexes: Dict[str, SuggestIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_key(engine: Engine) -> str:
+    url = engine.url
+    return url.set(drivername=url.get_backend_name()).render_as_string(hide_password=False)
+
+
+# Writes update the index of the process that made them in place. Workers
+# sharing a cache backend also see a token there that changes with every
+# write that can add, rename or remove a sweet, and reload their index when
+# it no longer matches. Stock changes never touch the token, so purchases
+# cause no reloads.
+NAME_CHANGES = frozenset({"create", "update", "delete", "import", "reset"})
+NAMES_VERSION_KEY = "names_version"
+_suggest_state = Cache("suggest", maxsize=1)
+
+
+def _names_version() -> Optional[str]:
+    # None with a per-process backend, or when the shared one is unreachable:
+    # the loaded index is used as it is
+    if not get_cache_backend().shared:
+        return None
+    token = _suggest_state.get(NAMES_VERSION_KEY)
+    if token is None:
+        _suggest_state.add(NAMES_VERSION_KEY, secrets.token_hex(8).encode())
+        token = _suggest_state.get(NAMES_VERSION_KEY)
+    return token.decode() if token is not None else None
+
+
+def _bump_names_version(change: CatalogEvent) -> None:
+    if change.kind not in NAME_CHANGES or not get_cache_backend().shared:
+        return
+    previous = _suggest_state.get(NAMES_VERSION_KEY)
+    token = secrets.token_hex(8).encode()
+    if not _suggest_state.set(NAMES_VERSION_KEY, token):
+        return
+    # This process already applied the change to its own index; an index that
+    # was current before it stays current
+    for index in list(_indexes.values()):
+        if previous is not None and index.version == previous.decode():
+            index.version = token.decode()
+
+
+subscribe(_bump_names_version)
+
+
+def get_suggest_index(db: Session) -> SuggestIndex:
+    key = _index_key(db.get_bind())
+    version = _names_version()
+    index = _indexes.get(key)
+    if index is not None and (version is None or index.version == version):
+        return index
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or (version is not None and index.version != version):
+            index = SuggestIndex(version)
+            index.load(db.execute(select(Sweet.id, Sweet.name, Sweet.category)).all())
+            _indexes[key] = index
+    return index
+
+
+def loaded_suggest_index(db: Session):
+    # Writers only maintain an index that has already been built; an unbuilt
+    # one will read the committed rows when it is first requested.
+    return _indexes.get(_index_key(db.get_bind()))
+
+
+def invalidate_suggest_index(db: Session) -> None:
+    _indexes.pop(_index_key(db.get_bind()), None)
+
+
+@event.listens_for(Sweet.__table__, "before_drop")
+def _drop_suggest_index(target, connection, **kw):
+    _indexes.pop(_index_key(connection.engine), None)
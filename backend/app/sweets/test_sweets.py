@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -199,3 +200,435 @@ def test_admin_can_delete_sweet(client, admin_token):
     )
     assert len(get_response.json()) == 0
 
+
+
+def test_admin_can_import_sweets_csv(client, admin_token):
+    csv_body = (
+        "name,category,price,quantity\n"
+        "Chocolate Bar,Chocolate,5.99,10\n"
+        "Gummy Bears,Gummies,not-a-price,20\n"
+        "Toffee,Candy,1.25,\n"
+    )
+    response = client.post(
+        "/api/sweets/import?batch_size=2",
+        files={"file": ("sweets.csv", csv_body, "text/csv")},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["processed"] == 3
+    assert data["succeeded"] == 2
+    assert data["failed"] == 1
+    assert data["errors"][0]["line"] == 3
+    
+    sweets = client.get(
+        "/api/sweets",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()
+    assert {s["name"]: s["quantity"] for s in sweets} == {"Chocolate Bar": 10, "Toffee": 0}
+
+
+def test_admin_can_import_sweets_ndjson(client, admin_token):
+    ndjson_body = (
+        '{"name": "Ladoo", "category": "Indian", "price": 2.5, "quantity": 4}\n'
+        "\n"
+        "{broken\n"
+        '{"name": "Barfi", "category": "Indian", "price": 3.0}\n'
+    )
+    response = client.post(
+        "/api/sweets/import?format=ndjson",
+        files={"file": ("sweets.txt", ndjson_body, "application/octet-stream")},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert data["errors"][0]["line"] == 3
+
+
+def test_import_rejects_an_upload_that_is_not_utf8(client, admin_token):
+    csv_body = "name,category,price\nLadoo,Indian,2.5\nCr\u00e8me br\u00fbl\u00e9e,French,4.0\n".encode("latin-1")
+    response = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", csv_body, "text/csv")},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 400
+    assert "line 3" in response.json()["detail"]
+    assert client.get("/api/sweets", headers={"Authorization": f"Bearer {admin_token}"}).json() == []
+
+
+def test_user_cannot_import_sweets(client, user_token):
+    response = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", "name,category,price\n", "text/csv")},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
+
+
+def _add_sweets(client, admin_token, sweets):
+    for name, category, price in sweets:
+        client.post(
+            "/api/sweets",
+            json={"name": name, "category": category, "price": price, "quantity": 1},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+
+
+def test_view_sweets_keyset_pagination(client, admin_token):
+    _add_sweets(client, admin_token, [
+        ("Ladoo", "Indian", 2.0),
+        ("Toffee", "Candy", 1.0),
+        ("Barfi", "Indian", 2.0),
+        ("Fudge", "Candy", 3.0),
+        ("Jalebi", "Indian", 1.5),
+    ])
+    
+    names = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "order_by": "-price"}
+        if cursor:
+            params["after"] = cursor
+        response = client.get(
+            "/api/sweets",
+            params=params,
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        names.extend(sweet["name"] for sweet in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    
+    assert names == ["Fudge", "Barfi", "Ladoo", "Jalebi", "Toffee"]
+
+
+def test_view_sweets_field_projection(client, admin_token):
+    _add_sweets(client, admin_token, [("Ladoo", "Indian", 2.0), ("Toffee", "Candy", 1.0)])
+    
+    response = client.get(
+        "/api/sweets?fields=name,price&order_by=name&limit=1",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"name": "Ladoo", "price": 2.0}]
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_view_sweets_rejects_bad_parameters(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.get("/api/sweets?order_by=quantity", headers=headers).status_code == 400
+    assert client.get("/api/sweets?fields=secret", headers=headers).status_code == 400
+    assert client.get("/api/sweets?after=not-a-cursor", headers=headers).status_code == 400
+    from ..core.pagination import encode_cursor
+    for values in ([{"a": 1}], [[1, 2]], [None], [True]):
+        response = client.get("/api/sweets", params={"limit": 1, "after": encode_cursor(values)}, headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_search_uses_full_text_index(client, admin_token, db):
+    from .search import is_search_index_enabled
+    assert is_search_index_enabled(db.get_bind())
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    _add_sweets(client, admin_token, [
+        ("Gulab Jamun", "Indian", 2.0),
+        ("Chocolate Bar", "Chocolate", 5.0),
+        ("Dark Chocolate Truffle", "Truffles", 6.0),
+    ])
+    
+    # Prefix and multi-token matching
+    response = client.get("/api/sweets/search?query=gul jam", headers=headers)
+    assert [s["name"] for s in response.json()] == ["Gulab Jamun"]
+    
+    # Ranking favours matches in both name and category, pagination applies
+    response = client.get("/api/sweets/search?query=choco", headers=headers)
+    assert [s["name"] for s in response.json()] == ["Chocolate Bar", "Dark Chocolate Truffle"]
+    response = client.get("/api/sweets/search?query=choco&limit=1&offset=1", headers=headers)
+    assert [s["name"] for s in response.json()] == ["Dark Chocolate Truffle"]
+
+
+def test_search_index_follows_updates_and_deletes(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    sweet_id = client.post(
+        "/api/sweets",
+        json={"name": "Toffee", "category": "Candy", "price": 1.0, "quantity": 1},
+        headers=headers
+    ).json()["id"]
+    
+    client.put(f"/api/sweets/{sweet_id}", json={"name": "Fudge"}, headers=headers)
+    assert client.get("/api/sweets/search?query=toffee", headers=headers).json() == []
+    assert len(client.get("/api/sweets/search?query=fudge", headers=headers).json()) == 1
+    
+    client.delete(f"/api/sweets/{sweet_id}", headers=headers)
+    assert client.get("/api/sweets/search?query=fudge", headers=headers).json() == []
+
+
+def test_suggest_tolerates_typos_and_tracks_changes(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    _add_sweets(client, admin_token, [
+        ("Gulab Jamun", "Indian", 2.0),
+        ("Kaju Katli", "Indian", 4.0),
+        ("Chocolate Bar", "Chocolate", 5.0),
+    ])
+    
+    response = client.get("/api/sweets/suggest?q=gulab jamon", headers=headers)
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Gulab Jamun"
+    assert client.get("/api/sweets/suggest?q=choclate", headers=headers).json()[0]["name"] == "Chocolate Bar"
+    
+    # Sweets created after the index was built are picked up incrementally
+    _add_sweets(client, admin_token, [("Rasgulla", "Indian", 1.5)])
+    assert client.get("/api/sweets/suggest?q=rasgula", headers=headers).json()[0]["name"] == "Rasgulla"
+    
+    sweet_id = client.get("/api/sweets/suggest?q=kaju", headers=headers).json()[0]["id"]
+    client.delete(f"/api/sweets/{sweet_id}", headers=headers)
+    assert all(s["id"] != sweet_id for s in client.get("/api/sweets/suggest?q=kaju", headers=headers).json())
+
+
+def test_suggest_index_ranks_closest_match_first():
+    from .suggest import SuggestIndex
+    index = SuggestIndex()
+    index.load([(1, "Gulab Jamun", "Indian"), (2, "Gulkand Barfi", "Indian"), (3, "Toffee", "Candy")])
+    
+    results = index.suggest("gulab jamun", limit=2)
+    assert [sweet_id for _, sweet_id, _, _ in results][0] == 1
+    assert index.suggest("xyz") == []
+    
+    index.upsert(3, "Gulab Toffee", "Candy")
+    assert 3 in [sweet_id for _, sweet_id, _, _ in index.suggest("gulab")]
+    index.remove(3)
+    assert 3 not in [sweet_id for _, sweet_id, _, _ in index.suggest("gulab")]
+
+
+def test_view_and_search_sweets_with_filters(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for name, category, price, quantity in [
+        ("Ladoo", "Indian", 2.0, 5),
+        ("Barfi", "Indian", 4.0, 0),
+        ("Toffee", "Candy", 1.0, 3),
+        ("Fudge", "Candy", 6.0, 2),
+        ("Truffle", "Chocolate", 3.0, 1),
+    ]:
+        client.post(
+            "/api/sweets",
+            json={"name": name, "category": category, "price": price, "quantity": quantity},
+            headers=headers
+        )
+    
+    response = client.get(
+        "/api/sweets?category=Indian&category=Candy&max_price=5&in_stock=true&order_by=price",
+        headers=headers
+    )
+    assert [s["name"] for s in response.json()] == ["Toffee", "Ladoo"]
+    
+    response = client.get("/api/sweets?in_stock=false", headers=headers)
+    assert [s["name"] for s in response.json()] == ["Barfi"]
+    
+    response = client.get("/api/sweets?min_price=2&limit=2&order_by=price", headers=headers)
+    assert [s["name"] for s in response.json()] == ["Ladoo", "Truffle"]
+    response = client.get(
+        f"/api/sweets?min_price=2&limit=2&order_by=price&after={response.headers['X-Next-Cursor']}",
+        headers=headers
+    )
+    assert [s["name"] for s in response.json()] == ["Barfi", "Fudge"]
+    
+    response = client.get("/api/sweets/search?query=fudge&max_price=5", headers=headers)
+    assert response.json() == []
+
+
+def _query_plan(db, stmt):
+    from sqlalchemy import text
+    compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    return " ".join(row[3] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+
+def test_filters_use_composite_and_partial_indexes(db):
+    from sqlalchemy import select
+    from ..models import Sweet
+    from ..schemas import SweetFilters
+    from .service import apply_sweet_filters
+    
+    by_category = apply_sweet_filters(
+        select(Sweet.id),
+        SweetFilters(category=["Indian", "Candy"], min_price=1, max_price=5)
+    )
+    assert "ix_sweets_category_price" in _query_plan(db, by_category)
+    
+    in_stock = apply_sweet_filters(select(Sweet.id), SweetFilters(in_stock=True)).order_by(Sweet.price)
+    assert "ix_sweets_in_stock" in _query_plan(db, in_stock)
+
+
+def test_catalog_reads_are_cached_with_etags(client, admin_token):
+    from ..core.http_cache import catalog_cache
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    _add_sweets(client, admin_token, [("Ladoo", "Indian", 2.0), ("Toffee", "Candy", 1.0)])
+    
+    first = client.get("/api/sweets", params={"limit": 1}, headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["X-Next-Cursor"]
+    
+    hits = catalog_cache.stats()["hits"]
+    again = client.get("/api/sweets", params={"limit": 1}, headers=headers)
+    assert again.content == first.content
+    assert again.headers["ETag"] == etag
+    assert again.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert catalog_cache.stats()["hits"] == hits + 1
+    
+    not_modified = client.get("/api/sweets", params={"limit": 1}, headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    
+    # Other pages and queries get their own tags
+    other = client.get("/api/sweets", params={"limit": 2}, headers=headers)
+    search = client.get("/api/sweets/search", params={"query": "ladoo"}, headers=headers)
+    assert len({etag, other.headers["ETag"], search.headers["ETag"]}) == 3
+    
+    # Any stock change bumps the catalog version and invalidates the tags
+    client.post("/api/sweets/1/purchase", json={"quantity": 1}, headers=headers)
+    changed = client.get("/api/sweets", params={"limit": 1}, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["quantity"] == 0
+
+
+def test_stock_broker_pushes_changes_and_drops_slow_consumers():
+    import asyncio
+    from ..core.events import publish_catalog_change
+    from .stream import StockBroker, stock_broker
+
+    async def scenario():
+        stream = stock_broker.events(heartbeat=0.05)
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        assert await stream.__anext__() == ": ping\n\n"
+        change = publish_catalog_change("purchase", 7, 3)
+        assert await stream.__anext__() == (
+            f"id: {change.version}\nevent: stock\n"
+            'data: {"id":7,"quantity":3,"kind":"purchase"}\n\n'
+        )
+        publish_catalog_change("import")
+        assert "event: refresh" in await stream.__anext__()
+        await stream.aclose()
+        assert len(stock_broker) == 0
+
+        broker = StockBroker(queue_size=2)
+        slow = broker.events()
+        await slow.__anext__()
+        for quantity in range(5):
+            broker.publish(publish_catalog_change("restock", 1, quantity))
+        await asyncio.sleep(0)
+        assert await slow.__anext__() == "event: overflow\ndata: {}\n\n"
+        with pytest.raises(StopAsyncIteration):
+            await slow.__anext__()
+        assert broker.dropped == 1 and len(broker) == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_requires_authentication(client):
+    assert client.get("/api/sweets/stream").status_code == 401
+
+
+def test_stream_is_refused_with_several_workers(client, user_token, monkeypatch):
+    # Each worker would only see its own writes' events
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    response = client.get("/api/sweets/stream", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 503
+
+
+def test_export_streams_catalog_as_ndjson_and_csv(client, admin_token):
+    for name, price in (("Chocolate Bar", 5.99), ("Gulab Jamun", 3.5)):
+        client.post(
+            "/api/sweets",
+            json={"name": name, "category": "Mixed", "price": price, "quantity": 4},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.get("/api/sweets/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["name"] for line in lines] == ["Chocolate Bar", "Gulab Jamun"]
+    assert lines[1] == {"id": lines[1]["id"], "name": "Gulab Jamun", "category": "Mixed", "price": 3.5, "quantity": 4}
+
+    response = client.get("/api/sweets/export?format=csv", headers=headers)
+    assert response.text.splitlines() == [
+        "id,name,category,price,quantity",
+        f"{lines[0]['id']},Chocolate Bar,Mixed,5.99,4",
+        f"{lines[1]['id']},Gulab Jamun,Mixed,3.5,4",
+    ]
+    assert client.get("/api/sweets/export").status_code == 401
+
+
+def test_export_memory_stays_flat_as_catalog_grows(db):
+    import tracemalloc
+    from sqlalchemy import insert
+    from ..models import Sweet
+    from .service import export_sweets
+
+    def peak_while_exporting(fmt):
+        tracemalloc.start()
+        exported = sum(chunk.count("\n") for chunk in export_sweets(db, fmt, batch_size=500))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return exported, peak
+
+    peaks = []
+    for total in (5000, 50000):
+        rows = [
+            {"name": f"Sweet {i:06d}", "category": f"Category {i % 20}", "price": 1 + i % 50, "quantity": i % 7}
+            for i in range(db.query(Sweet).count(), total)
+        ]
+        db.execute(insert(Sweet), rows)
+        db.commit()
+        del rows
+        exported, peak = peak_while_exporting("ndjson")
+        assert exported == total
+        peaks.append(peak)
+
+    # Ten times the rows, same batch-sized working set
+    assert peaks[1] < peaks[0] * 1.5
+    assert peaks[1] < 2 * 1024 * 1024
+    assert peak_while_exporting("csv")[1] < 2 * 1024 * 1024
+
+
+def test_fast_responses_match_validated_responses(client, admin_token, monkeypatch):
+    from ..core import serialization
+    from ..core.http_cache import catalog_cache
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for name, category, price in (("Kaju Katli", "Indian", 12.5), ("Milk Chocolate", "Chocolate", 3.0), ("Ladoo", "Indian", 4.25)):
+        client.post(
+            "/api/sweets",
+            json={"name": name, "category": category, "price": price, "quantity": 2},
+            headers=headers
+        )
+    urls = [
+        "/api/sweets",
+        "/api/sweets?fields=price,name&order_by=-price",
+        "/api/sweets?limit=2&order_by=name",
+        "/api/sweets/search?query=indian",
+    ]
+
+    def fetch_all():
+        catalog_cache.clear()
+        responses = [client.get(url, headers=headers) for url in urls]
+        return [(response.json(), response.headers.get("x-next-cursor")) for response in responses]
+
+    expected = fetch_all()
+    monkeypatch.setattr(serialization, "FAST_RESPONSES", True)
+    assert fetch_all() == expected
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert fetch_all() == expected
+    assert expected[1][0][0] == {"price": 12.5, "name": "Kaju Katli"}
+
+    # The documented response model is unchanged
+    schema = client.get("/openapi.json").json()
+    listing = schema["paths"]["/api/sweets"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert listing["items"]["$ref"].endswith("/SweetResponse")
@@ -0,0 +1,143 @@
+from contextlib import asynccontextmanager
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from .database import Base, get_async_db, get_db
+from .main import include_routers
+from .models import User, UserRole
+from .core.security import create_access_token, get_password_hash
+from .sweets.search import install_search_index
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_async.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test_async.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# NullPool: the TestClient event loop must not reuse connections opened by another loop
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+sessions_used = []
+
+
+@pytest.fixture
+def client(db):
+    sessions_used.clear()
+    @asynccontextmanager
+    async def lifespan(app):
+        async with async_engine.begin() as connection:
+            await connection.run_sync(install_search_index)
+        yield
+    
+    async def override_get_async_db():
+        sessions_used.append("async")
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+    
+    def override_get_db():
+        sessions_used.append("sync")
+        yield db
+    
+    app = FastAPI(lifespan=lifespan)
+    include_routers(app, async_mode=True)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def admin_token(db):
+    user = User(email="admin@example.com", password=get_password_hash("admin123"), role=UserRole.ADMIN)
+    db.add(user)
+    db.commit()
+    return create_access_token(data={"sub": user.email, "role": user.role.value})
+
+
+def test_async_mode_routes_hot_paths_to_async_session(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    
+    assert client.get("/api/sweets", headers=headers).status_code == 200
+    assert sessions_used == ["async"]
+    
+    # Routes without an async port fall through to the sync handler
+    sessions_used.clear()
+    response = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", "name,category,price\nLadoo,Indian,2\n", "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert sessions_used == ["sync"]
+    
+    operations = client.get("/openapi.json").json()["paths"]["/api/sweets"]
+    assert set(operations) == {"get", "post"}
+
+
+def test_async_mode_end_to_end(client, admin_token):
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "user@example.com", "password": "user123"}
+    )
+    assert response.status_code == 201
+    token = client.post(
+        "/api/auth/login",
+        data={"username": "user@example.com", "password": "user123"}
+    ).json()["access_token"]
+    user = {"Authorization": f"Bearer {token}"}
+    
+    sweet = client.post(
+        "/api/sweets",
+        json={"name": "Gulab Jamun", "category": "Indian", "price": 2.0, "quantity": 5},
+        headers=admin
+    ).json()
+    
+    response = client.post(f"/api/sweets/{sweet['id']}/purchase", json={"quantity": 2}, headers=user)
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 3
+    response = client.post(f"/api/sweets/{sweet['id']}/purchase", json={"quantity": 9}, headers=user)
+    assert response.status_code == 400
+    
+    response = client.post(f"/api/sweets/{sweet['id']}/restock", json={"quantity": 7}, headers=admin)
+    assert response.json()["quantity"] == 10
+    
+    assert client.get("/api/sweets/search?query=gul", headers=user).json()[0]["id"] == sweet["id"]
+    assert client.get("/api/sweets/suggest?q=gulab jamon", headers=user).json()[0]["id"] == sweet["id"]
+    
+    client.put(f"/api/sweets/{sweet['id']}", json={"price": 2.5}, headers=admin)
+    assert client.get("/api/sweets", headers=user).json()[0]["price"] == 2.5
+    
+    assert client.delete(f"/api/sweets/{sweet['id']}", headers=admin).status_code == 200
+    assert client.get("/api/sweets", headers=user).json() == []
+
+
+def test_async_mode_suggests_sweets_imported_through_sync_routes(client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    # Builds the index through the async engine
+    assert client.get("/api/sweets/suggest?q=gulab", headers=headers).json() == []
+
+    response = client.post(
+        "/api/sweets/import",
+        files={"file": ("sweets.csv", "name,category,price\nGulab Jamun,Indian,2\n", "text/csv")},
+        headers=headers
+    )
+    assert response.json()["succeeded"] == 1
+    assert client.get("/api/sweets/search?query=gulab", headers=headers).json()[0]["name"] == "Gulab Jamun"
+    assert [s["name"] for s in client.get("/api/sweets/suggest?q=gulab", headers=headers).json()] == ["Gulab Jamun"]
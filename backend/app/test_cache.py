@@ -0,0 +1,265 @@
+import fnmatch
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from .core import cache as cache_module
+from .core.cache import Cache, CacheBackend, MemoryBackend, RedisBackend, configure_cache, get_cache_backend
+from .core.dependencies import invalidate_principal, principal_cache
+from .core.http_cache import catalog_cache
+from .core.security import create_access_token
+from .database import Base, get_db
+from .main import app
+from .models import Sweet, User, UserRole
+
+try:
+    import fakeredis
+except ImportError:  # optional; LocalRedis below stands in
+    fakeredis = None
+
+engine = create_engine("sqlite:///./test_cache.db", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class LocalRedis:
+    """In-process stand-in for one Redis server, with the part of redis-py's
+    client API that RedisBackend uses. Every client of it sees the same data."""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+        self.calls = 0
+
+    def _check(self):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("Connection refused")
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        self._check()
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, px=None, nx=False):
+        self._check()
+        if nx and self._live(key):
+            return None
+        self.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    def delete(self, *keys):
+        self._check()
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match="*", count=None):
+        self._check()
+        return iter([key for key in list(self.data) if fnmatch.fnmatchcase(key, match)])
+
+
+def _redis_workers(count: int):
+    # One backend per simulated worker, all connected to the same server
+    if fakeredis is not None:
+        server = fakeredis.FakeServer()
+        return [RedisBackend(fakeredis.FakeRedis(server=server)) for _ in range(count)]
+    server = LocalRedis()
+    return [RedisBackend(server) for _ in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    backend = get_cache_backend()
+    yield
+    configure_cache(backend)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def headers(db):
+    db.add(User(email="admin@example.com", password="x", role=UserRole.ADMIN))
+    db.add(Sweet(name="Ladoo", category="Indian", price=2.0, quantity=5))
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': 'admin@example.com'})}"}
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_backends_share_cache_semantics(backend):
+    configure_cache(MemoryBackend() if backend == "memory" else _redis_workers(1)[0])
+    small = Cache("test_small", maxsize=2, ttl=60)
+    other = Cache("test_other", maxsize=2)
+
+    small.set("a", b"1")
+    other.set("a", b"other")
+    assert small.add("a", b"2") is False
+    assert small.get("a") == b"1"
+    small.invalidate("a")
+    assert small.add("a", b"2") is True
+    assert small.get("a") == b"2"
+
+    small.set("gone", b"x", ttl=0.001)
+    time.sleep(0.01)
+    assert small.get("gone") is None
+    assert small.stats()["hits"] == 2 and small.stats()["misses"] == 1
+
+    small.clear()
+    assert small.get("a") is None
+    assert other.get("a") == b"other"
+
+    if backend == "memory":
+        # Each namespace is its own LRU of the size its Cache declared
+        for key in ("a", "b", "c"):
+            small.set(key, key.encode())
+        assert small.get("a") is None
+        assert small.stats()["size"] == 2
+
+
+def test_workers_sharing_redis_see_each_others_entries_and_invalidations(client, headers):
+    first, second = _redis_workers(2)
+    configure_cache(first)
+    listed = client.get("/api/sweets", headers=headers)
+    assert listed.json()[0]["price"] == 2.0
+
+    # Another worker serves the same entry, ETag and principal from Redis
+    configure_cache(second)
+    hits = catalog_cache.stats()["hits"], principal_cache.stats()["hits"]
+    again = client.get("/api/sweets", headers=headers)
+    assert again.content == listed.content
+    assert again.headers["ETag"] == listed.headers["ETag"]
+    assert (catalog_cache.stats()["hits"], principal_cache.stats()["hits"]) == (hits[0] + 1, hits[1] + 1)
+
+    # A write on that worker moves the shared version, so the first worker
+    # stops serving its older entry
+    assert client.put("/api/sweets/1", json={"price": 3.0}, headers=headers).status_code == 200
+    configure_cache(first)
+    fresh = client.get("/api/sweets", headers=headers)
+    assert fresh.json()[0]["price"] == 3.0
+    assert fresh.headers["ETag"] != listed.headers["ETag"]
+    assert client.get("/api/sweets", headers={**headers, "If-None-Match": listed.headers["ETag"]}).status_code == 200
+
+    invalidate_principal("admin@example.com")
+    configure_cache(second)
+    assert principal_cache.get("admin@example.com") is None
+
+
+def test_suggestions_follow_name_changes_made_by_other_workers(client, db, headers):
+    from .sweets import suggest
+    first, second = _redis_workers(2)
+    configure_cache(first)
+    assert client.get("/api/sweets/suggest", params={"q": "gulab"}, headers=headers).json() == []
+    index = next(iter(suggest._indexes.values()))
+
+    # This worker's own writes update its index in place, without a reload
+    renamed = client.put("/api/sweets/1", json={"name": "Motichoor Ladoo"}, headers=headers)
+    assert renamed.status_code == 200
+    assert client.get("/api/sweets/suggest", params={"q": "motichoor"}, headers=headers).json()[0]["id"] == 1
+    assert next(iter(suggest._indexes.values())) is index
+
+    # Another worker adds a sweet: the row appears in the database and that
+    # worker moves the shared names version
+    db.add(Sweet(name="Gulab Jamun", category="Indian", price=2.0, quantity=5))
+    db.commit()
+    second.set("suggest", suggest.NAMES_VERSION_KEY, b"bumped-elsewhere")
+    suggestions = client.get("/api/sweets/suggest", params={"q": "gulab"}, headers=headers).json()
+    assert [s["name"] for s in suggestions] == ["Gulab Jamun"]
+
+    # Stock changes leave the names version alone
+    version = first.get("suggest", suggest.NAMES_VERSION_KEY)
+    client.post("/api/sweets/1/restock", json={"quantity": 1}, headers=headers)
+    assert first.get("suggest", suggest.NAMES_VERSION_KEY) == version
+
+
+def test_unreachable_redis_falls_back_to_the_database(client, headers, caplog):
+    server = LocalRedis()
+    configure_cache(RedisBackend(server, retry_after=0.2))
+    server.down = True
+    for _ in range(2):
+        response = client.get("/api/sweets/search", params={"query": "ladoo"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()[0]["name"] == "Ladoo"
+        assert "ETag" not in response.headers
+    assert "Cache get failed, treating as a miss" in caplog.text
+    # The first failure opens the breaker; later calls skip the server
+    assert server.calls == 1
+
+    server.down = False
+    assert "ETag" not in client.get("/api/sweets/search", params={"query": "ladoo"}, headers=headers).headers
+    time.sleep(0.25)
+    assert "ETag" in client.get("/api/sweets/search", params={"query": "ladoo"}, headers=headers).headers
+
+
+def test_a_lost_version_bump_stops_caching_until_it_lands(client, headers, monkeypatch):
+    from .core import events
+    server = LocalRedis()
+    first, second = RedisBackend(server, retry_after=0), RedisBackend(server, retry_after=0)
+    configure_cache(first)
+    listed = client.get("/api/sweets", headers=headers)
+    etag = listed.headers["ETag"]
+
+    # The write commits, but its bump cannot reach Redis
+    original = first.set
+    monkeypatch.setattr(first, "set", lambda *args, **kwargs: False)
+    assert client.put("/api/sweets/1", json={"price": 3.0}, headers=headers).status_code == 200
+    fresh = client.get("/api/sweets", headers=headers)
+    assert fresh.json()[0]["price"] == 3.0
+    assert "ETag" not in fresh.headers
+
+    # The next request retries the bump, which lands and moves every worker on
+    monkeypatch.setattr(first, "set", original)
+    assert client.get("/api/sweets", headers=headers).headers["ETag"] != etag
+    configure_cache(second)
+    assert client.get("/api/sweets", headers=headers).json()[0]["price"] == 3.0
+
+    # A bump that is lost for good still stops mattering once the token expires
+    monkeypatch.setattr(events, "_bump_failed", False)
+    events._catalog_state.set(events.CATALOG_VERSION_KEY, b"old", ttl=0.01)
+    time.sleep(0.02)
+    assert events.catalog_cache_version() not in (None, "old")
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_catalog_version_only_expires_on_a_shared_backend(backend, monkeypatch):
+    from .core import events
+    configure_cache(MemoryBackend() if backend == "memory" else _redis_workers(1)[0])
+    monkeypatch.setattr(events, "CATALOG_VERSION_TTL_SECONDS", 0.05)
+    token = events.catalog_cache_version()
+    time.sleep(0.1)
+    # A local backend never misses a bump, so an unchanged catalog keeps its
+    # ETags; a shared one bounds how long a lost bump can go unnoticed
+    assert (events.catalog_cache_version() == token) == (backend == "memory")
+
+
+def test_cache_url_selects_the_backend():
+    assert isinstance(cache_module.create_backend("memory://"), MemoryBackend)
+    with pytest.raises(ValueError):
+        cache_module.create_backend("memcached://localhost")
+    # Backends must implement the whole interface
+    with pytest.raises(TypeError):
+        type("Partial", (CacheBackend,), {"get": lambda self, namespace, key: None})()
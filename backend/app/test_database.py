@@ -0,0 +1,113 @@
+from .database import DatabaseSettings, _engine_options, build_engine
+
+
+def _pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'wal.db'}", DatabaseSettings(sqlite_busy_timeout_ms=1234))
+    try:
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1  # NORMAL
+        assert _pragma(engine, "busy_timeout") == 1234
+        assert _pragma(engine, "cache_size") == -64 * 1024
+    finally:
+        engine.dispose()
+
+
+def test_sqlite_pragmas_can_be_disabled(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'plain.db'}", DatabaseSettings(sqlite_pragmas=False))
+    try:
+        assert _pragma(engine, "journal_mode") == "delete"
+    finally:
+        engine.dispose()
+
+
+def test_settings_read_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://shop@db/shop")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    settings = DatabaseSettings.from_env()
+    
+    options = _engine_options(settings.url, settings)
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 10
+    assert options["pool_pre_ping"] is False
+    assert options["pool_recycle"] == 1800
+    assert "connect_args" not in options
+    
+    memory = _engine_options("sqlite://", settings)
+    assert "pool_size" not in memory
+
+
+def test_catalog_reads_use_replicas_with_read_your_writes(tmp_path):
+    from fastapi import Request
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from . import database
+    from .database import Base, configure_replicas, get_db
+    from .main import app
+    from .models import Sweet, User, UserRole
+    from .core.security import create_access_token
+    
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica_a", "replica_b")}
+    for name, url in urls.items():
+        seed_engine = create_engine(url)
+        Base.metadata.create_all(bind=seed_engine)
+        with sessionmaker(bind=seed_engine)() as session:
+            session.add(Sweet(name=name, category="Test", price=1.0, quantity=10))
+            session.add(User(email="buyer@example.com", password="x", role=UserRole.USER))
+            session.add(User(email="browser@example.com", password="x", role=UserRole.USER))
+            session.commit()
+        seed_engine.dispose()
+    
+    primary_engine = create_engine(urls["primary"], connect_args={"check_same_thread": False})
+    PrimarySession = sessionmaker(autocommit=False, autoflush=False, bind=primary_engine)
+    
+    def override_get_db(request: Request):
+        db = PrimarySession()
+        db.info["caller"] = database._caller_key(request)
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    buyer = {"Authorization": f"Bearer {create_access_token(data={'sub': 'buyer@example.com'})}"}
+    browser = {"Authorization": f"Bearer {create_access_token(data={'sub': 'browser@example.com'})}"}
+    
+    configure_replicas([urls["replica_a"], urls["replica_b"]])
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            served = [client.get("/api/sweets", headers=browser).json()[0]["name"] for _ in range(4)]
+            assert served == ["replica_a", "replica_b", "replica_a", "replica_b"]
+            assert client.get("/api/sweets/search?query=test", headers=browser).json()[0]["name"].startswith("replica")
+            
+            assert client.post("/api/sweets/1/purchase", json={"quantity": 1}, headers=buyer).status_code == 200
+            # The buyer now reads from the primary and sees the purchase
+            listing = client.get("/api/sweets", headers=buyer).json()
+            assert listing[0]["name"] == "primary"
+            assert listing[0]["quantity"] == 9
+            # Other callers keep reading from the replicas
+            assert client.get("/api/sweets", headers=browser).json()[0]["name"].startswith("replica")
+    finally:
+        app.dependency_overrides.clear()
+        configure_replicas([])
+        primary_engine.dispose()
+
+
+def test_replica_router_least_busy_strategy(tmp_path):
+    from .database import ReplicaRouter
+    
+    engines = [build_engine(f"sqlite:///{tmp_path / name}.db", DatabaseSettings()) for name in ("a", "b")]
+    router = ReplicaRouter(engines, "least_busy")
+    held = engines[0].connect()
+    try:
+        assert router.choose() is engines[1]
+    finally:
+        held.close()
+        for engine in engines:
+            engine.dispose()
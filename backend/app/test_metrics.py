@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from .core.metrics import REQUESTS, STATEMENT_ERRORS, STATEMENT_LATENCY, Histogram, install_statement_hooks
+from .database import DatabaseSettings, build_engine
+from .main import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(("a",), value)
+    assert histogram.render()[2:] == [
+        'demo_seconds_bucket{stage="a",le="0.1"} 1',
+        'demo_seconds_bucket{stage="a",le="1"} 3',
+        'demo_seconds_bucket{stage="a",le="+Inf"} 4',
+        'demo_seconds_sum{stage="a"} 4.05',
+        'demo_seconds_count{stage="a"} 4',
+    ]
+
+
+def test_requests_are_labelled_by_route_template():
+    movements = ("GET", "/api/sweets/{sweet_id}/movements", "401")
+    unmatched = ("GET", "unmatched", "404")
+    before = REQUESTS.value(movements), REQUESTS.value(unmatched)
+    with TestClient(app) as client:
+        client.get("/api/sweets/7/movements")
+        client.get("/api/sweets/8/movements")
+        client.get("/no/such/page")
+        body = client.get("/metrics").text
+
+    assert (REQUESTS.value(movements), REQUESTS.value(unmatched)) == (before[0] + 2, before[1] + 1)
+    assert '# TYPE sweetshop_http_request_duration_seconds histogram' in body
+    assert 'sweetshop_http_requests_total{method="GET",route="/api/sweets/{sweet_id}/movements",status="401"}' in body
+    assert 'sweetshop_cache_hits_total{cache="principal"}' in body
+    assert "/7/" not in body
+
+
+def test_engine_statements_are_timed_by_operation(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'metrics.db'}", DatabaseSettings())
+    install_statement_hooks()  # already installed by app.database; must not double count
+    try:
+        with engine.connect():
+            pass  # first connect runs the dialect's own probing queries
+        selects = STATEMENT_LATENCY.count(("SELECT",))
+        inserts = STATEMENT_LATENCY.count(("INSERT",))
+        errors = STATEMENT_ERRORS.value(("SELECT",))
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE t (x INTEGER)"))
+            connection.execute(text("INSERT INTO t VALUES (:x)"), [{"x": 1}, {"x": 2}])
+            connection.execute(text("SELECT x FROM t")).all()
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT missing FROM t"))
+        assert STATEMENT_LATENCY.count(("SELECT",)) == selects + 2  # failures are timed too
+        assert STATEMENT_LATENCY.count(("INSERT",)) == inserts + 1
+        assert STATEMENT_ERRORS.value(("SELECT",)) == errors + 1
+    finally:
+        engine.dispose()
@@ -0,0 +1,84 @@
+import logging
+import os
+import subprocess
+import sys
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from .core import sql_tracker
+from .core.sql_tracker import SQLTrackingMiddleware, query_budget
+from . import database  # installs the statement hooks
+
+engine = create_engine("sqlite://")
+
+
+def _run(statements: int):
+    with engine.connect() as connection:
+        for _ in range(statements):
+            connection.execute(text("SELECT 1"))
+    return {"ok": True}
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(SQLTrackingMiddleware)
+    app.get("/within", dependencies=[query_budget(2)])(lambda: _run(2))
+    app.get("/over", dependencies=[query_budget(2)])(lambda: _run(3))
+    app.get("/undeclared")(lambda: _run(5))
+    return app
+
+
+def test_requests_report_statement_count_and_time():
+    client = TestClient(_app())
+    response = client.get("/undeclared")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="5 queries"')
+
+
+def test_query_budget_fails_in_strict_mode_and_logs_otherwise(monkeypatch, caplog):
+    client = TestClient(_app())
+    monkeypatch.setattr(sql_tracker, "STRICT_QUERY_BUDGETS", True)
+    assert client.get("/within").status_code == 200
+    response = client.get("/over")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Query budget exceeded: 3 statements, budget 2"
+    assert response.json()["statements"] == ["SELECT 1"] * 3
+
+    monkeypatch.setattr(sql_tracker, "STRICT_QUERY_BUDGETS", False)
+    with caplog.at_level(logging.WARNING, logger=sql_tracker.__name__):
+        assert client.get("/over").status_code == 200
+    assert "GET /over: Query budget exceeded: 3 statements, budget 2" in caplog.text
+
+
+def test_slow_queries_are_logged_with_parameters_and_plan(monkeypatch, caplog, tmp_path):
+    slow_engine = database.build_engine(f"sqlite:///{tmp_path / 'slow.db'}", database.DatabaseSettings())
+    try:
+        with slow_engine.begin() as connection:
+            connection.execute(text("CREATE TABLE t (x INTEGER PRIMARY KEY, y TEXT)"))
+            monkeypatch.setattr(sql_tracker, "SLOW_QUERY_MS", 0)
+            with caplog.at_level(logging.WARNING, logger=sql_tracker.__name__):
+                connection.execute(text("SELECT y FROM t WHERE x = :x"), {"x": 42}).all()
+    finally:
+        slow_engine.dispose()
+    assert "Slow query" in caplog.text
+    assert "SELECT y FROM t WHERE x = ?" in caplog.text
+    assert "parameters: (42,)" in caplog.text
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in caplog.text
+
+
+def test_statement_hooks_are_skipped_when_metrics_and_tracking_are_off():
+    check = (
+        "from sqlalchemy import event; from sqlalchemy.engine import Engine; import app.database; "
+        "from app.core.metrics import _HOOKS; "
+        "print(any(event.contains(Engine, name, hook) for name, hook in _HOOKS))"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def hooked(**env):
+        result = subprocess.run([sys.executable, "-c", check], cwd=backend, env=dict(os.environ, **env),
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip() == "True"
+
+    assert not hooked(METRICS_ENABLED="0", SQL_TRACKING="0")
+    assert hooked(METRICS_ENABLED="0", SQL_TRACKING="1")
@@ -0,0 +1,66 @@
+import logging
+import os
+import subprocess
+import sys
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+from . import database, main
+from .database import DatabaseSettings, build_engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _use_engine(monkeypatch, path):
+    engine = build_engine(f"sqlite:///{path}", DatabaseSettings())
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    return engine
+
+
+def test_importing_the_app_touches_no_database(tmp_path):
+    path = tmp_path / "untouched.db"
+    subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=dict(os.environ, DATABASE_URL=f"sqlite:///{path}"), check=True
+    )
+    assert not path.exists()
+
+
+def test_lifespan_migrates_and_warms_the_pool(monkeypatch, tmp_path):
+    engine = _use_engine(monkeypatch, tmp_path / "startup.db")
+    try:
+        with TestClient(main.create_app()) as client:
+            tables = inspect(engine).get_table_names()
+            assert {"users", "sweets", "sweets_fts"} <= set(tables)
+            assert engine.pool.checkedin() == engine.pool.size()
+            assert client.get("/").status_code == 200
+    finally:
+        engine.dispose()
+
+
+def test_workers_skip_migration_when_disabled(monkeypatch, tmp_path, caplog):
+    engine = _use_engine(monkeypatch, tmp_path / "unmigrated.db")
+    monkeypatch.setattr(main, "AUTO_MIGRATE", False)
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.bootstrap"):
+            with TestClient(main.create_app()) as client:
+                assert client.get("/").status_code == 200
+        assert inspect(engine).get_table_names() == []
+        assert "Warm-up failed (has the database been migrated?)" in caplog.text
+    finally:
+        engine.dispose()
+
+
+def test_serve_refuses_several_workers_without_shared_state(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'serve.db'}", CACHE_URL="memory://")
+    serve = [sys.executable, "serve.py", "--workers", "2"]
+
+    result = subprocess.run(serve, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "needs a shared cache" in result.stderr
+
+    env["PURCHASE_LEDGER_SWEETS"] = "1"
+    result = subprocess.run(serve, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "cannot run the purchase ledger" in result.stderr
@@ -0,0 +1,38 @@
+"""
+Rebuild the sales analytics rollups from the inventory movement history.
+
+Rollups are normally kept current by purchases; run this after restoring
+data or changing the rollup layout. Movements are read and committed in
+chunks, so memory use does not grow with the history. Days already folded
+away by compact_inventory.py keep their existing rollups.
+
+Usage:
+    cd backend
+    python backfill_rollups.py                                   # everything
+    python backfill_rollups.py --start 2024-01-01 --end 2024-02-01
+"""
+
+import argparse
+from datetime import date
+
+from app.database import SessionLocal
+from app.analytics.service import BACKFILL_CHUNK_SIZE, backfill_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (UTC)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Day after the last one to rebuild (UTC)")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        processed = backfill_rollups(db, args.start, args.end, args.chunk_size)
+        print(f"Rebuilt rollups from {processed} purchase movements")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compare sync and async database modes under concurrent load.
+
+Starts one uvicorn server per mode against a seeded SQLite database and
+drives it with N concurrent HTTP clients for each scenario.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_async --clients 100 500 1000 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(directory: str, sweets: int) -> str:
+    from app.database import Base
+    from app.models import Sweet, User, UserRole
+    from app.core.security import create_access_token
+
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'sweet_shop.db')}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(email="bench@example.com", password="x", role=UserRole.USER))
+    session.execute(insert(Sweet), [
+        {"name": f"Sweet {i}", "category": f"Category {i % 20}", "price": 1.0 + i % 50, "quantity": 10 ** 9}
+        for i in range(sweets)
+    ])
+    session.commit()
+    session.close()
+    engine.dispose()
+    return create_access_token(data={"sub": "bench@example.com", "role": "USER"}, expires_delta=None)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(directory: str, port: int, async_mode: bool) -> subprocess.Popen:
+    env = dict(os.environ, USE_ASYNC_DB="1" if async_mode else "0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=directory, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url: str, token: str, scenario: str, clients: int, duration: float) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        stop = time.perf_counter() + duration
+
+        async def worker(n: int):
+            nonlocal errors
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                if scenario == "browse":
+                    response = await client.get("/api/sweets", params={"limit": 20})
+                elif scenario == "search":
+                    response = await client.get("/api/sweets/search", params={"query": "sweet 1", "limit": 20})
+                else:
+                    response = await client.post(f"/api/sweets/{n % 50 + 1}/purchase", json={"quantity": 1})
+                if response.status_code >= 400:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else 0.0
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--sweets", type=int, default=1000)
+    parser.add_argument("--scenarios", nargs="+", default=["browse", "search", "purchase"])
+    args = parser.parse_args()
+
+    for async_mode in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            token = seed(directory, args.sweets)
+            port = free_port()
+            server = start_server(directory, port, async_mode)
+            try:
+                for scenario in args.scenarios:
+                    for clients in args.clients:
+                        result = asyncio.run(drive(f"http://127.0.0.1:{port}", token, scenario, clients, args.duration))
+                        print(
+                            f"{'async' if async_mode else 'sync':>5} {scenario:>8} {clients:>5} clients"
+                            f" | {result['rps']:8.1f} req/s | p50 {result['p50']:8.1f} ms"
+                            f" p95 {result['p95']:8.1f} ms p99 {result['p99']:8.1f} ms | errors {result['errors']}"
+                        )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Mixed read/write throughput on SQLite with and without the tuned pragmas.
+
+Reader threads page through the catalog while writer threads purchase
+sweets, the access pattern of a busy shop. "default" is the stock
+rollback-journal configuration, "tuned" is what build_engine applies
+(WAL, synchronous=NORMAL, busy_timeout, cache_size, mmap_size).
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_database --readers 8 --writers 2 --duration 10
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, DatabaseSettings, build_engine
+from app.models import Sweet
+from app.schemas import PurchaseRequest
+from app.inventory.service import purchase_sweet
+from app.sweets.service import get_sweets_page
+
+
+def run(label: str, settings: DatabaseSettings, args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", settings)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as session:
+            session.execute(insert(Sweet), [
+                {"name": f"Sweet {i}", "category": f"Category {i % 20}", "price": 1.0, "quantity": 10 ** 9}
+                for i in range(args.sweets)
+            ])
+            session.commit()
+
+        counts = {"read": 0, "write": 0, "error": 0}
+        lock = threading.Lock()
+        stop = time.perf_counter() + args.duration
+
+        def reader():
+            with Session() as session:
+                while time.perf_counter() < stop:
+                    try:
+                        get_sweets_page(session, limit=50)
+                        session.rollback()
+                        kind = "read"
+                    except Exception:
+                        session.rollback()
+                        kind = "error"
+                    with lock:
+                        counts[kind] += 1
+
+        def writer(n):
+            with Session() as session:
+                while time.perf_counter() < stop:
+                    try:
+                        purchase_sweet(session, n % args.sweets + 1, PurchaseRequest(quantity=1))
+                        kind = "write"
+                    except Exception:
+                        session.rollback()
+                        kind = "error"
+                    with lock:
+                        counts[kind] += 1
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+        print(
+            f"{label:>8} | reads {counts['read'] / args.duration:9.1f}/s"
+            f" | writes {counts['write'] / args.duration:8.1f}/s | errors {counts['error']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--sweets", type=int, default=10000)
+    args = parser.parse_args()
+    pool = {"pool_size": args.readers + args.writers, "max_overflow": 0}
+    run("default", DatabaseSettings(sqlite_pragmas=False, **pool), args)
+    run("tuned", DatabaseSettings(**pool), args)
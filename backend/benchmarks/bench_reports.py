@@ -0,0 +1,95 @@
+"""
+Compare the columnar stock-valuation report with a naive ORM loop.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_reports --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Sweet
+from app.reports.service import stock_valuation
+from benchmarks.datasets import seed
+
+
+def orm_valuation(session):
+    # What a straightforward implementation looks like: one Sweet object per row
+    groups = {}
+    for sweet in session.query(Sweet).all():
+        group = groups.setdefault(sweet.category, {"sweets": 0, "units": 0, "value": 0.0, "prices": []})
+        group["sweets"] += 1
+        group["units"] += sweet.quantity
+        group["value"] += sweet.price * sweet.quantity
+        group["prices"].append(sweet.price)
+    report = []
+    for category in sorted(groups):
+        group = groups[category]
+        prices = sorted(group["prices"])
+        report.append({
+            "category": category,
+            "sweets": group["sweets"],
+            "units": group["units"],
+            "value": round(group["value"], 2),
+            "median_price": round(statistics.median(prices), 2),
+            "p90_price": round(statistics.quantiles(prices, n=10, method="inclusive")[-1], 2),
+        })
+    return report
+
+
+def measure(fn, session_factory):
+    # Timed and traced in separate passes; tracemalloc slows allocation down
+    session = session_factory()
+    started = time.perf_counter()
+    report = fn(session)
+    elapsed = time.perf_counter() - started
+    session.close()
+
+    session = session_factory()
+    tracemalloc.start()
+    fn(session)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    session.close()
+    return report, elapsed, peak / 1024 / 1024
+
+
+def run(size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        session = session_factory()
+        seed(session, size, random.Random(size))
+        session.close()
+
+        orm_report, orm_time, orm_peak = measure(orm_valuation, session_factory)
+        columnar, columnar_time, columnar_peak = measure(stock_valuation, session_factory)
+        for expected, row in zip(orm_report, columnar):
+            assert (row.category, row.units, row.median_price) == (
+                expected["category"], expected["units"], expected["median_price"]
+            )
+        print(
+            f"{size:>9} sweets | orm {orm_time:6.2f} s peak {orm_peak:7.1f} MiB"
+            f" | columnar {columnar_time:6.2f} s peak {columnar_peak:7.1f} MiB"
+            f" | speedup x{orm_time / columnar_time:.1f}"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size)
@@ -0,0 +1,67 @@
+"""
+Compare the FTS5-backed search_sweets with the legacy ILIKE scan.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.sweets.service import search_sweets, search_sweets_ilike
+from benchmarks.datasets import WORDS, seed
+
+
+def measure(fn, session, queries, limit):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(session, query, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(size: int, queries: int, limit: int) -> None:
+    rng = random.Random(size)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        seed(session, size, rng)
+
+        # Broad prefixes match a large share of the catalog; selective terms
+        # match a handful of rows, which is where a full scan hurts most.
+        workloads = {
+            "broad": [rng.choice(WORDS)[: rng.randint(3, 6)] for _ in range(queries)],
+            "selective": [str(rng.randrange(size)) for _ in range(queries)],
+        }
+        for workload, terms in workloads.items():
+            fts = measure(search_sweets, session, terms, limit)
+            ilike = measure(search_sweets_ilike, session, terms, limit)
+            print(
+                f"{size:>9} sweets {workload:>9} | fts mean {fts[0]:8.2f} ms p95 {fts[1]:8.2f} ms"
+                f" | ilike mean {ilike[0]:8.2f} ms p95 {ilike[1]:8.2f} ms"
+                f" | speedup x{ilike[0] / fts[0]:.1f}"
+            )
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.limit)
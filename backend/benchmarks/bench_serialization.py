@@ -0,0 +1,79 @@
+"""
+Per-row cost of encoding list responses, validated path vs fast path.
+
+The validated path builds a SweetResponse per row and encodes it the way
+JSONResponse does (jsonable_encoder, then json.dumps). The fast path turns
+row tuples into dicts and encodes them with orjson or pydantic-core.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_serialization --rows 100 1000 10000
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import to_json
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core import serialization
+from app.database import Base
+from app.models import Sweet
+from app.schemas import SweetResponse
+from app.sweets.service import SWEET_FIELDS
+from benchmarks.datasets import seed
+
+
+def validated(rows):
+    items = [
+        SweetResponse(id=row[0], name=row[1], category=row[2], price=row[3], quantity=row[4])
+        for row in rows
+    ]
+    return json.dumps(jsonable_encoder(items), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_pydantic_core(rows):
+    return to_json(serialization.rows_to_dicts(SWEET_FIELDS, rows))
+
+
+def fast_orjson(rows):
+    return serialization.orjson.dumps(serialization.rows_to_dicts(SWEET_FIELDS, rows))
+
+
+def per_row_us(fn, rows, repeat: int) -> float:
+    number = max(1, 100000 // len(rows))
+    best = min(timeit.repeat(lambda: fn(rows), number=number, repeat=repeat))
+    return best / number / len(rows) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    seed(session, max(args.rows), random.Random(0))
+    all_rows = session.execute(select(*(getattr(Sweet, field) for field in SWEET_FIELDS))).all()
+
+    candidates = [("validated", validated), ("fast/pydantic-core", fast_pydantic_core)]
+    if serialization.orjson is not None:
+        candidates.append(("fast/orjson", fast_orjson))
+    for size in args.rows:
+        rows = all_rows[:size]
+        assert all(json.loads(fn(rows)) == json.loads(validated(rows)) for _, fn in candidates)
+        timings = [(name, per_row_us(fn, rows, args.repeat)) for name, fn in candidates]
+        baseline = timings[0][1]
+        print(f"{size:>6} rows | " + " | ".join(
+            f"{name} {cost:5.2f} us/row (x{baseline / cost:.1f})" for name, cost in timings
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure per-worker cold start: fresh uvicorn workers against serve.py's forked ones.
+
+A fresh worker is what each `uvicorn --workers N` process pays: interpreter
+start, imports and the lifespan, with or without migrating (AUTO_MIGRATE),
+timed from launch to its first response. A forked worker is timed from
+fork() to accepting connections, as logged by serve.py. Forking more than
+one worker (--workers) needs a shared CACHE_URL, as serve.py requires.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_startup --dataset 100k --runs 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks import datasets
+from benchmarks.bench_async import BACKEND_DIR, free_port
+
+READY = re.compile(r"accepting connections ([\d.]+) ms after fork")
+
+
+def fresh_worker(env: dict) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+                return (time.perf_counter() - started) * 1000
+            except httpx.HTTPError:
+                if process.poll() is not None:
+                    raise RuntimeError("worker exited during startup")
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def forked_workers(env: dict, workers: int) -> list:
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(free_port())],
+        cwd=BACKEND_DIR, env=env, stderr=subprocess.PIPE, text=True,
+    )
+    timings = []
+    try:
+        for line in process.stderr:
+            match = READY.search(line)
+            if match:
+                timings.append(float(match.group(1)))
+                if len(timings) == workers:
+                    break
+    finally:
+        process.terminate()
+        process.wait()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", choices=sorted(datasets.SIZES), default="100k")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=datasets.working_copy(args.dataset, directory))
+        results = {
+            "fresh, migrating": [fresh_worker(dict(env, AUTO_MIGRATE="1")) for _ in range(args.runs)],
+            "fresh, migrated": [fresh_worker(dict(env, AUTO_MIGRATE="0")) for _ in range(args.runs)],
+            "forked (serve.py)": [t for _ in range(args.runs) for t in forked_workers(env, args.workers)],
+        }
+    for name, timings in results.items():
+        print(f"{name:>18} | median {statistics.median(timings):8.1f} ms | max {max(timings):8.1f} ms | n={len(timings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Seeded, reproducible datasets for the benchmarks.
+
+Each named dataset is built once into a SQLite file under benchmarks/data/
+(the same seed always produces the same rows) and copied before every run,
+so scenarios that write start from identical state.
+
+Usage:
+    cd backend
+    python -m benchmarks.datasets 1k 100k 1m
+"""
+
+import argparse
+import os
+import random
+import shutil
+import time
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Sweet, User, UserRole
+from app.sweets import search  # noqa: F401  registers the FTS index DDL
+from app.core.security import BCRYPT_ROUNDS, get_password_hash
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+USERS = 10000
+# Every seeded user shares one password, so seeding hashes it once instead
+# of 10k times; logins still pay the full bcrypt cost of BCRYPT_ROUNDS.
+PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@bench.local"
+# Sweets 1..HOT_SWEETS never sell out, so purchase storms on them measure
+# contention rather than 400s
+HOT_SWEETS = 10
+
+WORDS = [
+    "gulab", "jamun", "ladoo", "barfi", "jalebi", "rasgulla", "halwa", "peda",
+    "chocolate", "toffee", "fudge", "truffle", "caramel", "nougat", "praline",
+    "gummy", "marshmallow", "brittle", "kaju", "katli", "mysore", "pak",
+]
+CATEGORIES = ["Indian", "Chocolate", "Candy", "Gummies", "Bakery", "Festive"]
+
+
+def user_email(n: int) -> str:
+    return f"user{n}@bench.local"
+
+
+def seed(session, size: int, rng: random.Random) -> None:
+    batch = []
+    for i in range(size):
+        name = " ".join(rng.sample(WORDS, 2)).title() + f" {i}"
+        batch.append({
+            "name": name,
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(0.5, 20), 2),
+            "quantity": rng.randint(0, 500),
+        })
+        if len(batch) == 10000:
+            session.execute(insert(Sweet), batch)
+            batch = []
+    if batch:
+        session.execute(insert(Sweet), batch)
+    session.commit()
+
+
+def seed_users(session, count: int) -> None:
+    hashed = get_password_hash(PASSWORD)
+    session.execute(insert(User), [{"email": ADMIN_EMAIL, "password": hashed, "role": UserRole.ADMIN}])
+    session.execute(insert(User), [
+        {"email": user_email(n), "password": hashed, "role": UserRole.USER} for n in range(count)
+    ])
+    session.commit()
+
+
+def dataset_path(name: str, users: int = USERS) -> str:
+    # Hashes are made with the current BCRYPT_ROUNDS, which sets login cost
+    return os.path.join(DATA_DIR, f"{name}-{users}u-r{BCRYPT_ROUNDS}.db")
+
+
+def build(name: str, users: int = USERS, force: bool = False) -> str:
+    """Path of the seeded dataset, building it on first use."""
+    path = dataset_path(name, users)
+    if os.path.exists(path) and not force:
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    engine = create_engine(f"sqlite:///{partial}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    seed(session, SIZES[name], random.Random(SIZES[name]))
+    session.execute(update(Sweet).where(Sweet.id <= HOT_SWEETS).values(quantity=10 ** 9))
+    seed_users(session, users)
+    session.close()
+    engine.dispose()
+    os.replace(partial, path)
+    return path
+
+
+def working_copy(name: str, directory: str, users: int = USERS) -> str:
+    """Copies the dataset into directory and returns its database URL."""
+    target = os.path.join(directory, "sweet_shop.db")
+    shutil.copyfile(build(name, users), target)
+    return f"sqlite:///{target}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="+", choices=sorted(SIZES))
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the file exists")
+    args = parser.parse_args()
+    for name in args.names:
+        started = time.perf_counter()
+        path = build(name, args.users, args.force)
+        print(f"{name:>5}: {path} ({time.perf_counter() - started:.1f} s)")
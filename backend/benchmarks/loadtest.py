@@ -0,0 +1,399 @@
+"""
+Run load-test scenarios against the app and gate on a stored baseline.
+
+Each scenario starts from a fresh copy of a seeded dataset (see
+benchmarks/datasets.py) and drives the app with concurrent clients whose
+requests come from per-client seeded RNGs, so runs are reproducible. The
+app is served either in-process through httpx's ASGITransport or over TCP
+by serve.py's uvicorn workers (more than one needs a shared CACHE_URL).
+Latency percentiles and throughput are written as JSON; with --baseline
+the run is compared against an earlier report, which must come from the
+same dataset, target, workers and concurrency, and the exit status is 1 on
+a regression.
+
+Usage:
+    cd backend
+    python -m benchmarks.loadtest --dataset 1k --output results.json
+    CACHE_URL=redis://localhost:6379/0 python -m benchmarks.loadtest --dataset 100k \\
+        --target uvicorn --workers 4 --scenarios catalog_browse search --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import atexit
+import csv
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+# The app reads its database URLs when app.database is first imported, so the
+# working copy every scenario runs on is chosen before anything imports it.
+WORK_DIR = tempfile.mkdtemp(prefix="sweetshop-loadtest-")
+WORK_DB = os.path.join(WORK_DIR, "sweet_shop.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DB}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{WORK_DB}"
+atexit.register(shutil.rmtree, WORK_DIR, True)
+
+from app.core.security import BCRYPT_ROUNDS, create_access_token  # noqa: E402
+from app.reports.columns import percentile  # noqa: E402
+from benchmarks import datasets  # noqa: E402
+from benchmarks.bench_async import BACKEND_DIR, free_port  # noqa: E402
+
+DEFAULT_TOLERANCE = 0.10
+# Latency changes below this are noise however large in relative terms
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+class Client(NamedTuple):
+    """One simulated client: its HTTP client, RNG and scratch state."""
+    http: httpx.AsyncClient
+    rng: random.Random
+    headers: Dict[str, str]
+    state: dict
+    sweets: int
+    users: int
+
+
+def user_headers(n: int) -> Dict[str, str]:
+    token = create_access_token(data={"sub": datasets.user_email(n), "role": "USER"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def admin_headers() -> Dict[str, str]:
+    token = create_access_token(data={"sub": datasets.ADMIN_EMAIL, "role": "ADMIN"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def catalog_browse(client: Client) -> httpx.Response:
+    # Mostly follows the previous page's cursor, sometimes starts a new listing
+    rng, state = client.rng, client.state
+    if state.get("cursor") and rng.random() < 0.8:
+        params = dict(state["params"], after=state["cursor"])
+    else:
+        params = {"limit": 50, "order_by": rng.choice(["id", "name", "-price", "category"])}
+        if rng.random() < 0.3:
+            params["category"] = rng.choice(datasets.CATEGORIES)
+        if rng.random() < 0.2:
+            params["in_stock"] = "true"
+        state["params"] = params
+    response = await client.http.get("/api/sweets", params=params, headers=client.headers)
+    state["cursor"] = response.headers.get("X-Next-Cursor")
+    return response
+
+
+async def search(client: Client) -> httpx.Response:
+    rng = client.rng
+    if rng.random() < 0.7:
+        query = rng.choice(datasets.WORDS)[: rng.randint(3, 6)]
+    else:
+        query = str(rng.randrange(client.sweets))
+    return await client.http.get("/api/sweets/search", params={"query": query, "limit": 20}, headers=client.headers)
+
+
+async def purchase_storm(client: Client) -> httpx.Response:
+    sweet_id = client.rng.randint(1, datasets.HOT_SWEETS)
+    return await client.http.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 1}, headers=client.headers)
+
+
+async def login_burst(client: Client) -> httpx.Response:
+    form = {"username": datasets.user_email(client.rng.randrange(client.users)), "password": datasets.PASSWORD}
+    return await client.http.post("/api/auth/login", data=form)
+
+
+async def admin_bulk_edit(client: Client) -> httpx.Response:
+    rng = client.rng
+    if rng.random() < 0.8:
+        sweet_id = rng.randint(1, client.sweets)
+        return await client.http.put(
+            f"/api/sweets/{sweet_id}", json={"price": round(rng.uniform(0.5, 20), 2)}, headers=client.headers
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["sweet_id", "quantity"])
+    writer.writerows([rng.randint(1, client.sweets), rng.randint(1, 50)] for _ in range(100))
+    files = {"file": ("restock.csv", buffer.getvalue(), "text/csv")}
+    return await client.http.post("/api/sweets/restock/batch", files=files, headers=client.headers)
+
+
+class Scenario(NamedTuple):
+    run: Callable[[Client], Awaitable[httpx.Response]]
+    requests: int
+    admin: bool = False
+
+
+SCENARIOS = {
+    "catalog_browse": Scenario(catalog_browse, 2000),
+    "search": Scenario(search, 2000),
+    "purchase_storm": Scenario(purchase_storm, 2000),
+    # Every login pays a full bcrypt verification
+    "login_burst": Scenario(login_burst, 200),
+    "admin_bulk_edit": Scenario(admin_bulk_edit, 500, admin=True),
+}
+
+
+def summarize(latencies: List[float], statuses: Counter, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+async def drive(
+    http: httpx.AsyncClient,
+    name: str,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+    sweets: int,
+    users: int
+) -> dict:
+    clients = [
+        Client(
+            http, random.Random(f"{seed}:{name}:{n}"),
+            admin_headers() if scenario.admin else user_headers(n % users), {}, sweets, users
+        )
+        for n in range(concurrency)
+    ]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+
+    async def worker(client: Client, tickets, record: bool) -> None:
+        nonlocal errors
+        for _ in tickets:
+            started = time.perf_counter()
+            try:
+                response = await scenario.run(client)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            if not record:
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status_code] += 1
+            if not 200 <= status_code < 400:
+                errors += 1
+
+    # Workers share one ticket iterator, so the total is fixed however the
+    # requests interleave
+    warmup_tickets = iter(range(warmup))
+    await asyncio.gather(*(worker(client, warmup_tickets, False) for client in clients))
+    tickets = iter(range(requests))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client, tickets, True) for client in clients))
+    return summarize(latencies, statuses, errors, time.perf_counter() - started)
+
+
+def reset_database(args) -> None:
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(WORK_DB + suffix):
+            os.remove(WORK_DB + suffix)
+    datasets.working_copy(args.dataset, WORK_DIR, args.users)
+
+
+async def dispose_engines(database) -> None:
+    # Every pool the app may hold a connection to the previous copy in
+    database.engine.dispose()
+    for replica in database.replica_router.engines:
+        replica.dispose()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+
+async def run_in_process(args) -> Dict[str, dict]:
+    reset_database(args)
+    from app import database
+    from app.core.dependencies import principal_cache
+    from app.core.http_cache import catalog_cache
+    from app.main import app
+
+    results = {}
+    for name in args.scenarios:
+        # Swap a fresh copy underneath the engine and drop what was cached
+        # from the previous scenario's data
+        await dispose_engines(database)
+        reset_database(args)
+        catalog_cache.clear()
+        principal_cache.clear()
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as http:
+                results[name] = await run_scenario(http, name, args)
+    await dispose_engines(database)
+    return results
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    # serve.py migrates once and forks the workers with AUTO_MIGRATE off, as
+    # a deployment would; it inherits the DATABASE_URL of the working copy
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def run_uvicorn(args) -> Dict[str, dict]:
+    results = {}
+    for name in args.scenarios:
+        reset_database(args)
+        port = free_port()
+        server = start_server(port, args.workers)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as http:
+                results[name] = await run_scenario(http, name, args)
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+async def run_scenario(http: httpx.AsyncClient, name: str, args) -> dict:
+    scenario = SCENARIOS[name]
+    requests = args.requests or scenario.requests
+    result = await drive(
+        http, name, scenario, requests, args.concurrency, min(args.warmup, requests // 10),
+        args.seed, datasets.SIZES[args.dataset], args.users
+    )
+    print(
+        f"{name:>16} | {result['rps']:8.1f} req/s | p50 {result['p50_ms']:8.2f} ms"
+        f" p95 {result['p95_ms']:8.2f} ms p99 {result['p99_ms']:8.2f} ms | errors {result['errors']}",
+        file=sys.stderr
+    )
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressions of current against baseline, as readable lines."""
+    for key in ("dataset", "target", "workers", "concurrency"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            raise ValueError(
+                f"baseline {key} is {baseline['meta'].get(key)!r}, this run is {current['meta'].get(key)!r}"
+            )
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if result[key] > base[key] * (1 + tolerance) and result[key] - base[key] >= min_delta_ms:
+                regressions.append(f"{name}: {key} {base[key]:.2f} -> {result[key]:.2f}")
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {base['rps']:.1f} -> {result['rps']:.1f}")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", choices=sorted(datasets.SIZES), default="1k")
+    parser.add_argument("--users", type=int, default=datasets.USERS)
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes started by serve.py")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, help="requests per scenario (default: per-scenario)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args()
+    if args.target == "uvicorn" and args.workers > 1 and os.getenv("CACHE_URL", "memory://").startswith("memory://"):
+        # Per-worker caches would serve stale catalog reads; serve.py refuses them too
+        parser.error("--workers > 1 needs a shared cache, e.g. CACHE_URL=redis://localhost:6379/0")
+
+    # Build outside the timed runs
+    datasets.build(args.dataset, args.users)
+    runner = run_in_process if args.target == "asgi" else run_uvicorn
+    scenarios = asyncio.run(runner(args))
+
+    report = {
+        "meta": {
+            "dataset": args.dataset,
+            "sweets": datasets.SIZES[args.dataset],
+            "users": args.users,
+            "target": args.target,
+            "workers": args.workers if args.target == "uvicorn" else None,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "use_async_db": os.getenv("USE_ASYNC_DB", "0"),
+            "fast_responses": os.getenv("FAST_RESPONSES", "0"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(baseline, report, args.tolerance, args.min_delta_ms)
+        except ValueError as exc:
+            sys.exit(f"Cannot compare with {args.baseline}: {exc}")
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Fold old inventory movements into stock snapshots.
+
+Stock-at-time queries stay exact from the cutoff onwards; older movement
+history is removed. Schedule it (e.g. nightly via cron) to keep the
+inventory_movements table bounded.
+
+Usage:
+    cd backend
+    python compact_inventory.py            # keep the last 90 days
+    python compact_inventory.py --days 30
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.inventory.history import compact_movements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90, help="Days of movement history to keep")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = compact_movements(db, datetime.utcnow() - timedelta(days=args.days))
+        print(f"Compacted history before {result.before.isoformat()}: "
+              f"{result.snapshots} snapshots written, {result.pruned} movements removed")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from app.core import sql_tracker
+
+# Requests over their route's declared query budget fail with a 500 in tests
+sql_tracker.STRICT_QUERY_BUDGETS = True
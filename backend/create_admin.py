@@ -22,6 +22,7 @@ try:
     from app.database import SessionLocal
     from app.models import User, UserRole
     from app.core.security import get_password_hash
+    from app.core.dependencies import invalidate_principal
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Make sure you have activated the virtual environment:")
@@ -44,6 +45,7 @@ def create_admin(email: str, password: str):
                 existing_user.role = UserRole.ADMIN
                 existing_user.password = get_password_hash(password)
                 db.commit()
+                invalidate_principal(email)
                 print(f"User {email} has been updated to admin role.")
             return
         
@@ -0,0 +1,33 @@
+"""
+Create the database schema and search index.
+
+Run once per deploy, before starting workers with AUTO_MIGRATE=0, so the
+workers never race each other on schema changes. Safe to re-run: existing
+tables are left alone.
+
+Usage:
+    cd backend
+    python migrate.py
+"""
+
+import argparse
+import time
+
+from app.database import engine
+from app.bootstrap import migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        migrate(engine)
+    finally:
+        engine.dispose()
+    print(f"Migrated {engine.url.render_as_string(hide_password=True)} in {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
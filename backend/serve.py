@@ -0,0 +1,166 @@
+"""
+Serve the API from several worker processes sharing one listening socket.
+
+uvicorn --workers starts each worker as a fresh interpreter that imports the
+app and, with AUTO_MIGRATE on, migrates the database by itself. Here the
+parent migrates once, imports the app, binds the socket and then forks, so
+workers start with everything already imported. Each worker warms its
+connection pool and hot queries in the lifespan and only then accepts
+connections. Workers that exit unexpectedly are replaced. Needs fork(), so
+POSIX only; elsewhere run migrate.py, then uvicorn --workers with
+AUTO_MIGRATE=0.
+
+With more than one worker, CACHE_URL must point at a shared cache (Redis),
+or each worker would keep its own catalog version and serve stale bodies
+and 304s after another worker's writes. The shared cache also carries the
+version that makes each worker reload its suggest index after another
+worker's changes. The purchase ledger (PURCHASE_LEDGER_SWEETS) must be off,
+as its counters are per process. The stock stream is refused (503) because
+it only relays events of its own worker; workers learn the count from
+WEB_CONCURRENCY, which this script sets.
+
+Usage:
+    cd backend
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# Workers never migrate; this process does it once before forking them
+os.environ["AUTO_MIGRATE"] = "0"
+
+import uvicorn  # noqa: E402
+
+from app import database  # noqa: E402
+from app.bootstrap import migrate  # noqa: E402
+from app.core.cache import MemoryBackend, get_cache_backend  # noqa: E402
+from app.inventory.ledger import PURCHASE_LEDGER_SWEETS  # noqa: E402
+from app.main import app  # noqa: E402
+
+logger = logging.getLogger("serve")
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+
+
+class WorkerServer(uvicorn.Server):
+    def __init__(self, config: uvicorn.Config, forked_at: float):
+        super().__init__(config)
+        self.forked_at = forked_at
+
+    async def startup(self, sockets=None) -> None:
+        # Runs the lifespan (warm-up included), then starts accepting
+        await super().startup(sockets=sockets)
+        logger.info("Worker %d accepting connections %.1f ms after fork",
+                    os.getpid(), (time.perf_counter() - self.forked_at) * 1000)
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn(sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    forked_at = time.perf_counter()
+    code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # Pooled connections inherited from the parent must stay the parent's
+        database.engine.dispose(close=False)
+        WorkerServer(uvicorn.Config(app, log_level=log_level, access_log=False), forked_at).run(sockets=[sock])
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        logger.exception("Worker %d failed", os.getpid())
+        code = 1
+    finally:
+        logging.shutdown()
+        os._exit(code)
+
+
+def check_workers(workers: int) -> None:
+    # State that must be shared between workers, or served consistently by one
+    if workers <= 1:
+        return
+    if PURCHASE_LEDGER_SWEETS.strip():
+        sys.exit(f"--workers {workers} cannot run the purchase ledger: unset PURCHASE_LEDGER_SWEETS, or run one worker")
+    if isinstance(get_cache_backend(), MemoryBackend):
+        sys.exit(f"--workers {workers} needs a shared cache: set CACHE_URL=redis://..., or run one worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); run python migrate.py, then uvicorn app.main:app --workers N with AUTO_MIGRATE=0")
+    check_workers(args.workers)
+    # Read by the app, e.g. to refuse the per-worker stock stream
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    migrate(database.engine)
+    database.engine.dispose()
+    sock = bind(args.host, args.port)
+    # Objects that exist now are shared copy-on-write with every worker;
+    # keeping them out of garbage collection keeps those pages shared.
+    gc.freeze()
+
+    started = {}
+    for _ in range(args.workers):
+        started[spawn(sock, args.log_level)] = time.monotonic()
+    logger.info("Serving on http://%s:%d with %d workers", args.host, args.port, args.workers)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # Ctrl-C already reached the workers through the process group
+        if signum == signal.SIGTERM:
+            for pid in started:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while started:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        lifetime = time.monotonic() - started.pop(pid, time.monotonic())
+        if stopping:
+            continue
+        logger.warning("Worker %d exited with status %d, starting a new one", pid, os.waitstatus_to_exitcode(status))
+        if lifetime < MIN_WORKER_LIFETIME_SECONDS:
+            time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+        started[spawn(sock, args.log_level)] = time.monotonic()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()